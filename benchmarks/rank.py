@@ -0,0 +1,99 @@
+# compares autocomplete.score against extract_from_list as it used to be, which ran
+# process.extract once for every scorer and processor, with a python processor,
+# and checked for duplicates against a list rebuilt every time
+#
+# run from the root of the repo: python -m benchmarks.rank
+# by default, this matches a few queries against 1k bullet-like names with
+# the scorers autocomplete uses - see --help to change that
+import argparse
+import random
+import sys
+import timeit
+
+from rapidfuzz import process
+
+import common.autocomplete as autocomplete
+
+QUERIES = ("blood", "knfie", "the letter", "x", "broken window in the hall")
+WORDS = (
+    "blood knife letter window hall kitchen door key rope note photo diary glass"
+    " poison bottle clock mirror shoe glove ring badge camera ticket map lamp"
+).split()
+
+
+def legacy_extract_from_list(
+    argument,
+    list_of_items,
+    processors,
+    score_cutoff=80,
+    scorers=None,
+):
+    combined_list = []
+
+    for scorer in scorers:
+        for processor in processors:
+            if fuzzy_list := process.extract(
+                argument,
+                list_of_items,
+                scorer=scorer,
+                processor=processor,
+                score_cutoff=score_cutoff,
+            ):
+                combined_entries = [e[0] for e in combined_list]
+                new_members = [e for e in fuzzy_list if e[0] not in combined_entries]
+                combined_list.extend(new_members)
+
+    return combined_list
+
+
+def lower(item: str):
+    return item.lower()
+
+
+def make_candidates(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).title() + f" {i}"
+        for i in range(count)
+    ]
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=50, help="runs per query")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    candidates = make_candidates(args.candidates, args.seed)
+    # what the bullet index keeps around, so it's not part of what's timed
+    lowered = [c.lower() for c in candidates]
+
+    print(f"{args.candidates} candidates, {len(autocomplete.SCORERS)} scorers")
+    print(f"{'Query':<28} {'Before ms':>10} {'After ms':>10} {'Speedup':>8}")
+    for query in QUERIES:
+        before = timeit.timeit(
+            lambda: legacy_extract_from_list(
+                query,
+                candidates,
+                processors=[lower],
+                scorers=autocomplete.SCORERS,
+                score_cutoff=autocomplete.SCORE_CUTOFF,
+            ),
+            number=args.number,
+        )
+        after = timeit.timeit(
+            lambda: autocomplete.score(query.lower(), lowered),
+            number=args.number,
+        )
+        print(
+            f"{query:<28} {before / args.number * 1000:>10.3f}"
+            f" {after / args.number * 1000:>10.3f} {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""Replays a stream of messages through the bot's real message listeners, with a
+stubbed http client and in-memory storage, so no database or discord is needed.
+Reports latency from each message arriving to everything it caused finishing,
+throughput, and how many storage queries and http requests each message made.
+
+Run from the root of the repo: python -m benchmarks.replay
+By default, this makes a synthetic stream of 10k messages a minute across 500
+guilds. See --help for how to change that, or to save/replay a stream from a file.
+
+A stream file is JSON lines of {"t": ..., "d": ...}, where t is one of:
+CONFIG and BULLET - put into storage before replaying, with the fields of the models
+GUILD_CREATE and MESSAGE_CREATE - discord gateway payloads, replayed in order
+"""
+import argparse
+import asyncio
+import contextvars
+import importlib
+import os
+import random
+import statistics
+import sys
+import time
+import typing
+from pathlib import Path
+
+import naff
+import orjson
+
+import common.broker as broker
+import common.storage as storage
+
+DISCORD_EPOCH = 1420070400000
+BOT_USER = {
+    "id": "100000000000000001",
+    "username": "Ultimate Investigator",
+    "discriminator": "0001",
+    "avatar": None,
+    "bot": True,
+}
+WORDS = (
+    "the of and to in is was he for it with as his on be at by had are but from or"
+    " she an which you one we all were her would there their will when who him been"
+    " has more if no out so said what up its about than into them can only other"
+    " time new some could these two may first then do any like my now over such our"
+    " man me even most made after also did many before must through back years where"
+).split()
+
+_tracked: contextvars.ContextVar[list[asyncio.Task]] = contextvars.ContextVar("tracked")
+
+
+class Snowflakes:
+    def __init__(self):
+        self._last = 0
+
+    def __call__(self) -> int:
+        # always increasing, and looks like a real snowflake from around now
+        self._last = max(
+            self._last + 1, (int(time.time() * 1000) - DISCORD_EPOCH) << 22
+        )
+        return self._last
+
+
+def iso_now() -> str:
+    return naff.Timestamp.utcnow().isoformat()
+
+
+def synthetic_stream(args: argparse.Namespace) -> typing.Iterator[dict]:
+    """Makes a stream of guilds, their configs and bullets, and then messages."""
+    rng = random.Random(args.seed)
+    snowflake = Snowflakes()
+    guilds = []
+
+    for _ in range(args.guilds):
+        guild_id = snowflake()
+        player_role = snowflake()
+        bullet_chan = snowflake()
+        channels = [snowflake() for _ in range(args.channels)]
+        users = [
+            (snowflake(), rng.random() < args.player_ratio) for _ in range(args.users)
+        ]
+        enabled = rng.random() < args.enabled_ratio
+
+        yield {
+            "t": "CONFIG",
+            "d": {
+                "guild_id": guild_id,
+                "bullet_chan_id": bullet_chan,
+                "player_role": player_role,
+                "bullets_enabled": enabled,
+            },
+        }
+
+        bullet_names = {}
+        for channel_id in channels:
+            bullet_names[channel_id] = []
+            for i in range(args.bullets_per_channel):
+                name = f"clue{i}x{channel_id % 10000}"
+                bullet_names[channel_id].append(name)
+                yield {
+                    "t": "BULLET",
+                    "d": {
+                        "name": name,
+                        "aliases": [f"hint{i}x{channel_id % 10000}"],
+                        "description": "A Truth Bullet made for benchmarking.",
+                        "channel_id": channel_id,
+                        "guild_id": guild_id,
+                    },
+                }
+
+        yield {
+            "t": "GUILD_CREATE",
+            "d": {
+                "id": str(guild_id),
+                "name": f"Guild {guild_id}",
+                "owner_id": str(users[0][0]),
+                "roles": [
+                    {
+                        "id": str(role_id),
+                        "name": name,
+                        "permissions": "0",
+                        "color": 0,
+                        "position": position,
+                    }
+                    for position, (role_id, name) in enumerate(
+                        ((guild_id, "@everyone"), (player_role, "Player"))
+                    )
+                ],
+                "channels": [
+                    {"id": str(c), "type": 0, "name": f"channel-{c}"}
+                    for c in (bullet_chan, *channels)
+                ],
+                "member_count": len(users),
+                "joined_at": iso_now(),
+                "preferred_locale": "en-US",
+            },
+        }
+        guilds.append((guild_id, player_role, channels, users, bullet_names))
+
+    for _ in range(args.messages):
+        guild_id, player_role, channels, users, bullet_names = rng.choice(guilds)
+        channel_id = rng.choice(channels)
+        user_id, is_player = rng.choice(users)
+
+        words = rng.choices(WORDS, k=rng.randint(3, 20))
+        roll = rng.random()
+        if roll < args.command_ratio:
+            words = ["v!prefixes"]
+        elif roll < args.command_ratio + args.find_ratio:
+            words.insert(
+                rng.randrange(len(words)), rng.choice(bullet_names[channel_id])
+            )
+
+        yield {
+            "t": "MESSAGE_CREATE",
+            "d": {
+                "id": str(snowflake()),
+                "channel_id": str(channel_id),
+                "guild_id": str(guild_id),
+                "author": {
+                    "id": str(user_id),
+                    "username": f"User {user_id}",
+                    "discriminator": "0001",
+                    "avatar": None,
+                },
+                "member": {
+                    "roles": [str(player_role)] if is_player else [],
+                    "joined_at": iso_now(),
+                },
+                "content": " ".join(words),
+                "timestamp": iso_now(),
+                "type": 0,
+                "mentions": [],
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": [],
+            },
+        }
+
+
+class HTTPStub:
+    """Stands in for discord's API, answering every request instantly."""
+
+    def __init__(self):
+        self.requests = 0
+        self._snowflake = Snowflakes()
+
+    async def request(self, route, payload=naff.MISSING, *args, **kwargs):
+        self.requests += 1
+
+        # naff puts ids straight into the path, like /channels/123/messages
+        path = route.path.strip("/").split("/")
+        if route.method == "POST" and path[0] == "channels" and path[2] == "messages":
+            # naff caches and returns the message that was sent
+            return {
+                "id": str(self._snowflake()),
+                "channel_id": path[1],
+                "author": BOT_USER,
+                "content": payload.get("content") or "",
+                "timestamp": iso_now(),
+                "type": 0,
+                "mentions": [],
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": payload.get("embeds") or [],
+            }
+        return None
+
+
+def build_bot(
+    bot_storage: storage.Storage,
+    http: HTTPStub,
+    cache_broker: typing.Optional[broker.Broker] = None,
+    **kwargs,
+):
+    """Creates the bot like main.py does, with anything else given passed on
+    to main.create_bot."""
+    # main.py needs these, but none of them matter here
+    os.environ.setdefault("LOG_FILE_PATH", os.devnull)
+    os.environ.setdefault("BOT_COLOR", "14232643")
+    os.environ.setdefault(
+        "DIRECTORY_OF_FILE", str(Path(__file__).parent.parent / "main.py")
+    )
+    main = importlib.import_module("main")
+
+    bot = main.create_bot(
+        cache_broker=cache_broker or broker.LocalBroker(),
+        bot_storage=bot_storage,
+        **kwargs,
+    )
+    bot._user = naff.NaffUser.from_dict(
+        BOT_USER | {"verified": True, "mfa_enabled": False}, bot
+    )
+    bot.http.request = http.request
+    bot._gather_commands()  # what logging in would usually do
+    bot.errors = []
+
+    async def on_error(source, error, *args, **kwargs):
+        bot.errors.append(error)
+
+    bot.on_error = on_error
+    bot.on_command_error = lambda ctx, error, *args, **kwargs: on_error(ctx, error)
+
+    # tasks made while handling a message are tracked, so we know when it's done
+    queue_task = bot._queue_task
+
+    def tracked_queue_task(*args, **kwargs):
+        task = queue_task(*args, **kwargs)
+        if (tasks := _tracked.get(None)) is not None:
+            tasks.append(task)
+        return task
+
+    bot._queue_task = tracked_queue_task
+    bot._ready.set()  # some things, like command errors, are ignored otherwise
+    return bot
+
+
+async def replay_message(bot: naff.Client, data: dict) -> float:
+    message = bot.cache.place_message_data(data)
+
+    tasks: list[asyncio.Task] = []
+    _tracked.set(tasks)
+
+    start = time.perf_counter()
+    bot.dispatch(naff.events.MessageCreate(message))
+    while pending := [t for t in tasks if not t.done()]:
+        await asyncio.wait(pending)
+    return time.perf_counter() - start
+
+
+async def replay(args: argparse.Namespace, events: typing.Iterable[dict]):
+    bot_storage = storage.MemoryStorage()
+    http = HTTPStub()
+    bot = build_bot(bot_storage, http)
+
+    messages = []
+    for event in events:
+        if event["t"] == "CONFIG":
+            bot_storage.add_config(**event["d"])
+        elif event["t"] == "BULLET":
+            bot_storage.add_bullet(**event["d"])
+        elif event["t"] == "GUILD_CREATE":
+            bot.cache.place_guild_data(event["d"])
+        elif event["t"] == "MESSAGE_CREATE":
+            messages.append(event["d"])
+
+    if args.warmup >= len(messages):
+        raise SystemExit("There has to be more messages than warmup messages.")
+
+    interval = 60 / args.rate if args.rate else 0
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def run(index: int, data: dict):
+        async with limit:
+            latency = await replay_message(bot, data)
+        if index >= args.warmup:
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    runs = []
+    for index, data in enumerate(messages):
+        if interval:
+            await asyncio.sleep(max(start + index * interval - time.perf_counter(), 0))
+        if index == args.warmup:
+            queries_start, requests_start = bot_storage.queries, http.requests
+            measure_start = time.perf_counter()
+        runs.append(asyncio.create_task(run(index, data)))
+    await asyncio.gather(*runs)
+    elapsed = time.perf_counter() - measure_start
+
+    num = len(latencies)
+    percentiles = statistics.quantiles(latencies, n=100) if num > 1 else latencies * 99
+    print(f"Replayed {num} messages ({args.warmup} more as warmup) in {elapsed:.2f}s")
+    print(f"Throughput:      {num / elapsed:.0f} messages/s")
+    print(
+        f"Latency:         p50 {percentiles[49] * 1000:.3f}ms, p99"
+        f" {percentiles[98] * 1000:.3f}ms, max {max(latencies) * 1000:.3f}ms"
+    )
+    print(
+        "Storage queries:"
+        f" {(bot_storage.queries - queries_start) / num:.4f} per message"
+    )
+    print(f"HTTP requests:   {(http.requests - requests_start) / num:.4f} per message")
+    if bot.errors:
+        print(f"Errors:          {len(bot.errors)}, the first being {bot.errors[0]!r}")
+
+
+def read_stream(path: Path) -> typing.Iterator[dict]:
+    with path.open("rb") as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--stream", type=Path, help="replay this stream file")
+    parser.add_argument("--save", type=Path, help="save the synthetic stream here")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=10000,
+        help="messages a minute, or 0 to replay as fast as possible",
+    )
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument(
+        "--warmup", type=int, default=0, help="messages to leave out of the results"
+    )
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--bullets-per-channel", type=int, default=20)
+    parser.add_argument("--enabled-ratio", type=float, default=0.5)
+    parser.add_argument("--player-ratio", type=float, default=0.5)
+    parser.add_argument("--command-ratio", type=float, default=0.02)
+    parser.add_argument("--find-ratio", type=float, default=0.01)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    if args.stream:
+        events = list(read_stream(args.stream))
+    else:
+        events = list(synthetic_stream(args))
+        if args.save:
+            with args.save.open("wb") as f:
+                for event in events:
+                    f.write(orjson.dumps(event) + b"\n")
+
+    asyncio.run(replay(args, events))
+
+
+if __name__ == "__main__":
+    main()
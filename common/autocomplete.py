@@ -0,0 +1,142 @@
+import collections
+import typing
+
+from rapidfuzz import fuzz
+from rapidfuzz import process
+
+if typing.TYPE_CHECKING:
+    import common.bullet_index as bullet_index
+
+# discord won't show more choices than this
+MAX_CHOICES = 25
+
+
+# WRatio is good for whole names, while partial_ratio catches a name
+# that's only been partly typed out so far
+SCORERS: tuple[typing.Callable[..., float], ...] = (fuzz.WRatio, fuzz.partial_ratio)
+SCORE_CUTOFF = 60
+
+
+def score(
+    query: str,
+    lowered: typing.Sequence[str],
+    *,
+    limit: typing.Optional[int] = MAX_CHOICES,
+    scorers: typing.Sequence[typing.Callable[..., float]] = SCORERS,
+    score_cutoff: float = SCORE_CUTOFF,
+) -> list[tuple[int, float]]:
+    """Scores lowercased choices against a lowercased query with every scorer,
+    keeping the best score each choice got from any of them.
+    Returns (index, score) for the best choices, best first. Choices with the same
+    best score are ordered by their total score, so that an exact match beats
+    one that merely contains the query - and after that, they stay in the order
+    they were given in."""
+    # choice index -> its best score so far, and its total score
+    best: dict[int, tuple[float, float]] = {}
+
+    for scorer in scorers:
+        # one pass over the choices in rapidfuzz for each scorer
+        for _, choice_score, index in process.extract(
+            query,
+            lowered,
+            scorer=scorer,
+            processor=None,
+            limit=None,
+            score_cutoff=score_cutoff,
+        ):
+            # one character choices match far too much, unless that's all there is
+            if len(lowered[index]) < 2 and len(query) > 2:
+                continue
+            best_score, total = best.get(index, (0, 0))
+            best[index] = (max(best_score, choice_score), total + choice_score)
+
+    ranked = sorted(
+        best.items(), key=lambda entry: (-entry[1][0], -entry[1][1], entry[0])
+    )
+    return [(index, best_score) for index, (best_score, _) in ranked[:limit]]
+
+
+def rank(query: str, choices: list[str], lowered: list[str]) -> list[str]:
+    """Gets the choices that best match the lowercased query, best first.
+    With no query, that's just the first choices."""
+    if not query:
+        return choices[:MAX_CHOICES]
+
+    # the choices are already lowercased, so no processor is needed
+    return [choices[index] for index, _ in score(query, lowered)]
+
+
+class BulletAutocomplete:
+    """Autocompletes bullet names from the bullet index, so that typing doesn't
+    go to the database once a channel is loaded.
+
+    Recent results are kept per channel and query. They're only used as long as
+    the channel's bullets haven't changed since, so nothing has to invalidate them.
+    """
+
+    def __init__(self, index: "bullet_index.BulletIndex", *, maxsize: int = 2048):
+        self.index = index
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+
+        # (channel id, query) for names, or (channel id, name, query) for aliases
+        # -> (channel bullets, their version, results)
+        self._results: collections.OrderedDict[
+            tuple,
+            tuple["bullet_index.ChannelBullets", int, list[str]],
+        ] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def complete(self, channel_id: int, query: str) -> list[str]:
+        """Gets the names of the bullets in a channel that best match the query."""
+        channel_bullets = await self.index.fetch(channel_id)
+        return self._cached(
+            (channel_id, query.lower()), channel_bullets, lambda: channel_bullets.names
+        )
+
+    async def complete_aliases(
+        self, channel_id: int, name: str, query: str
+    ) -> list[str]:
+        """Gets the aliases of a bullet that best match the query."""
+        channel_bullets = await self.index.fetch(channel_id)
+        if name not in channel_bullets.bullets:
+            return []
+
+        return self._cached(
+            (channel_id, name, query.lower()),
+            channel_bullets,
+            lambda: channel_bullets.aliases(name),
+        )
+
+    def _cached(
+        self,
+        key: tuple,
+        channel_bullets: "bullet_index.ChannelBullets",
+        get_choices: typing.Callable[[], tuple[list[str], list[str]]],
+    ) -> list[str]:
+        if (entry := self._results.get(key)) is not None:
+            cached_bullets, version, results = entry
+            if cached_bullets is channel_bullets and version == channel_bullets.version:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return results
+
+        self.misses += 1
+        results = rank(key[-1], *get_choices())
+
+        self._results[key] = (channel_bullets, channel_bullets.version, results)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+        return results
+
+    def clear(self):
+        self._results.clear()
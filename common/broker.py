@@ -0,0 +1,149 @@
+import abc
+import asyncio
+import logging
+import os
+import socket
+import typing
+
+import asyncpg
+import orjson
+
+# messages look like {"origin": "...", "kind": "config", "guild_id": 123}
+# kind is one of config, bullets, or reset - see cache_sync for what each does
+# the triggers gen_dbs.py installs send these whenever the tables change
+CHANNEL = "ui_cache"
+
+Callback = typing.Callable[[dict], typing.Any]
+logger = logging.getLogger("uibot")
+
+
+def default_origin() -> str:
+    # postgres cuts application names off at 63 characters
+    return f"uibot:{socket.gethostname()}:{os.getpid()}"[:63]
+
+
+class Broker(abc.ABC):
+    """Passes cache invalidation messages between everything using the database,
+    like the bot's processes. Messages are never sent back to where they came from.
+    """
+
+    def __init__(self, origin: typing.Optional[str] = None):
+        self.origin = origin or default_origin()
+        self._callbacks: list[Callback] = []
+
+    def subscribe(self, callback: Callback):
+        self._callbacks.append(callback)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, kind: str, **data):
+        await self._send({"origin": self.origin, "kind": kind} | data)
+
+    @abc.abstractmethod
+    async def _send(self, message: dict):
+        """Sends a message out to every other broker."""
+
+    def _deliver(self, message: dict):
+        if message.get("origin") == self.origin:
+            return
+
+        for callback in self._callbacks:
+            try:
+                callback(message)
+            except Exception:
+                logger.exception(f"Failed to handle cache message {message}.")
+
+
+class LocalHub:
+    """What local brokers that should talk to each other are connected to."""
+
+    def __init__(self):
+        self.brokers: list["LocalBroker"] = []
+
+
+class LocalBroker(Broker):
+    """A broker that only reaches other local brokers in this process.
+    Useful for running several bots in one process, like when testing."""
+
+    def __init__(
+        self, origin: typing.Optional[str] = None, hub: typing.Optional[LocalHub] = None
+    ):
+        super().__init__(origin)
+        self.hub = hub or LocalHub()
+        self.hub.brokers.append(self)
+
+    async def close(self):
+        if self in self.hub.brokers:
+            self.hub.brokers.remove(self)
+
+    async def _send(self, message: dict):
+        # go through json like postgres would, so nothing depends on sharing objects
+        data = orjson.dumps(message)
+        for broker in self.hub.brokers:
+            broker._deliver(orjson.loads(data))
+
+
+class PostgresBroker(Broker):
+    """A broker that uses Postgres's LISTEN/NOTIFY, so it reaches anything
+    connected to the same database."""
+
+    def __init__(self, dsn: str, origin: typing.Optional[str] = None):
+        super().__init__(origin)
+        self.dsn = dsn
+        self._conn: typing.Optional[asyncpg.Connection] = None
+        self._reconnect_task: typing.Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        self._closed = False
+        self._conn = await asyncpg.connect(self.dsn)
+        self._conn.add_termination_listener(self._on_termination)
+        await self._conn.add_listener(CHANNEL, self._on_notification)
+
+    async def close(self):
+        self._closed = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def _send(self, message: dict):
+        if not self._conn or self._conn.is_closed():
+            raise ConnectionError("The broker isn't connected.")
+
+        await self._conn.execute(
+            "SELECT pg_notify($1, $2)", CHANNEL, orjson.dumps(message).decode("utf-8")
+        )
+
+    def _on_notification(self, conn, pid: int, channel: str, payload: str):
+        try:
+            message = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.warning(f"Got an unreadable cache message: {payload}")
+            return
+        self._deliver(message)
+
+    def _on_termination(self, conn):
+        if self._closed:
+            return
+
+        # anything could have changed while we weren't listening
+        self._deliver({"origin": None, "kind": "reset"})
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = 1
+        while not self._closed:
+            try:
+                await self.start()
+            except (OSError, asyncpg.PostgresError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+            else:
+                # and again, since we missed whatever happened while reconnecting
+                self._deliver({"origin": None, "kind": "reset"})
+                return
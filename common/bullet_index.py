@@ -0,0 +1,272 @@
+import asyncio
+import typing
+import weakref
+
+import common.keyword_matcher as keyword_matcher
+import common.models as models
+import common.typo_matcher as typo_matcher
+import common.utils as utils
+
+if typing.TYPE_CHECKING:
+    import common.storage as storage_module
+
+
+class ChannelBullets:
+    """The Truth Bullets of a channel, kept in memory so that messages
+    can be checked against them without going to the database."""
+
+    __slots__ = (
+        "channel_id",
+        "bullets",
+        "version",
+        "_unfound",
+        "_automaton",
+        "_names",
+        "_aliases",
+        "_typos",
+    )
+
+    def __init__(
+        self, channel_id: int, bullets: typing.Iterable[models.TruthBullet] = ()
+    ):
+        self.channel_id = channel_id
+        self.bullets: dict[str, models.TruthBullet] = {}
+        self.version = 0
+        """Goes up whenever a bullet is added, changed, or removed."""
+        self._unfound: dict[int, models.TruthBullet] = {}
+        # only has the lowercased names and aliases of unfound bullets
+        self._automaton: keyword_matcher.KeywordAutomaton[
+            int
+        ] = keyword_matcher.KeywordAutomaton()
+        self._names: typing.Optional[tuple[list[str], list[str]]] = None
+        # bullet name -> its aliases, like with the names above
+        self._aliases: dict[str, tuple[list[str], list[str]]] = {}
+        # like the automaton, but typo tolerant - only made if a guild wants it
+        self._typos: typing.Optional[typo_matcher.TypoMatcher[int]] = None
+
+        for bullet in bullets:
+            self.put(bullet)
+
+    def __len__(self):
+        return len(self.bullets)
+
+    @property
+    def guild_id(self) -> typing.Optional[int]:
+        return next((b.guild_id for b in self.bullets.values()), None)
+
+    @property
+    def unfound(self) -> list[models.TruthBullet]:
+        return list(self._unfound.values())
+
+    @property
+    def names(self) -> tuple[list[str], list[str]]:
+        """The names of every bullet, oldest first, along with the same names
+        lowercased. Only made when first needed, for autocompleting."""
+        if self._names is None:
+            names = [b.name for b in sorted(self.bullets.values(), key=lambda b: b.id)]
+            self._names = (names, [name.lower() for name in names])
+        return self._names
+
+    def aliases(self, name: str) -> typing.Optional[tuple[list[str], list[str]]]:
+        """A bullet's aliases, sorted, along with the same aliases lowercased.
+        Only made when first needed, for autocompleting."""
+        if (aliases := self._aliases.get(name)) is None:
+            if (bullet := self.bullets.get(name)) is None:
+                return None
+
+            sorted_aliases = sorted(bullet.aliases)
+            aliases = self._aliases[name] = (
+                sorted_aliases,
+                [alias.lower() for alias in sorted_aliases],
+            )
+        return aliases
+
+    def put(self, bullet: models.TruthBullet):
+        """Adds or replaces a bullet, re-indexing its triggers."""
+        self.discard(bullet.name)
+        self.bullets[bullet.name] = bullet
+        self.version += 1
+        self._names = None
+
+        if not bullet.found:
+            self._unfound[bullet.id] = bullet
+            keywords = (bullet.name.lower(), *(a.lower() for a in bullet.aliases))
+            self._automaton.add(bullet.id, keywords)
+            if self._typos is not None:
+                self._typos.add(bullet.id, keywords)
+
+    def discard(self, name: str) -> typing.Optional[models.TruthBullet]:
+        self._aliases.pop(name, None)
+        if bullet := self.bullets.pop(name, None):
+            self.version += 1
+            self._names = None
+            if self._unfound.pop(bullet.id, None) is not None:
+                self._automaton.remove(bullet.id)
+                if self._typos is not None:
+                    self._typos.remove(bullet.id)
+        return bullet
+
+    def matches(self, content: str) -> list[models.TruthBullet]:
+        """Returns every unfound bullet whose name or alias is in the content,
+        oldest bullet first."""
+        if not self._unfound:
+            return []
+
+        hits = self._automaton.search(content.lower())
+        return [self._unfound[bullet_id] for bullet_id in sorted(hits)]
+
+    def match(self, content: str) -> typing.Optional[models.TruthBullet]:
+        """Returns the oldest unfound bullet whose name or alias is in the content."""
+        if not self._unfound:
+            return None
+
+        if hits := self._automaton.search(content.lower()):
+            return self._unfound[min(hits)]
+        return None
+
+    def fuzzy_match(self, content: str) -> typing.Optional[models.TruthBullet]:
+        """Like match, but also finds names and aliases that were misspelled a bit.
+        An exact match is always preferred, then the one with the fewest typos,
+        then the oldest."""
+        if bullet := self.match(content):
+            return bullet
+        if not self._unfound:
+            return None
+
+        if self._typos is None:
+            self._typos = typo_matcher.TypoMatcher()
+            for bullet in self._unfound.values():
+                self._typos.add(
+                    bullet.id,
+                    (bullet.name.lower(), *(a.lower() for a in bullet.aliases)),
+                )
+
+        if hits := self._typos.search(content.lower()):
+            best = min(hits, key=lambda bullet_id: (hits[bullet_id], bullet_id))
+            return self._unfound[best]
+        return None
+
+
+class BulletIndex:
+    """A resident, per-channel index of Truth Bullets.
+    Channels are loaded from the database the first time they're needed,
+    and are then kept current by the commands that modify bullets."""
+
+    def __init__(self, storage: "storage_module.Storage"):
+        self.storage = storage
+        self.hits = 0
+        self.misses = 0
+        self._channels: dict[int, ChannelBullets] = {}
+        self._loads: utils.SingleFlight[ChannelBullets] = utils.SingleFlight()
+        # channels that were changed while they were being loaded
+        self._stale: set[int] = set()
+        self._claim_locks: weakref.WeakValueDictionary[
+            int, asyncio.Lock
+        ] = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._channels)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, channel_id: int) -> typing.Optional[ChannelBullets]:
+        """Gets a channel's bullets if they have already been loaded."""
+        return self._channels.get(channel_id)
+
+    async def fetch(self, channel_id: int) -> ChannelBullets:
+        """Gets a channel's bullets, loading them from the database if needed."""
+        if (channel_bullets := self._channels.get(channel_id)) is not None:
+            self.hits += 1
+            return channel_bullets
+
+        self.misses += 1
+        return await self._loads.do(channel_id, lambda: self._load(channel_id))
+
+    def get_bullet(
+        self, channel_id: int, name: str
+    ) -> typing.Optional[models.TruthBullet]:
+        """Gets a bullet by its channel and name, if the channel has been loaded."""
+        if (channel_bullets := self._channels.get(channel_id)) is not None:
+            return channel_bullets.bullets.get(name)
+        return None
+
+    async def fetch_bullet(
+        self, channel_id: int, name: str
+    ) -> typing.Optional[models.TruthBullet]:
+        """Gets a bullet by its channel and name, loading the channel if needed."""
+        channel_bullets = await self.fetch(channel_id)
+        return channel_bullets.bullets.get(name)
+
+    async def _load(self, channel_id: int) -> ChannelBullets:
+        self._stale.discard(channel_id)
+        bullets = await self.storage.bullets_in_channel(channel_id)
+        channel_bullets = ChannelBullets(channel_id, bullets)
+
+        # if the channel changed mid-load, what we read may be outdated
+        # so we use it this once, but let the next message load it again
+        if channel_id in self._stale:
+            self._stale.discard(channel_id)
+        else:
+            self._channels[channel_id] = channel_bullets
+
+        return channel_bullets
+
+    def _mark_changed(self, channel_id: int):
+        if channel_id in self._loads:
+            self._stale.add(channel_id)
+
+    async def claim(self, bullet: models.TruthBullet, finder: int) -> bool:
+        """Marks a bullet as found by the finder, unless someone got to it first.
+        Returns whether the finder was the one who found it."""
+        # the lock makes sure only one message in this process goes for the bullet,
+        # and the conditional update makes sure of the same for everyone else
+        lock = self._claim_locks.setdefault(bullet.id, asyncio.Lock())
+        async with lock:
+            if bullet.found:
+                return False
+
+            if not await self.storage.claim_bullet(bullet.id, finder):
+                # found outside of this process - we don't know by who, so reload
+                self.invalidate_channel(bullet.channel_id)
+                return False
+
+            bullet.found = True
+            bullet.finder = finder
+            self.update(bullet)
+            return True
+
+    def update(self, bullet: models.TruthBullet):
+        """Adds or updates a bullet in the index.
+        Bullets for channels that have not been loaded are ignored,
+        as they will be fetched in full when they are."""
+        self._mark_changed(bullet.channel_id)
+        if (channel_bullets := self._channels.get(bullet.channel_id)) is not None:
+            channel_bullets.put(bullet)
+
+    def remove(self, channel_id: int, name: str) -> typing.Optional[models.TruthBullet]:
+        """Removes a bullet from the index, returning it if its channel was loaded."""
+        self._mark_changed(channel_id)
+        if (channel_bullets := self._channels.get(channel_id)) is not None:
+            return channel_bullets.discard(name)
+        return None
+
+    def invalidate_channel(self, channel_id: int):
+        self._mark_changed(channel_id)
+        self._channels.pop(channel_id, None)
+
+    def invalidate_guild(self, guild_id: int):
+        # we can't know which guild a channel being loaded is in
+        self._stale.update(self._loads.keys())
+        for channel_id in [
+            c.channel_id
+            for c in self._channels.values()
+            if c.guild_id in (guild_id, None)
+        ]:
+            del self._channels[channel_id]
+
+    def clear(self):
+        self._stale.update(self._loads.keys())
+        self._channels.clear()
@@ -0,0 +1,29 @@
+import typing
+
+import common.utils as utils
+
+
+def apply(bot: utils.UIBase, message: dict):
+    """Drops whatever a cache message says is out of date from the bot's caches."""
+    kind = message.get("kind")
+    guild_id: typing.Optional[int] = message.get("guild_id")
+
+    if kind == "config" and guild_id:
+        bot.cached_configs.invalidate(guild_id)
+        bot.prefix_cache.invalidate(guild_id)
+
+    elif kind == "bullets" and guild_id:
+        if channel_id := message.get("channel_id"):
+            bot.bullet_index.invalidate_channel(channel_id)
+        else:
+            bot.bullet_index.invalidate_guild(guild_id)
+        bot.bullet_progress.invalidate(guild_id)
+        bot.guild_search.invalidate(guild_id)
+
+    elif kind == "reset":
+        bot.cached_configs.clear()
+        bot.prefix_cache.clear()
+        bot.bullet_index.clear()
+        bot.bullet_progress.clear()
+        bot.bullet_autocomplete.clear()
+        bot.guild_search.clear()
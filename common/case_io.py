@@ -0,0 +1,215 @@
+import csv
+import io
+import typing
+
+import asyncpg
+import attrs
+import orjson
+
+# a case file is either JSON, like so:
+# {"bullets": [{"channel_id": 123, "name": "...", "description": "...", "aliases": ["..."]}]}
+# or a CSV with a header of channel_id,name,description,aliases
+# where the aliases are seperated by a |
+FORMATS = ("json", "csv")
+CSV_FIELDS = ("channel_id", "name", "description", "aliases")
+
+
+class CaseFileError(Exception):
+    """Raised when a case file can't be used."""
+
+
+@attrs.define
+class CaseBullet:
+    channel_id: int
+    name: str
+    description: str
+    aliases: list[str] = attrs.field(factory=list)
+
+
+def _validate(bullet: CaseBullet, where: str):
+    if not bullet.name:
+        raise CaseFileError(f"{where} has no name.")
+    if len(bullet.name) > 100:
+        raise CaseFileError(f"{where} has a name over 100 characters.")
+    if len(bullet.description) > 3900:
+        raise CaseFileError(f"{where} has a description over 3900 characters.")
+    if len(bullet.aliases) > 5:
+        raise CaseFileError(f"{where} has more than 5 aliases.")
+    if any(len(a) > 40 for a in bullet.aliases):
+        raise CaseFileError(f"{where} has an alias over 40 characters.")
+
+
+def _json_entries(data: str | bytes) -> list[dict]:
+    entries = orjson.loads(data)["bullets"]
+
+    for index, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise CaseFileError(f"Truth Bullet #{index} is not a JSON object.")
+
+        for field in ("name", "description"):
+            if not isinstance(entry.get(field), str):
+                raise CaseFileError(
+                    f"Truth Bullet #{index} needs a `{field}` that is a string."
+                )
+
+        # a string would otherwise be split up into its characters
+        aliases = entry.get("aliases") or []
+        if not isinstance(aliases, list) or not all(
+            isinstance(a, str) for a in aliases
+        ):
+            raise CaseFileError(
+                f"Truth Bullet #{index} needs its `aliases` to be a list of strings."
+            )
+
+    return entries
+
+
+def _csv_entries(data: str | bytes) -> list[dict]:
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+
+    reader = csv.DictReader(io.StringIO(data))
+    entries = []
+
+    for entry in reader:
+        # DictReader fills in missing cells with None, and puts extra ones under None
+        if None in entry.values() or None in entry:
+            raise CaseFileError(
+                f"Line {reader.line_num} of the case file doesn't have exactly"
+                f" {len(reader.fieldnames)} cells."
+            )
+
+        entries.append(
+            entry | {"aliases": [a for a in entry.get("aliases", "").split("|") if a]}
+        )
+
+    return entries
+
+
+def parse_case(data: str | bytes, fmt: str) -> list[CaseBullet]:
+    """Parses and validates a case file."""
+    if fmt not in FORMATS:
+        raise CaseFileError(f"Unknown case file format `{fmt}`.")
+
+    try:
+        entries = _json_entries(data) if fmt == "json" else _csv_entries(data)
+
+        bullets = [
+            CaseBullet(
+                channel_id=int(entry["channel_id"]),
+                name=entry["name"],
+                description=entry["description"],
+                aliases=list(dict.fromkeys(entry.get("aliases") or ())),
+            )
+            for entry in entries
+        ]
+    except (orjson.JSONDecodeError, UnicodeDecodeError, csv.Error) as e:
+        raise CaseFileError(f"The case file could not be read: {e}") from None
+    except (KeyError, TypeError, ValueError):
+        raise CaseFileError(
+            "Every Truth Bullet in the case file needs a channel ID, name, and"
+            " description."
+        ) from None
+
+    seen = set()
+    for index, bullet in enumerate(bullets, start=1):
+        _validate(bullet, f"Truth Bullet #{index} (`{bullet.name}`)")
+        if (bullet.channel_id, bullet.name) in seen:
+            raise CaseFileError(
+                f"Truth Bullet `{bullet.name}` is in the case file more than once for"
+                " the same channel."
+            )
+        seen.add((bullet.channel_id, bullet.name))
+
+    return bullets
+
+
+async def import_case(
+    conn: asyncpg.Connection,
+    guild_id: int,
+    bullets: typing.Sequence[CaseBullet],
+    *,
+    replace: bool = False,
+) -> int:
+    """Imports bullets into a guild in one transaction, returning how many were
+    imported. Bullets that already exist have their description and aliases
+    replaced, and everything imported starts off as unfound. A bullet is never
+    taken from another guild, even if its channel ID says otherwise.
+    If replace is true, the guild's existing bullets are removed first."""
+    async with conn.transaction():
+        if replace:
+            await conn.execute(
+                "DELETE FROM uitruthbullets WHERE guild_id = $1", guild_id
+            )
+
+        # COPY can't handle conflicts by itself, so everything is copied into
+        # a temporary table first and then merged in with a single INSERT
+        await conn.execute(
+            "CREATE TEMPORARY TABLE uicaseimport (channel_id BIGINT, name"
+            " VARCHAR(100), description TEXT, aliases VARCHAR(40)[]) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table(
+            "uicaseimport",
+            records=[(b.channel_id, b.name, b.description, b.aliases) for b in bullets],
+            columns=CSV_FIELDS,
+        )
+        status = await conn.execute(
+            "INSERT INTO uitruthbullets (name, aliases, description, channel_id,"
+            " guild_id, found, finder) SELECT name, aliases, description, channel_id,"
+            " $1, false, 0 FROM uicaseimport ON CONFLICT (channel_id, name) DO UPDATE"
+            " SET aliases = EXCLUDED.aliases, description = EXCLUDED.description,"
+            " found = false, finder = 0 WHERE uitruthbullets.guild_id ="
+            " EXCLUDED.guild_id",
+            guild_id,
+        )
+
+    # the status is in the format of INSERT 0 <rows>
+    return int(status.split()[-1])
+
+
+async def export_case(
+    conn: asyncpg.Connection, guild_id: int, fmt: str
+) -> typing.AsyncIterator[str]:
+    """Streams out a guild's bullets as a case file, a chunk at a time.
+    Whether bullets were found is not exported, so cases can be reused."""
+    if fmt not in FORMATS:
+        raise CaseFileError(f"Unknown case file format `{fmt}`.")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if fmt == "json":
+        yield '{"bullets": ['
+    else:
+        writer.writerow(CSV_FIELDS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    first = True
+    async with conn.transaction():  # cursors only work in transactions
+        async for record in conn.cursor(
+            "SELECT channel_id, name, description, aliases FROM uitruthbullets WHERE"
+            " guild_id = $1 ORDER BY channel_id, id",
+            guild_id,
+        ):
+            if fmt == "json":
+                entry = orjson.dumps(dict(record)).decode("utf-8")
+                yield entry if first else f",{entry}"
+            else:
+                writer.writerow(
+                    (
+                        record["channel_id"],
+                        record["name"],
+                        record["description"],
+                        "|".join(record["aliases"]),
+                    )
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+            first = False
+
+    if fmt == "json":
+        yield "]}"
@@ -0,0 +1,81 @@
+import re
+
+import naff
+
+_word_reg = re.compile(r"\S+")
+
+
+def normalize(word: str) -> str:
+    # the 'replace _ with -' trick from the d.py version
+    return word.replace("-", "_")
+
+
+class CommandIndex:
+    """Maps every path of (normalized) words that leads to a prefixed command
+    to the chain of commands along that path, including aliases and subcommands.
+    Needs to be invalidated whenever the bot's commands change."""
+
+    def __init__(self):
+        self._paths: dict[tuple[str, ...], tuple[naff.PrefixedCommand, ...]] = {}
+        self._max_depth = 0
+        self._built = False
+
+    def __len__(self):
+        return len(self._paths)
+
+    def invalidate(self):
+        self._built = False
+
+    def build(self, commands: dict[str, naff.PrefixedCommand]):
+        self._paths.clear()
+        self._max_depth = 0
+
+        to_visit = [((), (), commands)]
+        while to_visit:
+            path, chain, level = to_visit.pop()
+
+            for name, command in level.items():
+                new_path = path + (normalize(name),)
+                # a real name should always win over a name that was normalized
+                if new_path in self._paths and new_path[-1] != name:
+                    continue
+
+                new_chain = chain + (command,)
+                self._paths[new_path] = new_chain
+                self._max_depth = max(self._max_depth, len(new_path))
+
+                if command.subcommands:
+                    to_visit.append((new_path, new_chain, command.subcommands))
+
+        self._built = True
+
+    def resolve(
+        self, content: str, commands: dict[str, naff.PrefixedCommand]
+    ) -> tuple[tuple[naff.PrefixedCommand, ...], int]:
+        """Resolves the longest chain of enabled commands that the content starts
+        with, returning the chain and where in the content the last command ends.
+        The chain is empty if no command matches."""
+        if not self._built:
+            self.build(commands)
+
+        words = []
+        ends = []
+        for match in _word_reg.finditer(content):
+            words.append(normalize(match.group()))
+            ends.append(match.end())
+            if len(words) == self._max_depth:
+                break
+
+        for depth in range(len(words), 0, -1):
+            if chain := self._paths.get(tuple(words[:depth])):
+                break
+        else:
+            return (), 0
+
+        # a disabled command stops resolution where it is, like it did before
+        for index, command in enumerate(chain):
+            if not command.enabled:
+                chain = chain[:index]
+                break
+
+        return chain, ends[len(chain) - 1] if chain else 0
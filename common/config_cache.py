@@ -0,0 +1,101 @@
+import collections
+import time
+import typing
+
+import common.models as models
+import common.utils as utils
+
+
+class ConfigCache:
+    """A guild-keyed cache of server configs, with LRU and TTL eviction.
+
+    Anything that changes a config should save it and then call `set` with it,
+    so that the cache is always written through and never needs to be re-read
+    from the database outside of a guild's first message or its TTL running out.
+    """
+
+    def __init__(
+        self,
+        loader: typing.Callable[[int], typing.Awaitable[models.Config]],
+        *,
+        maxsize: int = 1000,
+        ttl: float = 600,
+    ):
+        self.loader = loader
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self._loads: utils.SingleFlight[models.Config] = utils.SingleFlight()
+
+        # guild id -> (expiry time, config), with the least recently used first
+        self._entries: collections.OrderedDict[
+            int, tuple[float, models.Config]
+        ] = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, guild_id: int):
+        return self.peek(guild_id) is not None
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def peek(self, guild_id: int) -> typing.Optional[models.Config]:
+        """Gets a config if it's cached, without touching the counters or LRU order."""
+        if entry := self._entries.get(guild_id):
+            if entry[0] > time.monotonic():
+                return entry[1]
+            del self._entries[guild_id]
+        return None
+
+    def get(self, guild_id: int) -> typing.Optional[models.Config]:
+        """Gets a config if it's cached."""
+        if (config := self.peek(guild_id)) is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(guild_id)
+        return config
+
+    async def fetch(self, guild_id: int) -> models.Config:
+        """Gets a config, loading (or creating) it if it isn't cached."""
+        if (config := self.get(guild_id)) is not None:
+            return config
+        return await self.load(guild_id)
+
+    async def load(self, guild_id: int) -> models.Config:
+        """Loads (or creates) a config and caches it, without checking the cache first.
+        """
+        # coalesces concurrent loads so a burst of messages only makes one query
+        return await self._loads.do(guild_id, lambda: self._load(guild_id))
+
+    async def _load(self, guild_id: int) -> models.Config:
+        config = await self.loader(guild_id)
+
+        # something else may have cached the config while we were waiting,
+        # and we want everyone to be working off of the same object
+        if (cached := self.peek(guild_id)) is not None:
+            return cached
+
+        self.set(config)
+        return config
+
+    def set(self, config: models.Config):
+        """Puts a config into the cache, replacing what was there before."""
+        self._entries[config.guild_id] = (time.monotonic() + self.ttl, config)
+        self._entries.move_to_end(config.guild_id)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id: int):
+        self._entries.pop(guild_id, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,159 @@
+import contextlib
+import os
+import time
+import typing
+
+import asyncpg
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+
+import common.metrics as metrics
+import common.models as models
+
+# the queries run for nearly every message that isn't cached yet
+# asyncpg prepares each query the first time a connection runs it, and then
+# reuses that prepared statement as long as the text is exactly the same -
+# so these are kept as fixed strings instead of being rebuilt by tortoise every time
+BULLETS_IN_CHANNEL = "SELECT * FROM uitruthbullets WHERE channel_id = $1 ORDER BY id"
+CONFIG_FOR_GUILD = "SELECT * FROM uiconfig WHERE guild_id = $1"
+FINDERS_IN_GUILD = "SELECT found, finder FROM uitruthbullets WHERE guild_id = $1"
+BULLET_NAMES_IN_GUILD = (
+    "SELECT channel_id, name FROM uitruthbullets WHERE guild_id = $1 ORDER BY id"
+)
+
+
+class CountingConnection(asyncpg.Connection):
+    """A connection that counts the queries it runs towards the bot's metrics."""
+
+    async def execute(self, query: str, *args, timeout: typing.Optional[float] = None):
+        # with arguments, this goes through _execute, which already counts it
+        if not args:
+            metrics.count_query()
+        return await super().execute(query, *args, timeout=timeout)
+
+    async def _execute(self, *args, **kwargs):
+        metrics.count_query()
+        return await super()._execute(*args, **kwargs)
+
+    async def _executemany(self, *args, **kwargs):
+        metrics.count_query()
+        return await super()._executemany(*args, **kwargs)
+
+
+def pool_settings() -> dict:
+    """Gets the connection pool's settings from the environment.
+    DB_POOL_MIN and DB_POOL_MAX are the smallest and largest the pool can be,
+    and DB_POOL_MAX_INACTIVE_LIFETIME is how many seconds an unused connection
+    is kept open for."""
+    return {
+        "minsize": int(os.environ.get("DB_POOL_MIN") or 1),
+        "maxsize": int(os.environ.get("DB_POOL_MAX") or 5),
+        "max_inactive_connection_lifetime": float(
+            os.environ.get("DB_POOL_MAX_INACTIVE_LIFETIME") or 300
+        ),
+    }
+
+
+def tortoise_config(db_url: str, application_name: typing.Optional[str] = None) -> dict:
+    """Makes the config Tortoise.init needs out of a database URL.
+    The application name is what the cache triggers report changes as coming from.
+    """
+    connection = expand_db_url(db_url)
+    connection["credentials"] |= pool_settings()
+    connection["credentials"]["connection_class"] = CountingConnection
+    if application_name:
+        connection["credentials"]["application_name"] = application_name
+
+    return {
+        "connections": {"default": connection},
+        "apps": {
+            "models": {
+                "models": ["common.models"],
+                "default_connection": "default",
+            }
+        },
+    }
+
+
+class PoolMetrics:
+    """Keeps track of how long getting a connection from the pool takes."""
+
+    def __init__(self):
+        self.acquires = 0
+        self.saturated_acquires = 0
+        """How many times every connection was in use when one was asked for."""
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record(self, wait_time: float, saturated: bool):
+        self.acquires += 1
+        self.saturated_acquires += saturated
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def snapshot(self) -> dict:
+        stats = {
+            "acquires": self.acquires,
+            "saturated_acquires": self.saturated_acquires,
+            "avg_wait_ms": self.wait_time / self.acquires * 1000
+            if self.acquires
+            else 0,
+            "max_wait_ms": self.max_wait_time * 1000,
+        }
+
+        # the pool is only made once something needs it
+        if pool := Tortoise.get_connection("default")._pool:
+            stats |= {
+                "size": pool.get_size(),
+                "idle": pool.get_idle_size(),
+                "in_use": pool.get_size() - pool.get_idle_size(),
+                "min_size": pool.get_min_size(),
+                "max_size": pool.get_max_size(),
+            }
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+async def get_pool() -> asyncpg.Pool:
+    # the pool tortoise uses, so everything shares the same connections
+    client = Tortoise.get_connection("default")
+    if not client._pool:
+        await client.create_connection(with_db=True)
+    return client._pool
+
+
+@contextlib.asynccontextmanager
+async def acquire() -> typing.AsyncIterator[asyncpg.Connection]:
+    pool = await get_pool()
+    saturated = pool.get_idle_size() == 0 and pool.get_size() >= pool.get_max_size()
+
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        pool_metrics.record(time.perf_counter() - start, saturated)
+        yield conn
+
+
+async def bullets_in_channel(channel_id: int) -> list[models.TruthBullet]:
+    async with acquire() as conn:
+        records = await conn.fetch(BULLETS_IN_CHANNEL, channel_id)
+    return [models.TruthBullet._init_from_db(**dict(record)) for record in records]
+
+
+async def config_for_guild(guild_id: int) -> typing.Optional[models.Config]:
+    async with acquire() as conn:
+        record = await conn.fetchrow(CONFIG_FOR_GUILD, guild_id)
+    return models.Config._init_from_db(**dict(record)) if record else None
+
+
+async def finders_in_guild(guild_id: int) -> list[tuple[bool, int]]:
+    async with acquire() as conn:
+        records = await conn.fetch(FINDERS_IN_GUILD, guild_id)
+    return [(record["found"], record["finder"]) for record in records]
+
+
+async def bullet_names_in_guild(guild_id: int) -> list[tuple[int, str]]:
+    async with acquire() as conn:
+        records = await conn.fetch(BULLET_NAMES_IN_GUILD, guild_id)
+    return [(record["channel_id"], record["name"]) for record in records]
@@ -0,0 +1,147 @@
+import collections
+import typing
+
+import common.autocomplete as autocomplete
+import common.utils as utils
+
+if typing.TYPE_CHECKING:
+    import common.storage as storage_module
+
+# a bullet is a (channel id, name) pair - names are only unique per channel
+Key = tuple[int, str]
+
+
+def trigrams(text: str) -> set[str]:
+    """Splits lowercased text into every run of three characters in it.
+    The text is padded first, so even one character makes a trigram."""
+    padded = f" {text.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class GuildNames:
+    """Every bullet name in a guild, with a trigram index over them so that
+    searching only has to score names that share something with the query."""
+
+    __slots__ = ("_lowered", "_postings")
+
+    def __init__(self, bullets: typing.Iterable[Key] = ()):
+        self._lowered: dict[Key, str] = {}
+        # trigram -> the bullets whose names have it
+        self._postings: collections.defaultdict[
+            str, set[Key]
+        ] = collections.defaultdict(set)
+
+        for channel_id, name in bullets:
+            self.add(channel_id, name)
+
+    def __len__(self):
+        return len(self._lowered)
+
+    def add(self, channel_id: int, name: str):
+        key = (channel_id, name)
+        if key in self._lowered:
+            return
+
+        self._lowered[key] = name.lower()
+        for gram in trigrams(name):
+            self._postings[gram].add(key)
+
+    def remove(self, channel_id: int, name: str):
+        key = (channel_id, name)
+        if self._lowered.pop(key, None) is None:
+            return
+
+        for gram in trigrams(name):
+            if (keys := self._postings.get(gram)) is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def search(
+        self, query: str, limit: int = 25, max_candidates: int = 250
+    ) -> list[Key]:
+        """Finds the bullets with names most like the query, best first.
+        Only the names sharing the most trigrams with the query are scored,
+        so this stays fast no matter how many bullets there are."""
+        if not query:
+            return list(self._lowered)[:limit]
+
+        shared: collections.Counter[Key] = collections.Counter()
+        for gram in trigrams(query):
+            shared.update(self._postings.get(gram, ()))
+        if not shared:
+            return []
+
+        # ties are broken by name and then channel, so results don't shuffle around
+        candidates = sorted(
+            (key for key, _ in shared.most_common(max_candidates)),
+            key=lambda key: (self._lowered[key], key[0]),
+        )
+        scored = autocomplete.score(
+            query.lower(), [self._lowered[key] for key in candidates], limit=limit
+        )
+        return [candidates[index] for index, _ in scored]
+
+
+class GuildSearch:
+    """Keeps every guild's bullet names in memory for searching them guild-wide,
+    without needing to know which channel a bullet is in.
+
+    A guild's names are loaded from the database when first needed,
+    and the bullet commands keep them current after that."""
+
+    def __init__(self, storage: "storage_module.Storage"):
+        self.storage = storage
+        self._guilds: dict[int, GuildNames] = {}
+        self._loads: utils.SingleFlight[GuildNames] = utils.SingleFlight()
+        # guilds that were changed while they were being loaded
+        self._stale: set[int] = set()
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def get(self, guild_id: int) -> typing.Optional[GuildNames]:
+        return self._guilds.get(guild_id)
+
+    async def fetch(self, guild_id: int) -> GuildNames:
+        if (names := self._guilds.get(guild_id)) is not None:
+            return names
+
+        return await self._loads.do(guild_id, lambda: self._load(guild_id))
+
+    async def search(self, guild_id: int, query: str, limit: int = 25) -> list[Key]:
+        names = await self.fetch(guild_id)
+        return names.search(query, limit)
+
+    async def _load(self, guild_id: int) -> GuildNames:
+        self._stale.discard(guild_id)
+        names = GuildNames(await self.storage.bullet_names_in_guild(guild_id))
+
+        if guild_id in self._stale:
+            self._stale.discard(guild_id)
+        else:
+            self._guilds[guild_id] = names
+
+        return names
+
+    def _mark_changed(self, guild_id: int):
+        if guild_id in self._loads:
+            self._stale.add(guild_id)
+
+    def add(self, guild_id: int, channel_id: int, name: str):
+        self._mark_changed(guild_id)
+        if (names := self._guilds.get(guild_id)) is not None:
+            names.add(channel_id, name)
+
+    def remove(self, guild_id: int, channel_id: int, name: str):
+        self._mark_changed(guild_id)
+        if (names := self._guilds.get(guild_id)) is not None:
+            names.remove(channel_id, name)
+
+    def invalidate(self, guild_id: int):
+        self._mark_changed(guild_id)
+        self._guilds.pop(guild_id, None)
+
+    def clear(self):
+        self._stale.update(self._loads.keys())
+        self._guilds.clear()
@@ -0,0 +1,44 @@
+import attrs
+import naff
+
+import common.models as models
+
+
+@attrs.define(kw_only=False)
+class BulletCandidate(naff.events.BaseEvent):
+    """A message that could have found a Truth Bullet.
+    Dispatched by the bot's message listener, so the checks that led up to it
+    don't have to be repeated."""
+
+    message: naff.Message = attrs.field()
+    config: models.Config = attrs.field()
+    channel_id: int = attrs.field()
+    """The channel to look for Truth Bullets in, which is the parent for threads."""
+
+
+def may_find_bullets(message: naff.Message) -> bool:
+    """Checks the parts of a message that don't need the guild's config."""
+    return bool(
+        message.content
+        and message.guild
+        and not message.author.bot
+        and not message.author.system
+        and message.type == naff.enums.MessageTypes.DEFAULT
+    )
+
+
+def player_can_find(message: naff.Message, config: models.Config) -> bool:
+    return bool(
+        config.bullets_enabled
+        and config.player_role
+        # internal list that has list of ids, faster than using roles property
+        and message.author.has_role(config.player_role)
+    )
+
+
+def bullet_channel_id(message: naff.Message) -> int:
+    return (
+        message.channel.parent_channel.id
+        if isinstance(message.channel, naff.ThreadChannel)
+        else message.channel.id
+    )
@@ -0,0 +1,169 @@
+import collections
+import typing
+
+KeyT = typing.TypeVar("KeyT", bound=typing.Hashable)
+
+
+class KeywordAutomaton(typing.Generic[KeyT]):
+    """An Aho-Corasick automaton for finding many keywords in a text at once.
+
+    Each key (ie. a Truth Bullet) can register several keywords, and a search
+    returns every key that had at least one of its keywords in the text.
+    A search goes over the text once, no matter how many keywords there are.
+
+    Keywords are matched exactly as given - any lowercasing should be done by
+    the caller, both on the keywords and on the text being searched.
+
+    Only the trie's edges are stored, along with each node's failure link, so
+    building and memory are linear in the size of the trie. Searching follows the
+    failure links whenever a node has no edge for the next character, which
+    still adds up to a single pass over the text.
+
+    Removing a key takes effect straight away, and never needs a rebuild.
+    Adding keywords edits the trie in place, and the failure links are then
+    recomputed on the next search - that's linear in the size of the trie,
+    and keys are added much less often than they're searched for."""
+
+    __slots__ = (
+        "_goto",
+        "_own",
+        "_keywords",
+        "_always",
+        "_fail",
+        "_output",
+        "_dead",
+        "_dirty",
+    )
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._own: list[set[KeyT]] = [set()]
+        self._keywords: dict[KeyT, tuple[str, ...]] = {}
+        # keys with an empty keyword, which is in every text
+        self._always: set[KeyT] = set()
+
+        self._fail: list[int] = [0]
+        # the nearest node down a node's failure links that ends a keyword
+        self._output: list[int] = [0]
+        self._dead = 0
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._keywords)
+
+    def __contains__(self, key: KeyT):
+        return key in self._keywords
+
+    def add(self, key: KeyT, keywords: typing.Iterable[str]):
+        """Registers keywords for a key, replacing any the key had before."""
+        if key in self._keywords:
+            self.remove(key)
+
+        keywords = tuple(keywords)
+        self._keywords[key] = keywords
+
+        for keyword in keywords:
+            if not keyword:
+                self._always.add(key)
+                continue
+
+            state = 0
+            for char in keyword:
+                if (next_state := self._goto[state].get(char)) is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._own.append(set())
+                    self._goto[state][char] = next_state
+                state = next_state
+
+            self._own[state].add(key)
+
+        self._dirty = True
+
+    def remove(self, key: KeyT):
+        """Unregisters a key and all of its keywords."""
+        keywords = self._keywords.pop(key, None)
+        if keywords is None:
+            return
+
+        # searches read the keys off of the nodes, so this is all it takes
+        self._always.discard(key)
+        for keyword in keywords:
+            if state := self._find_state(keyword):
+                self._own[state].discard(key)
+                self._dead += len(keyword)
+
+    def search(self, text: str) -> set[KeyT]:
+        """Returns every key with at least one keyword in the text."""
+        if self._dirty:
+            self._build()
+
+        found = set(self._always)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        own = self._own
+
+        state = 0
+        for char in text:
+            while (next_state := goto[state].get(char)) is None and state:
+                state = fail[state]
+            state = next_state or 0
+
+            if own[state]:
+                found.update(own[state])
+            match = output[state]
+            while match:
+                found.update(own[match])
+                match = output[match]
+
+        return found
+
+    def _find_state(self, keyword: str) -> int:
+        state = 0
+        for char in keyword:
+            state = self._goto[state].get(char, 0)
+            if not state:
+                return 0
+        return state
+
+    def _compact(self):
+        """Rebuilds the trie from scratch, dropping nodes left over from removals."""
+        keywords = self._keywords
+        self._goto = [{}]
+        self._own = [set()]
+        self._keywords = {}
+        self._always = set()
+        self._dead = 0
+
+        for key, key_keywords in keywords.items():
+            self.add(key, key_keywords)
+
+    def _build(self):
+        live = sum(len(k) for keywords in self._keywords.values() for k in keywords)
+        if self._dead > live:
+            self._compact()
+
+        goto = self._goto
+        own = self._own
+        fail = [0] * len(goto)
+        output = [0] * len(goto)
+
+        # breadth-first, so a node's failure link is always done before its children's
+        # - the root's children fail to the root, which they already do
+        queue = collections.deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                fail_state = fail[state]
+                while char not in goto[fail_state] and fail_state:
+                    fail_state = fail[fail_state]
+                link = goto[fail_state].get(char, 0)
+
+                fail[next_state] = link
+                output[next_state] = link if own[link] else output[link]
+                queue.append(next_state)
+
+        self._fail = fail
+        self._output = output
+        self._dirty = False
@@ -0,0 +1,240 @@
+import asyncio
+import bisect
+import collections
+import contextvars
+import math
+import typing
+
+from aiohttp import web
+from naff.api.http.http_client import BucketLock
+from naff.api.http.http_client import HTTPClient
+from naff.api.http.route import Route
+
+# in seconds, roughly like prometheus's defaults but with more room at the low end
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Counts observations into buckets, like a prometheus histogram."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: typing.Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is for anything over the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def average(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        return self.buckets[index] if index < len(self.buckets) else self.max
+
+
+class Registry:
+    """Holds all of the bot's metrics."""
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: collections.defaultdict[
+            tuple[str, Labels], float
+        ] = collections.defaultdict(float)
+        self.gauges: dict[str, typing.Callable[[], dict[Labels, float]]] = {}
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: typing.Sequence[float] = LATENCY_BUCKETS,
+        **labels: str,
+    ):
+        key = (name, tuple(labels.items()))
+        if not (histogram := self.histograms.get(key)):
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        self.counters[(name, tuple(labels.items()))] += amount
+
+    def gauge(self, name: str, func: typing.Callable[[], dict[Labels, float]]):
+        """Registers a function that gets a gauge's current values when needed."""
+        self.gauges[name] = func
+
+    def histograms_named(self, name: str) -> list[tuple[Labels, Histogram]]:
+        return sorted(
+            (
+                (labels, histogram)
+                for (h_name, labels), histogram in self.histograms.items()
+                if h_name == name
+            ),
+            key=lambda item: item[0],
+        )
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self.counters.get((name, tuple(labels.items())), 0)
+
+    def clear(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def render_prometheus(self) -> str:
+        """Renders everything in prometheus's text format."""
+        lines = []
+
+        def fmt_labels(labels: Labels, extra: typing.Optional[tuple] = None):
+            labels = labels + ((extra,) if extra else ())
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE uibot_{name} counter")
+            lines.extend(
+                f"uibot_{name}{fmt_labels(labels)} {value}"
+                for (c_name, labels), value in sorted(self.counters.items())
+                if c_name == name
+            )
+
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE uibot_{name} histogram")
+            for labels, histogram in self.histograms_named(name):
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"uibot_{name}_bucket{fmt_labels(labels, ('le', bound))}"
+                        f" {cumulative}"
+                    )
+                lines.append(f"uibot_{name}_sum{fmt_labels(labels)} {histogram.sum}")
+                lines.append(
+                    f"uibot_{name}_count{fmt_labels(labels)} {histogram.count}"
+                )
+
+        for name, func in sorted(self.gauges.items()):
+            lines.append(f"# TYPE uibot_{name} gauge")
+            lines.extend(
+                f"uibot_{name}{fmt_labels(labels)} {value}"
+                for labels, value in func().items()
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# how many queries the event being handled has made so far
+_event_queries: contextvars.ContextVar[list[int]] = contextvars.ContextVar(
+    "event_queries"
+)
+
+
+def count_query():
+    registry.inc("db_queries_total")
+    if (queries := _event_queries.get(None)) is not None:
+        queries[0] += 1
+
+
+def event_context() -> tuple[contextvars.Context, list[int]]:
+    """Makes a context for handling an event in, and the query count it'll use.
+    Tasks made in this context will count their queries towards the event."""
+    queries = [0]
+    context = contextvars.copy_context()
+    context.run(_event_queries.set, queries)
+    return context, queries
+
+
+async def monitor_loop_lag(
+    interval: float = 0.5,
+    on_beat: typing.Optional[typing.Callable[[float], typing.Any]] = None,
+):
+    """Records how late the event loop is in waking up after a sleep.
+    If something is blocking the loop, this goes up.
+    on_beat is called with the lag every time the loop wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0)
+        registry.observe("loop_lag_seconds", lag)
+        if on_beat:
+            on_beat(lag)
+
+
+class MeteredBucketLock(BucketLock):
+    """A bucket lock that counts how long it's held locked for rate limits."""
+
+    async def blind_defer_unlock(self) -> None:
+        registry.inc("rate_limit_wait_seconds_total", self.delta)
+        await super().blind_defer_unlock()
+
+    async def defer_unlock(self, reset_after: typing.Optional[float] = None) -> None:
+        registry.inc("rate_limit_wait_seconds_total", reset_after or self.delta)
+        await super().defer_unlock(reset_after)
+
+
+class MeteredHTTPClient(HTTPClient):
+    """naff's http client, but counting the time every REST call's bucket
+    spends locked for rate limits."""
+
+    def get_ratelimit(self, route: Route) -> BucketLock:
+        lock = super().get_ratelimit(route)
+        # naff only ever caches locks it knows the bucket of, so this is a new
+        # one - anything already cached is left alone, as something may be using it
+        if lock.bucket_hash is None:
+            lock = MeteredBucketLock()
+        return lock
+
+
+async def serve(host: str, port: int) -> web.AppRunner:
+    """Serves the metrics in prometheus's text format at /metrics."""
+
+    async def handle(request: web.Request):
+        return web.Response(text=registry.render_prometheus())
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -9,6 +9,21 @@ def yesno_friendly_str(bool_to_convert):
     return "yes" if bool_to_convert == True else "no"
 
 
+def copy_model(model: Model):
+    """Copies a model that's in the database, so the copy can be changed and
+    saved without touching the original."""
+    # sets are copied too, so changing the copy's doesn't change the original's
+    copied = type(model)(
+        **{
+            name: set(value) if isinstance(value, set) else value
+            for name in model._meta.fields_map
+            if (value := getattr(model, name)) is not None
+        }
+    )
+    copied._saved_in_db = True
+    return copied
+
+
 class SetField(ArrayField, set):
     """A somewhat exploity way of using an array field to store a set."""
 
@@ -26,6 +41,9 @@ class SetField(ArrayField, set):
 class TruthBullet(Model):
     class Meta:
         table = "uitruthbullets"
+        # channel_id and guild_id lookups are served by these as the leading column
+        unique_together = (("channel_id", "name"),)
+        indexes = (("guild_id", "found"),)
 
     id: int = fields.IntField(pk=True)
     name: str = fields.CharField(max_length=100)
@@ -78,7 +96,7 @@ class Config(Model):
         table = "uiconfig"
 
     id: int = fields.IntField(pk=True)
-    guild_id: int = fields.BigIntField()
+    guild_id: int = fields.BigIntField(unique=True)
     bullet_chan_id: int = fields.BigIntField()
     ult_detective_role: int = fields.BigIntField()
     player_role: int = fields.BigIntField()
@@ -86,3 +104,4 @@ class Config(Model):
     prefixes: set[str] = SetField("VARCHAR(40)")
     bullet_default_perms_check: bool = fields.BooleanField(default=True)
     bullet_custom_perm_roles: set[int] = SetField("BIGINT")
+    fuzzy_bullets: bool = fields.BooleanField(default=False)
@@ -0,0 +1,65 @@
+import re
+import typing
+
+
+def mention_prefixes(user_id: int) -> frozenset[str]:
+    return frozenset({f"<@{user_id}> ", f"<@!{user_id}> "})
+
+
+class PrefixMatcher:
+    """Finds which prefix a message starts with, preferring the longest one.
+    Built once for a set of prefixes, and then reused for every message."""
+
+    __slots__ = ("prefixes", "_first_chars", "_regex")
+
+    def __init__(self, prefixes: typing.Iterable[str]):
+        self.prefixes = frozenset(p for p in prefixes if p)
+        # lets most messages be turned away without even running the regex
+        self._first_chars = frozenset(p[0] for p in self.prefixes)
+
+        # alternation tries each prefix in order, so longer ones go first
+        self._regex = re.compile(
+            "|".join(re.escape(p) for p in sorted(self.prefixes, key=len, reverse=True))
+        )
+
+    def match(self, content: str) -> typing.Optional[str]:
+        """Returns the prefix the content starts with, if any."""
+        if not content or content[0] not in self._first_chars:
+            return None
+
+        if match := self._regex.match(content):
+            return match.group()
+        return None
+
+
+class PrefixCache:
+    """Holds a compiled prefix matcher for each guild.
+    Guilds should be invalidated whenever their prefixes change."""
+
+    def __init__(self):
+        self._matchers: dict[typing.Optional[int], PrefixMatcher] = {}
+
+    def __len__(self):
+        return len(self._matchers)
+
+    def get(self, guild_id: typing.Optional[int]) -> typing.Optional[PrefixMatcher]:
+        return self._matchers.get(guild_id)
+
+    def build(
+        self,
+        guild_id: typing.Optional[int],
+        prefixes: typing.Iterable[str],
+        user_id: int,
+    ) -> PrefixMatcher:
+        """Builds and caches the matcher for a guild, or for DMs if there's no guild.
+        Mentioning the bot always works as a prefix."""
+        matcher = self._matchers[guild_id] = PrefixMatcher(
+            mention_prefixes(user_id).union(prefixes)
+        )
+        return matcher
+
+    def invalidate(self, guild_id: typing.Optional[int]):
+        self._matchers.pop(guild_id, None)
+
+    def clear(self):
+        self._matchers.clear()
@@ -0,0 +1,114 @@
+import collections
+import typing
+
+import common.models as models
+import common.utils as utils
+
+if typing.TYPE_CHECKING:
+    import common.storage as storage_module
+
+
+class GuildProgress:
+    """How far along a guild's investigation is."""
+
+    __slots__ = ("total", "unfound", "finders")
+
+    def __init__(self):
+        self.total = 0
+        self.unfound = 0
+        # finder id -> number of bullets they found
+        self.finders: collections.Counter[int] = collections.Counter()
+
+    @property
+    def complete(self) -> bool:
+        return self.total > 0 and self.unfound == 0
+
+    def apply(self, found: bool, finder: int, delta: int = 1):
+        """Counts in (or, with a negative delta, counts out) a bullet's state."""
+        self.total += delta
+        if found:
+            self.finders[finder] += delta
+            if self.finders[finder] <= 0:
+                del self.finders[finder]
+        else:
+            self.unfound += delta
+
+    def best_detectives(self) -> tuple[int, tuple[int, ...]]:
+        """Returns how many bullets the top finders found, and who they are.
+        There can be more than one top finder if there is a tie."""
+        if not self.finders:
+            return 0, ()
+
+        most_found_num = max(self.finders.values())
+        return most_found_num, tuple(
+            p for p, num in self.finders.items() if num == most_found_num
+        )
+
+
+class ProgressTracker:
+    """Keeps count of each guild's found and unfound Truth Bullets in memory.
+
+    The database is still the source of truth - a guild's counts are loaded from
+    it when first needed, and can be reloaded at any time with `reconcile`.
+    After that, the bullet commands keep the counts current."""
+
+    def __init__(self, storage: "storage_module.Storage"):
+        self.storage = storage
+        self._guilds: dict[int, GuildProgress] = {}
+        self._loads: utils.SingleFlight[GuildProgress] = utils.SingleFlight()
+        # guilds that were changed while they were being loaded
+        self._stale: set[int] = set()
+
+    def get(self, guild_id: int) -> typing.Optional[GuildProgress]:
+        return self._guilds.get(guild_id)
+
+    async def fetch(self, guild_id: int) -> GuildProgress:
+        if (progress := self._guilds.get(guild_id)) is not None:
+            return progress
+
+        return await self._loads.do(guild_id, lambda: self._load(guild_id))
+
+    async def reconcile(self, guild_id: int) -> GuildProgress:
+        """Throws away a guild's counts and reloads them from the database."""
+        self.invalidate(guild_id)
+        return await self.fetch(guild_id)
+
+    async def _load(self, guild_id: int) -> GuildProgress:
+        self._stale.discard(guild_id)
+
+        progress = GuildProgress()
+        for found, finder in await self.storage.finders_in_guild(guild_id):
+            progress.apply(found, finder)
+
+        if guild_id in self._stale:
+            self._stale.discard(guild_id)
+        else:
+            self._guilds[guild_id] = progress
+
+        return progress
+
+    def _apply(self, guild_id: int, found: bool, finder: int, delta: int):
+        if guild_id in self._loads:
+            self._stale.add(guild_id)
+        if (progress := self._guilds.get(guild_id)) is not None:
+            progress.apply(found, finder, delta)
+
+    def add(self, bullet: models.TruthBullet):
+        self._apply(bullet.guild_id, bullet.found, bullet.finder, 1)
+
+    def remove(self, bullet: models.TruthBullet):
+        self._apply(bullet.guild_id, bullet.found, bullet.finder, -1)
+
+    def change(self, bullet: models.TruthBullet, was_found: bool, old_finder: int):
+        """Records that a bullet's found state or finder was changed."""
+        self._apply(bullet.guild_id, was_found, old_finder, -1)
+        self._apply(bullet.guild_id, bullet.found, bullet.finder, 1)
+
+    def invalidate(self, guild_id: int):
+        if guild_id in self._loads:
+            self._stale.add(guild_id)
+        self._guilds.pop(guild_id, None)
+
+    def clear(self):
+        self._stale.update(self._loads.keys())
+        self._guilds.clear()
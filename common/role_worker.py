@@ -0,0 +1,97 @@
+import asyncio
+import collections
+import typing
+
+import attrs
+import naff
+from naff.api.http.http_client import BucketLock
+from naff.api.http.http_client import HTTPClient
+from naff.api.http.route import Route
+
+import common.metrics as metrics
+
+
+@attrs.define
+class RoleAssignment:
+    """The outcome of giving a role to several members."""
+
+    given: list[int] = attrs.field(factory=list)
+    """The members who were given the role."""
+    failures: dict[int, Exception] = attrs.field(factory=dict)
+    """The members who couldn't be given the role, and why."""
+    rate_limited_for: float = attrs.field(default=0.0)
+    """How many seconds were spent waiting on rate limits."""
+
+
+def _member_role_route(guild_id: int, member_id: int, role_id: int) -> Route:
+    # the same route naff uses in add_guild_member_role
+    return Route("PUT", f"/guilds/{guild_id}/members/{member_id}/roles/{role_id}")
+
+
+def _watch_bucket(http: HTTPClient, route: Route) -> BucketLock:
+    """Makes naff use a bucket lock we hold onto for a route's next request.
+    naff fills it in with the rate limit headers Discord sends back, which
+    there's no other way to see - naff only holds onto bucket locks weakly,
+    and forgets them as soon as a request is done."""
+    bucket = BucketLock()
+    # ingest_ratelimit is how naff registers a lock for a route
+    http.ingest_ratelimit(route, {"x-ratelimit-bucket": route.rl_bucket}, bucket)
+    return bucket
+
+
+async def add_role_to_members(
+    bot: naff.Client,
+    guild_id: int,
+    role_id: int,
+    member_ids: typing.Iterable[int],
+    reason: naff.Absent[str] = naff.MISSING,
+) -> RoleAssignment:
+    """Gives a role to several members as fast as Discord's rate limits allow.
+
+    Every member has their own route as far as naff is concerned, so naff
+    can't pace these requests by itself. Instead, they're sent in batches:
+    the first request goes out on its own, and then each batch is as big as
+    what Discord said is left in the bucket. Once the bucket is used up,
+    this waits for it to reset before sending the next batch.
+
+    This leans on naff's BucketLock to see the rate limit headers - it's
+    tested against naff's real request handling, so a naff update that changes
+    how that works should fail the tests rather than the bot.
+    """
+    result = RoleAssignment()
+    pending = collections.deque(member_ids)
+
+    async def add_role(member_id: int) -> BucketLock:
+        route = _member_role_route(guild_id, member_id, role_id)
+        bucket = _watch_bucket(bot.http, route)
+
+        try:
+            await bot.http.request(route, reason=reason)
+            result.given.append(member_id)
+        except naff.errors.HTTPException as e:
+            result.failures[member_id] = e
+        return bucket
+
+    # until we know what the bucket's like, only one request goes out
+    batch_size = 1
+    while pending:
+        batch = [pending.popleft() for _ in range(min(batch_size, len(pending)))]
+        buckets = [
+            b
+            for b in await asyncio.gather(*(add_role(m) for m in batch))
+            if b.limit > 0
+        ]
+        if not buckets:
+            continue  # no rate limit headers, so there's nothing to go off of
+
+        # the lowest remaining is from whichever response came back last
+        if (remaining := min(b.remaining for b in buckets)) > 0:
+            batch_size = remaining
+        elif pending:
+            reset_after = max(b.delta for b in buckets)
+            result.rate_limited_for += reset_after
+            metrics.registry.inc("rate_limit_wait_seconds_total", reset_after)
+            await asyncio.sleep(reset_after)
+            batch_size = max(b.limit for b in buckets)
+
+    return result
@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import time
+import typing
+from multiprocessing.synchronize import Lock
+
+logger = logging.getLogger("uibot")
+
+# discord lets one shard per rate limit bucket identify every 5 seconds
+IDENTIFY_INTERVAL = 5.1
+# how long a shard gets to become ready before the next one in its bucket starts
+READY_TIMEOUT = 60
+
+
+def shard_for_guild(guild_id: int, total_shards: int) -> int:
+    # how discord decides which shard gets a guild's events
+    return (guild_id >> 22) % total_shards
+
+
+def split_shards(total_shards: int, processes: int) -> list[tuple[int, ...]]:
+    """Splits the shards as evenly as possible between the processes.
+    There's never more processes than shards."""
+    processes = max(min(processes, total_shards), 1)
+    return [tuple(range(i, total_shards, processes)) for i in range(processes)]
+
+
+class IdentifyGate:
+    """Makes shards take turns identifying with Discord, even across processes.
+
+    Discord puts shards into max_concurrency buckets, and only lets one shard
+    in each bucket identify every 5 seconds. naff only paces the shards of its
+    own process, so the processes share a lock for each bucket, and a shard holds
+    its bucket's lock until it's ready and the 5 seconds are up.
+
+    This only covers starting up - shards that have to identify again later,
+    like after a session can't be resumed, are still only paced by naff."""
+
+    def __init__(
+        self, locks: typing.Sequence[Lock], interval: float = IDENTIFY_INTERVAL
+    ):
+        self.locks = locks
+        self.interval = interval
+
+    @contextlib.asynccontextmanager
+    async def turn(self, shard_id: int, max_concurrency: int):
+        lock = self.locks[shard_id % max_concurrency % len(self.locks)]
+        # polled, so the event loop isn't blocked while another process has it
+        while not lock.acquire(block=False):
+            await asyncio.sleep(0.1)
+
+        start = time.monotonic()
+        try:
+            yield
+            await asyncio.sleep(self.interval - (time.monotonic() - start))
+        finally:
+            lock.release()
+
+
+def run_workers(
+    total_shards: int,
+    processes: int,
+    target: typing.Callable[[tuple[int, ...], int, list[Lock]], typing.Any],
+):
+    """Runs target(shard_ids, total_shards, identify_locks) in a process for each
+    group of shards, and waits for all of them to finish.
+    The identify locks are shared by every process - see IdentifyGate."""
+    # spawn, so no worker inherits anything from this process by accident
+    ctx = multiprocessing.get_context("spawn")
+    # there's never more buckets in use than shards
+    identify_locks = [ctx.Lock() for _ in range(total_shards)]
+
+    workers = [
+        ctx.Process(
+            target=target,
+            args=(shard_ids, total_shards, identify_locks),
+            name=f"shards-{'-'.join(str(s) for s in shard_ids)}",
+        )
+        for shard_ids in split_shards(total_shards, processes)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+            if worker.exitcode:
+                logger.error(f"{worker.name} exited with code {worker.exitcode}.")
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
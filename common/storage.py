@@ -0,0 +1,172 @@
+import abc
+import collections
+import itertools
+import typing
+
+from tortoise.exceptions import IntegrityError
+
+import common.db as db
+import common.models as models
+
+
+def config_defaults() -> dict[str, typing.Any]:
+    return {
+        "bullet_chan_id": 0,
+        "ult_detective_role": 0,
+        "player_role": 0,
+        "bullets_enabled": False,
+        "prefixes": {"v!"},
+        "bullet_default_perms_check": True,
+        "bullet_custom_perm_roles": set(),
+        "fuzzy_bullets": False,
+    }
+
+
+class Storage(abc.ABC):
+    """Where the bot gets the bullets and configs it needs for checking messages.
+    Commands that change bullets or configs still go through the models."""
+
+    def __init__(self):
+        self.queries = 0
+        """How many times the storage has been asked for something."""
+
+    @abc.abstractmethod
+    async def bullets_in_channel(self, channel_id: int) -> list[models.TruthBullet]:
+        """Gets a channel's bullets, in the order they were made."""
+
+    @abc.abstractmethod
+    async def finders_in_guild(self, guild_id: int) -> list[tuple[bool, int]]:
+        """Gets whether each of a guild's bullets was found, and by who."""
+
+    @abc.abstractmethod
+    async def bullet_names_in_guild(self, guild_id: int) -> list[tuple[int, str]]:
+        """Gets the channel and name of each of a guild's bullets."""
+
+    @abc.abstractmethod
+    async def get_config(self, guild_id: int) -> typing.Optional[models.Config]:
+        """Gets a guild's config, if it has one."""
+
+    @abc.abstractmethod
+    async def create_config(self, guild_id: int) -> models.Config:
+        """Makes a guild's config with the defaults, or gets it if it already exists."""
+
+    @abc.abstractmethod
+    async def claim_bullet(self, bullet_id: int, finder: int) -> bool:
+        """Marks a bullet as found, unless it already was.
+        Returns whether the bullet was marked."""
+
+
+class PostgresStorage(Storage):
+    async def bullets_in_channel(self, channel_id: int) -> list[models.TruthBullet]:
+        self.queries += 1
+        return await db.bullets_in_channel(channel_id)
+
+    async def finders_in_guild(self, guild_id: int) -> list[tuple[bool, int]]:
+        self.queries += 1
+        return await db.finders_in_guild(guild_id)
+
+    async def bullet_names_in_guild(self, guild_id: int) -> list[tuple[int, str]]:
+        self.queries += 1
+        return await db.bullet_names_in_guild(guild_id)
+
+    async def get_config(self, guild_id: int) -> typing.Optional[models.Config]:
+        self.queries += 1
+        return await db.config_for_guild(guild_id)
+
+    async def create_config(self, guild_id: int) -> models.Config:
+        self.queries += 1
+        config, _ = await models.Config.get_or_create(
+            guild_id=guild_id, defaults=config_defaults()
+        )
+        return config
+
+    async def claim_bullet(self, bullet_id: int, finder: int) -> bool:
+        self.queries += 1
+        updated = await models.TruthBullet.filter(id=bullet_id, found=False).update(
+            found=True, finder=finder
+        )
+        return bool(updated)
+
+
+class MemoryStorage(Storage):
+    """Keeps everything in memory, with the same rules as the database has -
+    like bullet names being unique per channel. Meant for benchmarks and testing,
+    where there's no database to use."""
+
+    def __init__(self):
+        super().__init__()
+        self._bullets: dict[int, models.TruthBullet] = {}
+        # channel id -> bullet name -> bullet, and guild id -> bullets
+        self._channels: collections.defaultdict[
+            int, dict[str, models.TruthBullet]
+        ] = collections.defaultdict(dict)
+        self._guilds: collections.defaultdict[
+            int, list[models.TruthBullet]
+        ] = collections.defaultdict(list)
+        self._configs: dict[int, models.Config] = {}
+        self._bullet_ids = itertools.count(1)
+        self._config_ids = itertools.count(1)
+
+    def add_bullet(self, **kwargs) -> models.TruthBullet:
+        """Adds a bullet, like TruthBullet.create would."""
+        if kwargs["name"] in self._channels[kwargs["channel_id"]]:
+            raise IntegrityError(
+                "A bullet with this name already exists in this channel."
+            )
+
+        kwargs = {"found": False, "finder": 0} | kwargs
+        bullet = models.TruthBullet(id=next(self._bullet_ids), **kwargs)
+        bullet.aliases = set(bullet.aliases)
+        self._bullets[bullet.id] = bullet
+        self._channels[bullet.channel_id][bullet.name] = bullet
+        self._guilds[bullet.guild_id].append(bullet)
+        return models.copy_model(bullet)
+
+    def add_config(self, guild_id: int, **kwargs) -> models.Config:
+        """Adds a config, using the defaults for anything not given."""
+        if guild_id in self._configs:
+            raise IntegrityError("This guild already has a config.")
+
+        config = models.Config(
+            id=next(self._config_ids),
+            guild_id=guild_id,
+            **(config_defaults() | kwargs),
+        )
+        self._configs[guild_id] = config
+        return models.copy_model(config)
+
+    async def bullets_in_channel(self, channel_id: int) -> list[models.TruthBullet]:
+        self.queries += 1
+        # bullets are only ever added, so they're already in order
+        return [
+            models.copy_model(b) for b in self._channels.get(channel_id, {}).values()
+        ]
+
+    async def finders_in_guild(self, guild_id: int) -> list[tuple[bool, int]]:
+        self.queries += 1
+        return [(b.found, b.finder) for b in self._guilds.get(guild_id, ())]
+
+    async def bullet_names_in_guild(self, guild_id: int) -> list[tuple[int, str]]:
+        self.queries += 1
+        return [(b.channel_id, b.name) for b in self._guilds.get(guild_id, ())]
+
+    async def get_config(self, guild_id: int) -> typing.Optional[models.Config]:
+        self.queries += 1
+        config = self._configs.get(guild_id)
+        return models.copy_model(config) if config else None
+
+    async def create_config(self, guild_id: int) -> models.Config:
+        self.queries += 1
+        if config := self._configs.get(guild_id):
+            return models.copy_model(config)
+        return self.add_config(guild_id)
+
+    async def claim_bullet(self, bullet_id: int, finder: int) -> bool:
+        self.queries += 1
+        bullet = self._bullets.get(bullet_id)
+        if not bullet or bullet.found:
+            return False
+
+        bullet.found = True
+        bullet.finder = finder
+        return True
@@ -0,0 +1,161 @@
+import collections
+import re
+import typing
+
+from rapidfuzz.distance import Levenshtein
+
+KeyT = typing.TypeVar("KeyT", bound=typing.Hashable)
+
+TOKEN_REGEX = re.compile(r"\w+")
+# shorter words are too easy to mistake for each other, so they have to be exact
+MIN_TOKEN_LENGTH = 4
+
+# these bound how much work a single message can cause, however long it is
+MAX_TEXT_LENGTH = 2000
+MAX_TOKENS = 400
+MAX_CANDIDATES = 16
+
+
+def variants(token: str) -> set[str]:
+    """The token, and the token with each of its characters removed.
+    Two words a typo apart share at least one of these."""
+    return {token} | {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+def is_swap(word: str, typed: str) -> bool:
+    """Whether the typed word is the word with two letters next to it swapped."""
+    if len(word) != len(typed):
+        return False
+
+    diffs = [i for i, (a, b) in enumerate(zip(word, typed)) if a != b]
+    return (
+        len(diffs) == 2
+        and diffs[1] == diffs[0] + 1
+        and word[diffs[0]] == typed[diffs[1]]
+        and word[diffs[1]] == typed[diffs[0]]
+    )
+
+
+def typos(word: str, typed: str) -> typing.Optional[int]:
+    """How many typos the typed word has compared to a keyword's word - 0 or 1,
+    or None if it's too far off to count as the same word.
+    Swapping two letters next to each other counts as one typo."""
+    if word == typed:
+        return 0
+    if len(word) < MIN_TOKEN_LENGTH or abs(len(word) - len(typed)) > 1:
+        return None
+    if is_swap(word, typed) or Levenshtein.distance(word, typed, score_cutoff=1) <= 1:
+        return 1
+    return None
+
+
+class TypoMatcher(typing.Generic[KeyT]):
+    """Finds keywords in a text even if they were misspelled a bit.
+
+    A keyword matches a run of words in the text with as many words as it has,
+    where each word is the same or one typo off. Words shorter than
+    MIN_TOKEN_LENGTH have to be exact, and so a word of a keyword on its own
+    never matches the whole keyword.
+
+    Every word in the keywords is indexed by its variants, so that searching only
+    needs to look up the variants of each word in the text to find which keys
+    might be in it. Only those candidates are then checked against the text.
+
+    Like KeywordAutomaton, any lowercasing should be done by the caller."""
+
+    __slots__ = ("_keywords", "_variants")
+
+    def __init__(self):
+        # key -> the words of each of its keywords
+        self._keywords: dict[KeyT, tuple[tuple[str, ...], ...]] = {}
+        # word variant -> keys that have a keyword with that word in it
+        self._variants: collections.defaultdict[
+            str, set[KeyT]
+        ] = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self._keywords)
+
+    def add(self, key: KeyT, keywords: typing.Iterable[str]):
+        """Registers keywords for a key, replacing any the key had before."""
+        if key in self._keywords:
+            self.remove(key)
+
+        self._keywords[key] = tuple(
+            words
+            for keyword in keywords
+            if (words := tuple(TOKEN_REGEX.findall(keyword)))
+        )
+        for variant in self._key_variants(key):
+            self._variants[variant].add(key)
+
+    def remove(self, key: KeyT):
+        for variant in self._key_variants(key):
+            if (keys := self._variants.get(variant)) is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._variants[variant]
+        self._keywords.pop(key, None)
+
+    def _key_variants(self, key: KeyT) -> set[str]:
+        return {
+            variant
+            for words in self._keywords.get(key, ())
+            for word in words
+            if len(word) >= MIN_TOKEN_LENGTH
+            for variant in variants(word)
+        }
+
+    def search(self, text: str) -> dict[KeyT, int]:
+        """Returns every key with a keyword in the text, along with how many typos
+        the closest of its keywords was written with."""
+        if not self._keywords:
+            return {}
+
+        tokens = TOKEN_REGEX.findall(text[:MAX_TEXT_LENGTH])[:MAX_TOKENS]
+        candidates: collections.Counter[KeyT] = collections.Counter()
+
+        for token in set(tokens):
+            # a typo can take a character away from a word
+            if len(token) < MIN_TOKEN_LENGTH - 1:
+                continue
+            for variant in variants(token):
+                if keys := self._variants.get(variant):
+                    candidates.update(keys)
+
+        # (keyword's word, typed word) -> typos, since the same pairs come up a lot
+        compared: dict[tuple[str, str], typing.Optional[int]] = {}
+        results = {}
+
+        for key, _ in candidates.most_common(MAX_CANDIDATES):
+            found = [
+                count
+                for words in self._keywords[key]
+                if (count := self._find(words, tokens, compared)) is not None
+            ]
+            if found:
+                results[key] = min(found)
+        return results
+
+    def _find(
+        self,
+        words: tuple[str, ...],
+        tokens: list[str],
+        compared: dict[tuple[str, str], typing.Optional[int]],
+    ) -> typing.Optional[int]:
+        best = None
+
+        for start in range(len(tokens) - len(words) + 1):
+            total = 0
+            for offset, word in enumerate(words):
+                pair = (word, tokens[start + offset])
+                if pair not in compared:
+                    compared[pair] = typos(*pair)
+                if (count := compared[pair]) is None:
+                    break
+                total += count
+            else:
+                if best is None or total < best:
+                    best = total
+
+        return best
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3.8
+import asyncio
 import collections
 import functools
 import logging
@@ -11,10 +12,22 @@ import naff
 
 import common.models as models
 
+if typing.TYPE_CHECKING:
+    import common.autocomplete as autocomplete
+    import common.broker as broker
+    import common.bullet_index as bullet_index
+    import common.command_index as command_index
+    import common.config_cache as config_cache
+    import common.guild_search as guild_search
+    import common.prefixes as prefixes
+    import common.progress as progress
+    import common.storage as storage_module
+    import common.watchdog as watchdog
+
 
 def bullet_proper_perms() -> typing.Any:
     async def predicate(ctx: naff.PrefixedContext):
-        guild_config = await create_and_or_get(ctx.bot, ctx.guild.id, ctx.message.id)
+        guild_config = await ctx.bot.cached_configs.fetch(ctx.guild.id)
 
         default_perms = False
         if guild_config.bullet_default_perms_check:
@@ -102,18 +115,49 @@ async def msg_to_owner(bot: naff.Client, content, split=True):
         await bot.owner.send(f"{chunk}")
 
 
-async def create_or_get(guild_id: int) -> models.Config:
-    defaults = {
-        "bullet_chan_id": 0,
-        "ult_detective_role": 0,
-        "player_role": 0,
-        "bullets_enabled": False,
-        "prefixes": {"v!"},
-        "bullet_default_perms_check": True,
-        "bullet_custom_perm_roles": set(),
-    }
-    config, _ = await models.Config.get_or_create(guild_id=guild_id, defaults=defaults)
-    return config
+T = typing.TypeVar("T")
+
+
+class SingleFlight(typing.Generic[T]):
+    """Makes concurrent calls for the same key share one in-flight call.
+    Useful for lookups that a burst of messages may all want at once."""
+
+    def __init__(self):
+        self._calls: dict[typing.Hashable, asyncio.Future[T]] = {}
+
+    def __contains__(self, key: typing.Hashable):
+        return key in self._calls
+
+    def __len__(self):
+        return len(self._calls)
+
+    def keys(self):
+        """The keys of the calls currently in flight."""
+        return self._calls.keys()
+
+    async def do(
+        self, key: typing.Hashable, func: typing.Callable[[], typing.Awaitable[T]]
+    ) -> T:
+        """Runs func, or waits on the call already running for the key."""
+        if (call := self._calls.get(key)) is None:
+            call = self._calls[key] = asyncio.ensure_future(func())
+            call.add_done_callback(functools.partial(self._forget, key))
+
+        # shielded so that one waiter being cancelled doesn't cancel it for everyone
+        return await asyncio.shield(call)
+
+    def _forget(self, key: typing.Hashable, call: asyncio.Future[T]):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+async def create_or_get(
+    storage: "storage_module.Storage", guild_id: int
+) -> models.Config:
+    # nearly every guild already has a config, so try the cheaper query first
+    if config := await storage.get_config(guild_id):
+        return config
+    return await storage.create_config(guild_id)
 
 
 def line_split(content: str, split_by=20):
@@ -274,8 +318,16 @@ class Extension(naff.Extension):
 
 
 class UIBase(naff.Client):
-    cached_prefixes: typing.DefaultDict[int, set[str]]
-    cached_configs: naff.utils.TTLCache[int, models.Config]
+    prefix_cache: "prefixes.PrefixCache"
+    command_index: "command_index.CommandIndex"
+    cached_configs: "config_cache.ConfigCache"
+    bullet_index: "bullet_index.BulletIndex"
+    bullet_progress: "progress.ProgressTracker"
+    bullet_autocomplete: "autocomplete.BulletAutocomplete"
+    guild_search: "guild_search.GuildSearch"
+    storage: "storage_module.Storage"
+    broker: "broker.Broker"
+    watchdog: typing.Optional["watchdog.LoopWatchdog"]
     color: naff.Color
 
 
@@ -287,7 +339,7 @@ class InvestigatorContext(naff.InteractionContext):
         if self.guild_config:
             return self.guild_config
 
-        self.guild_config = await create_or_get(int(self.guild_id))
+        self.guild_config = await self.bot.cached_configs.fetch(int(self.guild_id))
         return self.guild_config
 
     async def reply(self, **kwargs):
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import typing
+from pathlib import Path
+
+import attrs
+import naff
+
+import common.utils as utils
+
+logger = logging.getLogger("uibot")
+ROOT = str(Path(__file__).parent.parent)
+
+
+def install_uvloop() -> bool:
+    """Makes asyncio use uvloop, if it's installed. Has to be done before the
+    event loop is made. Returns whether uvloop is being used."""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+
+    uvloop.install()
+    return True
+
+
+def culprit(stack: traceback.StackSummary) -> str:
+    """Works out which line is most likely to blame for a stack -
+    the innermost one in the bot's own code, if there is one."""
+    frame = next(
+        (
+            frame
+            for frame in reversed(stack)
+            if frame.filename.startswith(ROOT) and "site-packages" not in frame.filename
+        ),
+        stack[-1],
+    )
+    return f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} in {frame.name}"
+
+
+@attrs.define
+class Offender:
+    """Something that blocked the event loop, and how badly it did so."""
+
+    where: str
+    stack: str
+    count: int = attrs.field(default=0)
+    total: float = attrs.field(default=0.0)
+    worst: float = attrs.field(default=0.0)
+
+    def record(self, lag: float):
+        self.count += 1
+        self.total += lag
+        self.worst = max(self.worst, lag)
+
+
+class LoopWatchdog:
+    """Finds out what blocks the event loop.
+
+    The loop is expected to beat regularly - see metrics.monitor_loop_lag.
+    A thread watches for the beats, and if one is later than the threshold, it
+    samples what the loop's thread is running right then. Once the loop beats
+    again, the stall is logged with that stack, and the worst offenders are
+    sent to the owner every so often.
+    """
+
+    def __init__(
+        self,
+        bot: naff.Client,
+        threshold: float = 0.25,
+        interval: float = 0.5,
+        report_every: float = 900,
+    ):
+        self.bot = bot
+        self.threshold = threshold
+        self.interval = interval
+        self.report_every = report_every
+        self.offenders: dict[str, Offender] = {}
+
+        self._loop_thread_id: typing.Optional[int] = None
+        self._last_beat = time.monotonic()
+        # the beat a stack was sampled after, and the stack
+        self._sample: typing.Optional[tuple[float, traceback.StackSummary]] = None
+        self._stopped = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._report_task: typing.Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts watching the loop this is called from."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="uibot-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        self._report_task = asyncio.create_task(self._report_loop())
+
+    def stop(self):
+        self._stopped.set()
+        if self._report_task:
+            self._report_task.cancel()
+
+    def beat(self, lag: float):
+        """Called by the loop every interval, with how late it was in doing so."""
+        last_beat, self._last_beat = self._last_beat, time.monotonic()
+        if lag < self.threshold:
+            return
+
+        sample, self._sample = self._sample, None
+        if sample and sample[0] == last_beat:
+            stack = sample[1]
+            where = culprit(stack)
+            formatted = "".join(stack.format())
+        else:
+            # whatever blocked the loop finished before the thread could look
+            where, formatted = "unknown", ""
+
+        if not (offender := self.offenders.get(where)):
+            offender = self.offenders[where] = Offender(where, formatted)
+        offender.record(lag)
+
+        logger.warning(
+            f"The event loop was blocked for {lag:.3f}s, most likely by {where}.\n"
+            + formatted
+        )
+
+    def _watch(self):
+        # runs in its own thread, so it still runs while the loop is blocked
+        poll = min(self.threshold, self.interval) / 2
+        while not self._stopped.wait(poll):
+            last_beat = self._last_beat
+            overdue = time.monotonic() - last_beat - self.interval
+            if overdue < self.threshold or (
+                self._sample and self._sample[0] == last_beat
+            ):
+                continue
+
+            if frame := sys._current_frames().get(self._loop_thread_id):
+                self._sample = (last_beat, traceback.extract_stack(frame))
+
+    def worst_offenders(self, limit: int = 5) -> list[Offender]:
+        return sorted(self.offenders.values(), key=lambda o: o.total, reverse=True)[
+            :limit
+        ]
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_every)
+            if not self.offenders:
+                continue
+
+            offenders = self.worst_offenders()
+            self.offenders.clear()
+
+            report = ["The event loop was blocked by:"]
+            for offender in offenders:
+                report.append(
+                    f"`{offender.where}` - {offender.count} time(s), worst"
+                    f" {offender.worst:.3f}s, {offender.total:.3f}s total"
+                )
+                if offender.stack:
+                    # the innermost frames are the interesting ones
+                    report.append(f"```py\n{offender.stack[-1500:]}\n```")
+
+            try:
+                await utils.msg_to_owner(self.bot, "\n".join(report))
+            except Exception:
+                logger.exception("Failed to report what blocked the event loop.")
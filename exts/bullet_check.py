@@ -1,11 +1,12 @@
 import asyncio
 import collections
 import importlib
-import typing
 
 import naff
 
+import common.ingest as ingest
 import common.models as models
+import common.role_worker as role_worker
 import common.utils as utils
 
 
@@ -16,6 +17,7 @@ class BulletCheck(utils.Extension):
 
     def __init__(self, bot: utils.UIBase):
         self.bot = bot
+        self.role_tasks: set[asyncio.Task] = set()
 
     async def check_for_finish(
         self,
@@ -23,36 +25,27 @@ class BulletCheck(utils.Extension):
         bullet_chan: naff.GuildText,
         guild_config: models.Config,
     ):
-        do_not_find = await models.TruthBullet.filter(guild_id=guild.id, found=False)
-        if do_not_find:
+        progress = await self.bot.bullet_progress.fetch(guild.id)
+        if not progress.complete:
             return
 
-        counter = collections.Counter()
-
-        async for bullet in models.TruthBullet.filter(guild_id=guild.id):
-            counter[bullet.finder] += 1
+        # this only happens once per investigation, so make sure the database agrees
+        progress = await self.bot.bullet_progress.reconcile(guild.id)
+        if not progress.complete:
+            return
 
-        most_found = counter.most_common(None)
-        most_found_num = most_found[0][
-            1
-        ]  # number of truth bullets found by highest person
-        # the next is just fancy code to check for ties and make a list for the top people
-        most_found_people = tuple(p[0] for p in most_found if p[1] == most_found_num)
+        # two finds can both get this far, so the first to get here ends the
+        # investigation before awaiting anything - and the other one stops here
+        current_config = self.bot.cached_configs.peek(guild.id) or guild_config
+        if not current_config.bullets_enabled:
+            return
+        guild_config = models.copy_model(current_config)
+        guild_config.bullets_enabled = False
+        self.bot.cached_configs.set(guild_config)
 
-        if guild_config.ult_detective_role > 0:  # if the role had been specified
-            if ult_detect_role_obj := guild.get_role(guild_config.ult_detective_role):
-                for person_id in most_found_people:
-                    try:  # use an internal method to save on an http request
-                        # we get to skip out on asking for the member, which was... well
-                        # who cares, anyways?
-                        # but dont do this unless you're me
-
-                        await self.bot.http.add_guild_member_role(
-                            guild.id, person_id, ult_detect_role_obj.id
-                        )
-                        await asyncio.sleep(1)  # we don't want to trigger ratelimits
-                    except naff.errors.HTTPException:
-                        continue
+        # the number of truth bullets found by the top people, and the top people
+        # there may be multiple top people if there's a tie
+        most_found_num, most_found_people = progress.best_detectives()
 
         str_builder = collections.deque()
         str_builder.append("**All Truth Bullets have been found.**")
@@ -62,51 +55,63 @@ class BulletCheck(utils.Extension):
 
         await bullet_chan.send("\n".join(str_builder))
 
-        guild_config.bullets_enabled = False
-        await guild_config.save()
-
-    @naff.listen("message_create")
-    async def on_message(self, event: naff.events.MessageCreate):
-        message = event.message
-
-        # if the message is from a bot, from discord, not from a guild, not a default message or a reply, or is empty
-        if (
-            message.author.bot
-            or message.author.system
-            or not message.guild
-            or message.type != naff.enums.MessageTypes.DEFAULT
-            or message.content == ""
-        ):
-            return
+        try:
+            await guild_config.save(update_fields=["bullets_enabled"])
+        except Exception:
+            # so the cache goes back to matching the database
+            self.bot.cached_configs.invalidate(guild.id)
+            raise
 
-        guild_config = self.bot.cached_configs.get(
-            message.id
-        ) or await utils.create_or_get(message.guild.id)
-        self.bot.cached_configs[message.id] = guild_config
-
-        if not (
-            guild_config.bullets_enabled
-            and guild_config.player_role
-            # internal list that has list of ids, faster than using roles property
-            and message.author.has_role(guild_config.player_role)
-        ):
-            return
-
-        bullet_found: typing.Optional[models.TruthBullet] = None
+        if guild_config.ult_detective_role > 0:  # if the role had been specified
+            if ult_detect_role_obj := guild.get_role(guild_config.ult_detective_role):
+                # giving out roles can take a while with a big tie
+                # so it's done in the background, after the announcement
+                task = asyncio.create_task(
+                    self.give_best_detective_role(
+                        guild, bullet_chan, ult_detect_role_obj, most_found_people
+                    )
+                )
+                self.role_tasks.add(task)
+                task.add_done_callback(self.role_tasks.discard)
+
+    async def give_best_detective_role(
+        self,
+        guild: naff.Guild,
+        bullet_chan: naff.GuildText,
+        role: naff.Role,
+        person_ids: tuple[int, ...],
+    ):
+        try:
+            # uses an internal method to save on an http request per person
+            # we get to skip out on asking for the member, which was... well
+            # who cares, anyways?
+            # but dont do this unless you're me
+            result = await role_worker.add_role_to_members(
+                self.bot, guild.id, role.id, person_ids
+            )
 
-        channel_id = (
-            message.channel.parent_channel.id
-            if isinstance(message.channel, naff.ThreadChannel)
-            else message.channel.id
-        )
+            if result.failures:
+                await bullet_chan.send(
+                    f"I couldn't give {role.mention} to: "
+                    + ", ".join(f"<@{person_id}>" for person_id in result.failures),
+                    allowed_mentions=naff.AllowedMentions.none(),
+                )
+        except Exception as e:
+            await utils.error_handle(self.bot, e)
+
+    @naff.listen("bullet_candidate")
+    async def on_bullet_candidate(self, event: ingest.BulletCandidate):
+        # the bot's message listener has already checked that the message
+        # is from a player in a guild with Truth Bullets enabled
+        message = event.message
+        guild_config = event.config
+        channel_id = event.channel_id
 
-        async for bullet in models.TruthBullet.filter(channel_id=channel_id):
-            if (
-                bullet.name.lower() in message.content.lower()
-                or any(a.lower() in message.content.lower() for a in bullet.aliases)
-            ) and not bullet.found:
-                bullet_found = bullet
-                break
+        channel_bullets = await self.bot.bullet_index.fetch(channel_id)
+        if guild_config.fuzzy_bullets:
+            bullet_found = channel_bullets.fuzzy_match(message.content)
+        else:
+            bullet_found = channel_bullets.match(message.content)
 
         if not bullet_found or bullet_found.found:
             return
@@ -120,9 +125,9 @@ class BulletCheck(utils.Extension):
                 " the bot should be able to fix this soon."
             )
 
-        bullet_found.found = True
-        bullet_found.finder = message.author.id
-        await bullet_found.save()
+        if not await self.bot.bullet_index.claim(bullet_found, message.author.id):
+            return  # someone else found it first
+        self.bot.bullet_progress.change(bullet_found, was_found=False, old_finder=0)
 
         await message.reply(embed=embed)
         await bullet_chan.send(embed=embed)
@@ -132,4 +137,6 @@ class BulletCheck(utils.Extension):
 
 def setup(bot):
     importlib.reload(utils)
+    importlib.reload(ingest)
+    importlib.reload(role_worker)
     BulletCheck(bot)
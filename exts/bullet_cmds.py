@@ -1,13 +1,20 @@
 import collections
 import importlib
+import io
 import typing
 
+import aiohttp
 import naff
+from tortoise import Tortoise
+from tortoise.exceptions import IntegrityError
 
+import common.case_io as case_io
 import common.fuzzy as fuzzy
 import common.models as models
 import common.utils as utils
 
+MAX_CASE_FILE_SIZE = 1_000_000
+
 
 class BulletCMDs(utils.Extension):
     """Commands for using and modifying Truth Bullets."""
@@ -46,21 +53,22 @@ class BulletCMDs(utils.Extension):
             )
 
         async with ctx.channel.typing:
-            possible_duplicate = await models.TruthBullet.exists(
-                channel_id=channel.id, name=name
-            )
-            if possible_duplicate:
+            try:
+                bullet = await models.TruthBullet.create(
+                    name=name,
+                    aliases=set(),
+                    description=description,
+                    channel_id=channel.id,
+                    guild_id=ctx.guild.id,
+                    found=False,
+                    finder=0,
+                )
+            except IntegrityError:  # (channel_id, name) is unique
                 raise naff.errors.BadArgument(f"Truth Bullet `{name}` already exists!")
 
-            await models.TruthBullet.create(
-                name=name,
-                aliases=set(),
-                description=description,
-                channel_id=channel.id,
-                guild_id=ctx.guild.id,
-                found=False,
-                finder=0,
-            )
+            self.bot.bullet_index.update(bullet)
+            self.bot.bullet_progress.add(bullet)
+            self.bot.guild_search.add(ctx.guild.id, bullet.channel_id, bullet.name)
 
         await ctx.message.reply("Added Truth Bullet!")
 
@@ -126,26 +134,26 @@ class BulletCMDs(utils.Extension):
         if ctx.custom_id.startswith("ui-modal:add_bullets-"):
             channel_id = int(ctx.custom_id.removeprefix("ui-modal:add_bullets-"))
 
-            possible_duplicate = await models.TruthBullet.exists(
-                channel_id=channel_id,
-                name=ctx.responses["truth_bullet_name"],
-            )
-            if possible_duplicate:
+            try:
+                bullet = await models.TruthBullet.create(
+                    name=ctx.responses["truth_bullet_name"],
+                    aliases=set(),
+                    description=ctx.responses["truth_bullet_desc"],
+                    channel_id=channel_id,
+                    guild_id=ctx.guild.id,
+                    found=False,
+                    finder=0,
+                )
+            except IntegrityError:
                 await ctx.send(
                     f"Truth Bullet `{ctx.responses['truth_bullet_name']}` already"
                     " exists!"
                 )
                 return
 
-            await models.TruthBullet.create(
-                name=ctx.responses["truth_bullet_name"],
-                aliases=set(),
-                description=ctx.responses["truth_bullet_desc"],
-                channel_id=channel_id,
-                guild_id=ctx.guild.id,
-                found=False,
-                finder=0,
-            )
+            self.bot.bullet_index.update(bullet)
+            self.bot.bullet_progress.add(bullet)
+            self.bot.guild_search.add(ctx.guild.id, bullet.channel_id, bullet.name)
 
             await ctx.send(
                 f"Added Truth Bullet `{ctx.responses['truth_bullet_name']}`!"
@@ -185,6 +193,11 @@ class BulletCMDs(utils.Extension):
         ).delete()
 
         if num_deleted > 0:
+            self.bot.guild_search.remove(ctx.guild.id, channel.id, name)
+            if removed := self.bot.bullet_index.remove(channel.id, name):
+                self.bot.bullet_progress.remove(removed)
+            else:  # we don't know what state it was in, so recount later
+                self.bot.bullet_progress.invalidate(ctx.guild.id)
             await ctx.send(f"`{name}` deleted!")
         else:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exists!")
@@ -206,6 +219,9 @@ class BulletCMDs(utils.Extension):
         await ctx.defer()
 
         num_deleted = await models.TruthBullet.filter(guild_id=ctx.guild.id).delete()
+        self.bot.bullet_index.invalidate_guild(ctx.guild.id)
+        self.bot.bullet_progress.invalidate(ctx.guild.id)
+        self.bot.guild_search.invalidate(ctx.guild.id)
 
         # just to give a more clear indication to users
         # technically everything's fine without this
@@ -247,6 +263,97 @@ class BulletCMDs(utils.Extension):
         for chunk in chunks:
             await ctx.send("\n".join(chunk))
 
+    @utils.manage_guild_slash_cmd(
+        "import-bullets", "Imports Truth Bullets from a JSON or CSV case file."
+    )
+    @naff.slash_option(
+        "case_file",
+        "The case file to import Truth Bullets from.",
+        naff.OptionTypes.ATTACHMENT,
+        required=True,
+    )
+    @naff.slash_option(
+        "replace",
+        "Should all of this server's Truth Bullets be removed first?",
+        naff.OptionTypes.BOOLEAN,
+        required=False,
+    )
+    async def import_bullets(
+        self,
+        ctx: naff.InteractionContext,
+        case_file: naff.Attachment,
+        replace: bool = False,
+    ):
+        file_type = case_file.filename.rsplit(".", maxsplit=1)[-1].lower()
+        if file_type not in case_io.FORMATS:
+            raise naff.errors.BadArgument("The case file must be a JSON or CSV file.")
+        if case_file.size > MAX_CASE_FILE_SIZE:
+            raise naff.errors.BadArgument("The case file must be under 1 MB.")
+
+        await ctx.defer()
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(case_file.url) as resp:
+                data = await resp.read()
+
+        try:
+            bullets = case_io.parse_case(data, file_type)
+        except case_io.CaseFileError as e:
+            raise naff.errors.BadArgument(str(e)) from None
+
+        if not bullets:
+            raise naff.errors.BadArgument("There's no Truth Bullets in that case file!")
+
+        for channel_id in {b.channel_id for b in bullets}:
+            channel = ctx.guild.get_channel(channel_id)
+            if not channel:
+                raise naff.errors.BadArgument(
+                    f"Channel `{channel_id}` is not in this server!"
+                )
+            utils.valid_channel_check(ctx, channel)
+
+        async with Tortoise.get_connection("default").acquire_connection() as conn:
+            num_imported = await case_io.import_case(
+                conn, ctx.guild.id, bullets, replace=replace
+            )
+
+        self.bot.bullet_index.invalidate_guild(ctx.guild.id)
+        self.bot.bullet_progress.invalidate(ctx.guild.id)
+        self.bot.guild_search.invalidate(ctx.guild.id)
+
+        await ctx.send(f"Imported {num_imported} Truth Bullets!")
+
+    @utils.manage_guild_slash_cmd(
+        "export-bullets", "Exports this server's Truth Bullets as a case file."
+    )
+    @naff.slash_option(
+        "file_type",
+        "The type of case file to export as. Defaults to JSON.",
+        naff.OptionTypes.STRING,
+        required=False,
+        choices=[
+            naff.SlashCommandChoice("JSON", "json"),  # type: ignore
+            naff.SlashCommandChoice("CSV", "csv"),  # type: ignore
+        ],
+    )
+    async def export_bullets(
+        self, ctx: naff.InteractionContext, file_type: str = "json"
+    ):
+        await ctx.defer()
+
+        if not await models.TruthBullet.exists(guild_id=ctx.guild.id):
+            raise utils.CustomCheckFailure("There's no Truth Bullets for this server!")
+
+        case_file = io.BytesIO()
+        async with Tortoise.get_connection("default").acquire_connection() as conn:
+            async for chunk in case_io.export_case(conn, ctx.guild.id, file_type):
+                case_file.write(chunk.encode("utf-8"))
+        case_file.seek(0)
+
+        await ctx.send(
+            file=naff.File(case_file, file_name=f"truth_bullets.{file_type}")
+        )
+
     @utils.manage_guild_slash_cmd(
         "bullet-info", "Lists all information about a Truth Bullet."
     )
@@ -275,9 +382,7 @@ class BulletCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
 
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
@@ -290,6 +395,35 @@ class BulletCMDs(utils.Extension):
     async def _bullet_info_autocomplete(self, ctx: naff.AutocompleteContext, **kwargs):
         return await fuzzy.autocomplete_bullets(ctx, **kwargs)
 
+    @utils.manage_guild_slash_cmd(
+        "find-bullet", "Finds which channels have a Truth Bullet with a name."
+    )
+    @naff.slash_option(
+        "name",
+        "The name of the Truth Bullet.",
+        naff.OptionTypes.STRING,
+        required=True,
+        autocomplete=True,
+    )
+    async def find_bullet(self, ctx: naff.InteractionContext, name: str):
+        await ctx.defer()
+
+        matches = await self.bot.guild_search.search(ctx.guild.id, name, limit=10)
+        if not matches:
+            raise naff.errors.BadArgument(f"No Truth Bullets are named like `{name}`!")
+
+        str_builder = [f"Truth Bullets named like `{name}`:"]
+        str_builder.extend(
+            f"`{bullet_name}` in <#{channel_id}>" for channel_id, bullet_name in matches
+        )
+        await ctx.send(
+            "\n".join(str_builder), allowed_mentions=utils.deny_mentions(ctx.author)
+        )
+
+    @find_bullet.autocomplete("name")
+    async def _find_bullet_autocomplete(self, ctx: naff.AutocompleteContext, **kwargs):
+        return await fuzzy.autocomplete_bullets(ctx, **kwargs)
+
     @naff.prefixed_command(name="edit_bullet")
     @utils.bullet_proper_perms()
     async def edit_bullet_legacy(
@@ -315,14 +449,14 @@ class BulletCMDs(utils.Extension):
             )
 
         async with ctx.channel.typing:
-            possible_bullet = await models.TruthBullet.get_or_none(
+            updated = await models.TruthBullet.filter(
                 channel_id=channel.id, name=name
-            )
-            if possible_bullet is None:
+            ).update(description=description)
+            if not updated:
                 raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
 
-            possible_bullet.description = description
-            await possible_bullet.save()
+            if cached := self.bot.bullet_index.get_bullet(channel.id, name):
+                cached.description = description
 
         await ctx.message.reply("Edited Truth Bullet!")
 
@@ -352,9 +486,7 @@ class BulletCMDs(utils.Extension):
         channel: naff.GuildText,
         name: str,
     ):
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
 
@@ -387,15 +519,15 @@ class BulletCMDs(utils.Extension):
             )
             channel_id = int(channel_id)
 
-            possible_bullet = await models.TruthBullet.get_or_none(
+            updated = await models.TruthBullet.filter(
                 channel_id=channel_id, name=name
-            )
-            if possible_bullet is None:
+            ).update(description=ctx.responses["description"])
+            if not updated:
                 await ctx.send(f"Truth Bullet `{name}` no longer exists!")
                 return
 
-            possible_bullet.description = ctx.responses["description"]
-            await possible_bullet.save()
+            if cached := self.bot.bullet_index.get_bullet(channel_id, name):
+                cached.description = ctx.responses["description"]
 
             await ctx.send(f"Edited Truth Bullet `{ctx.responses['description']}`!")
 
@@ -422,18 +554,22 @@ class BulletCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
 
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
         if not possible_bullet.found:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` has not been found!")
 
-        possible_bullet.found = False
-        possible_bullet.finder = 0
-        await possible_bullet.save()
+        # the cached bullet is only replaced once the change is saved
+        bullet = models.copy_model(possible_bullet)
+        bullet.found = False
+        bullet.finder = 0
+        await bullet.save(update_fields=["found", "finder"])
+        self.bot.bullet_index.update(bullet)
+        self.bot.bullet_progress.change(
+            bullet, was_found=True, old_finder=possible_bullet.finder
+        )
 
         await ctx.send("Truth Bullet un-found!")
 
@@ -479,15 +615,20 @@ class BulletCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
 
-        possible_bullet.found = True
-        possible_bullet.finder = user.id
-        await possible_bullet.save()
+        bullet = models.copy_model(possible_bullet)
+        bullet.found = True
+        bullet.finder = user.id
+        await bullet.save(update_fields=["found", "finder"])
+        self.bot.bullet_index.update(bullet)
+        self.bot.bullet_progress.change(
+            bullet,
+            was_found=possible_bullet.found,
+            old_finder=possible_bullet.finder,
+        )
 
         await ctx.send("Truth Bullet overrided and found!")
 
@@ -538,9 +679,7 @@ class BulletCMDs(utils.Extension):
 
         await ctx.defer()
 
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
 
@@ -554,8 +693,10 @@ class BulletCMDs(utils.Extension):
                 f"Alias `{alias}` already exists for this Truth Bullet!"
             )
 
-        possible_bullet.aliases.add(alias)
-        await possible_bullet.save()
+        bullet = models.copy_model(possible_bullet)
+        bullet.aliases.add(alias)
+        await bullet.save(update_fields=["aliases"])
+        self.bot.bullet_index.update(bullet)
 
         await ctx.send(f"Alias `{alias}` added to Truth Bullet!")
 
@@ -599,20 +740,20 @@ class BulletCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        possible_bullet = await models.TruthBullet.get_or_none(
-            channel_id=channel.id, name=name
-        )
+        possible_bullet = await self.bot.bullet_index.fetch_bullet(channel.id, name)
         if possible_bullet is None:
             raise naff.errors.BadArgument(f"Truth Bullet `{name}` does not exist!")
 
+        bullet = models.copy_model(possible_bullet)
         try:
-            possible_bullet.aliases.remove(alias)
+            bullet.aliases.remove(alias)
         except KeyError:
             raise naff.errors.BadArgument(
                 f"Alias `{alias}` does not exists for this Truth Bullet!"
             )
 
-        await possible_bullet.save()
+        await bullet.save(update_fields=["aliases"])
+        self.bot.bullet_index.update(bullet)
 
         await ctx.send(f"Alias `{alias}` removed from Truth Bullet!")
 
@@ -622,7 +763,7 @@ class BulletCMDs(utils.Extension):
     ):
         return await fuzzy.autocomplete_bullets(ctx, **kwargs)
 
-    @add_alias.autocomplete("alias")
+    @remove_alias.autocomplete("alias")
     async def _remove_alias_alias_autocomplete(
         self, ctx: naff.AutocompleteContext, **kwargs
     ):
@@ -632,4 +773,5 @@ class BulletCMDs(utils.Extension):
 def setup(bot):
     importlib.reload(utils)
     importlib.reload(fuzzy)
+    importlib.reload(case_io)
     BulletCMDs(bot)
@@ -34,6 +34,8 @@ class BulletConfigCMDs(utils.Extension):
 
         str_builder = [
             f"Truth Bullets: {utils.toggle_friendly_str(guild_config.bullets_enabled)}",
+            "Fuzzy Truth Bullets:"
+            f" {utils.toggle_friendly_str(guild_config.fuzzy_bullets)}",
             "Truth Bullet channel:"
             f" {f'<#{guild_config.bullet_chan_id}>' if guild_config.bullet_chan_id > 0 else 'None'}",
             "",
@@ -76,9 +78,11 @@ class BulletConfigCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        guild_config = await ctx.fetch_config()
+        # changes are made to a copy, so the cache is only changed once they're saved
+        guild_config = models.copy_model(await ctx.fetch_config())
         guild_config.bullet_chan_id = channel.id
-        await guild_config.save()
+        await guild_config.save(update_fields=["bullet_chan_id"])
+        self.bot.cached_configs.set(guild_config)
 
         await ctx.send(f"Truth Bullet channel set to {channel.mention}!")
 
@@ -112,9 +116,10 @@ class BulletConfigCMDs(utils.Extension):
 
         await ctx.defer()
 
-        guild_config = await ctx.fetch_config()
+        guild_config = models.copy_model(await ctx.fetch_config())
         guild_config.ult_detective_role = role.id if role else 0
-        await guild_config.save()
+        await guild_config.save(update_fields=["ult_detective_role"])
+        self.bot.cached_configs.set(guild_config)
 
         if role:
             await ctx.send(
@@ -136,9 +141,10 @@ class BulletConfigCMDs(utils.Extension):
     async def set_player_role(self, ctx: utils.InvestigatorContext, role: naff.Role):
         await ctx.defer()
 
-        guild_config = await ctx.fetch_config()
+        guild_config = models.copy_model(await ctx.fetch_config())
         guild_config.player_role = role.id
-        await guild_config.save()
+        await guild_config.save(update_fields=["player_role"])
+        self.bot.cached_configs.set(guild_config)
 
         await ctx.send(
             f"Player role set to {role.mention}!",
@@ -172,20 +178,51 @@ class BulletConfigCMDs(utils.Extension):
     ):
         await ctx.defer()
 
-        guild_config = await ctx.fetch_config()
+        guild_config = models.copy_model(await ctx.fetch_config())
         if (
             not guild_config.bullets_enabled and toggle
         ):  # if truth bullets will be enabled by this
             self.enable_check(guild_config)
 
         guild_config.bullets_enabled = toggle
-        await guild_config.save()
+        await guild_config.save(update_fields=["bullets_enabled"])
+        self.bot.cached_configs.set(guild_config)
 
         await ctx.send(
             "Truth Bullets turned"
             f" {utils.toggle_friendly_str(guild_config.bullets_enabled)}!"
         )
 
+    @config.subcommand(
+        sub_cmd_name="fuzzy-bullets",
+        sub_cmd_description=(
+            "Turns on or off finding Truth Bullets even if they're misspelled a bit."
+        ),
+    )
+    @naff.slash_option(
+        "toggle",
+        "Should fuzzy Truth Bullets be on or off?",
+        naff.OptionTypes.INTEGER,
+        required=True,
+        choices=[naff.SlashCommandChoice("off", 0), naff.SlashCommandChoice("on", 1)],  # type: ignore
+    )
+    async def toggle_fuzzy_bullets(
+        self,
+        ctx: utils.InvestigatorContext,
+        toggle: typing.Annotated[bool, lambda ctx, arg: arg == 1],
+    ):
+        await ctx.defer()
+
+        guild_config = models.copy_model(await ctx.fetch_config())
+        guild_config.fuzzy_bullets = toggle
+        await guild_config.save(update_fields=["fuzzy_bullets"])
+        self.bot.cached_configs.set(guild_config)
+
+        await ctx.send(
+            "Fuzzy Truth Bullets turned"
+            f" {utils.toggle_friendly_str(guild_config.fuzzy_bullets)}!"
+        )
+
 
 def setup(bot):
     importlib.reload(utils)
@@ -13,6 +13,9 @@ from naff.ext import paginators
 from naff.ext.debug_extension.utils import debug_embed
 from naff.ext.debug_extension.utils import get_cache_state
 
+import common.db as db
+import common.metrics as metrics
+
 log = logging.getLogger("uibot")
 
 
@@ -57,6 +60,65 @@ class DebugExtension(naff.Extension):
         e.description = f"```prolog\n{get_cache_state(self.bot)}\n```"
         await ctx.reply(embeds=[e])
 
+    @debug.subcommand(aliases=["pool"])
+    async def pool_info(self, ctx: naff.PrefixedContext):
+        """Get information about the database connection pool."""
+        e = debug_embed("Database Pool")
+
+        stats = {
+            k.replace("_", " ").title(): round(v, 2) if isinstance(v, float) else v
+            for k, v in db.pool_metrics.snapshot().items()
+        }
+        width = max(len(k) for k in stats)
+        stats_str = "\n".join(f"{k:<{width}} {v}" for k, v in stats.items())
+
+        e.description = f"```prolog\n{stats_str}\n```"
+        await ctx.reply(embeds=[e])
+
+    @debug.subcommand(aliases=["metrics"])
+    async def metrics_info(self, ctx: naff.PrefixedContext):
+        """Get how long the bot's listeners and commands take, and what they use."""
+        e = debug_embed("Metrics")
+        registry = metrics.registry
+
+        # the last label is the listener's or command's name
+        rows = [f"{'Name':<24} {'Count':>7} {'Avg ms':>8} {'P50 ms':>8} {'P99 ms':>8}"]
+        for name in ("listener_seconds", "command_seconds"):
+            rows.extend(
+                f"{labels[-1][1]:<24} {hist.count:>7} {hist.average * 1000:>8.2f}"
+                f" {hist.quantile(0.5) * 1000:>8.2f} {hist.quantile(0.99) * 1000:>8.2f}"
+                for labels, hist in registry.histograms_named(name)
+            )
+        rows_str = "\n".join(rows)
+        e.description = f"```prolog\n{rows_str}\n```"
+
+        queries = "\n".join(
+            f"{labels[-1][1]:<24} {hist.average:>6.2f} avg,"
+            f" {hist.quantile(0.99):>3.0f} p99"
+            for labels, hist in registry.histograms_named("event_db_queries")
+        )
+        e.add_field(
+            "DB Queries Per Event",
+            f"```prolog\n{queries}\n```" if queries else "Nothing yet.",
+        )
+
+        lag = next(iter(registry.histograms_named("loop_lag_seconds")), None)
+        other = {
+            "Config Cache Hits": f"{self.bot.cached_configs.hit_ratio:.2%}",
+            "Bullet Cache Hits": f"{self.bot.bullet_index.hit_ratio:.2%}",
+            "DB Queries": f"{registry.counter('db_queries_total'):.0f}",
+            "Rate Limit Wait": (
+                f"{registry.counter('rate_limit_wait_seconds_total'):.2f}s"
+            ),
+            "Loop Lag P99": f"{lag[1].quantile(0.99) * 1000:.2f}ms" if lag else "N/A",
+            "Loop Lag Max": f"{lag[1].max * 1000:.2f}ms" if lag else "N/A",
+        }
+        width = max(len(k) for k in other)
+        other_str = "\n".join(f"{k:<{width}} {v}" for k, v in other.items())
+        e.add_field("Other", f"```prolog\n{other_str}\n```")
+
+        await ctx.reply(embeds=[e])
+
     @debug.subcommand()
     async def shutdown(self, ctx: naff.PrefixedContext) -> None:
         """Shuts down the bot."""
@@ -3,6 +3,7 @@ import time
 
 import naff
 
+import common.models as models
 import common.utils as utils
 
 
@@ -105,9 +106,7 @@ class OtherCMDs(utils.Extension):
         """
 
         async with ctx.channel.typing:
-            guild_config = self.bot.cached_configs.get(
-                ctx.message.id
-            ) or await utils.create_or_get(ctx.guild.id)
+            guild_config = await self.bot.cached_configs.fetch(ctx.guild.id)
 
         if prefixes := tuple(f"`{p}`" for p in guild_config.prefixes):
             await ctx.reply(
@@ -135,9 +134,10 @@ class OtherCMDs(utils.Extension):
             )
 
         async with ctx.channel.typing:
-            guild_config = self.bot.cached_configs.get(
-                ctx.message.id
-            ) or await utils.create_or_get(ctx.guild.id)
+            # changes are made to a copy, so the cache is only changed once they're saved
+            guild_config = models.copy_model(
+                await self.bot.cached_configs.fetch(ctx.guild.id)
+            )
             if len(guild_config.prefixes) >= 10:
                 raise utils.CustomCheckFailure(
                     "You have too many prefixes! You can only have up to 10 prefixes."
@@ -147,8 +147,9 @@ class OtherCMDs(utils.Extension):
                 raise naff.errors.BadArgument("The server already has this prefix!")
 
             guild_config.prefixes.add(prefix)
-            ctx.bot.cached_prefixes[ctx.guild.id].add(prefix)
-            await guild_config.save()
+            await guild_config.save(update_fields=["prefixes"])
+            self.bot.cached_configs.set(guild_config)
+            self.bot.prefix_cache.invalidate(ctx.guild.id)
 
         await ctx.reply(f"Added `{prefix}`!")
 
@@ -161,12 +162,13 @@ class OtherCMDs(utils.Extension):
 
         async with ctx.channel.typing:
             try:
-                guild_config = self.bot.cached_configs.get(
-                    ctx.message.id
-                ) or await utils.create_or_get(ctx.guild.id)
+                guild_config = models.copy_model(
+                    await self.bot.cached_configs.fetch(ctx.guild.id)
+                )
                 guild_config.prefixes.remove(prefix)
-                self.bot.cached_prefixes[ctx.guild.id].remove(prefix)
-                await guild_config.save()
+                await guild_config.save(update_fields=["prefixes"])
+                self.bot.cached_configs.set(guild_config)
+                self.bot.prefix_cache.invalidate(ctx.guild.id)
 
             except KeyError:
                 raise naff.errors.BadArgument(
@@ -1,5 +1,12 @@
 # use this to generate db if you need to
+# existing databases made before the indexes were added should run
+# this with --migrate-indexes once
+# existing databases made before the cache triggers were added should run
+# this with --install-triggers once
+# existing databases made before fuzzy Truth Bullets were added should run
+# this with --add-fuzzy-bullets once
 import os
+import sys
 
 import asyncpg
 import orjson
@@ -9,12 +16,79 @@ from tortoise import Tortoise
 
 load_dotenv()
 
+# these tell running bots (see common/broker.py) when their caches are outdated
+# the origin is the application name, so bots can ignore their own changes
+TRIGGERS = """
+CREATE OR REPLACE FUNCTION ui_notify_config() RETURNS trigger AS $$
+DECLARE
+    config uiconfig;
+BEGIN
+    IF TG_OP = 'DELETE' THEN config := OLD; ELSE config := NEW; END IF;
+    PERFORM pg_notify('ui_cache', json_build_object(
+        'origin', current_setting('application_name'),
+        'kind', 'config',
+        'guild_id', config.guild_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ui_notify_bullets() RETURNS trigger AS $$
+BEGIN
+    -- postgres drops duplicate notifications in a transaction
+    -- so a big import only sends one per channel
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM pg_notify('ui_cache', json_build_object(
+            'origin', current_setting('application_name'),
+            'kind', 'bullets',
+            'guild_id', OLD.guild_id,
+            'channel_id', OLD.channel_id
+        )::text);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM pg_notify('ui_cache', json_build_object(
+            'origin', current_setting('application_name'),
+            'kind', 'bullets',
+            'guild_id', NEW.guild_id,
+            'channel_id', NEW.channel_id
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ui_notify_reset() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('ui_cache', json_build_object(
+        'origin', current_setting('application_name'),
+        'kind', 'reset'
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ui_config_changed ON uiconfig;
+CREATE TRIGGER ui_config_changed AFTER INSERT OR UPDATE OR DELETE ON uiconfig
+    FOR EACH ROW EXECUTE PROCEDURE ui_notify_config();
+DROP TRIGGER IF EXISTS ui_config_truncated ON uiconfig;
+CREATE TRIGGER ui_config_truncated AFTER TRUNCATE ON uiconfig
+    FOR EACH STATEMENT EXECUTE PROCEDURE ui_notify_reset();
+
+DROP TRIGGER IF EXISTS ui_bullets_changed ON uitruthbullets;
+CREATE TRIGGER ui_bullets_changed AFTER INSERT OR UPDATE OR DELETE ON uitruthbullets
+    FOR EACH ROW EXECUTE PROCEDURE ui_notify_bullets();
+DROP TRIGGER IF EXISTS ui_bullets_truncated ON uitruthbullets;
+CREATE TRIGGER ui_bullets_truncated AFTER TRUNCATE ON uitruthbullets
+    FOR EACH STATEMENT EXECUTE PROCEDURE ui_notify_reset();
+"""
+
 
 async def init():
     await Tortoise.init(
         db_url=os.environ.get("DB_URL"), modules={"models": ["common.models"]}
     )
     await Tortoise.generate_schemas()
+    await Tortoise.get_connection("default").execute_script(TRIGGERS)
 
 
 async def migrate():
@@ -55,4 +129,73 @@ async def migrate():
     await conn.close()
 
 
-run_async(init())
+async def migrate_indexes():
+    # adds the indexes and unique constraints the models now declare
+    # the names match what Tortoise.generate_schemas would make for a new database
+    conn: asyncpg.Connection = await asyncpg.connect(os.environ.get("DB_URL"))
+
+    async with conn.transaction():
+        # duplicates would stop the unique constraints from being made
+        # the oldest row is kept, as that's the one that would be found first anyways
+        removed_bullets = await conn.execute(
+            "DELETE FROM uitruthbullets a USING uitruthbullets b WHERE a.channel_id ="
+            " b.channel_id AND a.name = b.name AND a.id > b.id"
+        )
+        removed_configs = await conn.execute(
+            "DELETE FROM uiconfig a USING uiconfig b WHERE a.guild_id = b.guild_id"
+            " AND a.id > b.id"
+        )
+        print(f"Duplicate bullets: {removed_bullets}")
+        print(f"Duplicate configs: {removed_configs}")
+
+        existing = {
+            r["conname"]
+            for r in await conn.fetch(
+                "SELECT conname FROM pg_constraint WHERE conrelid IN"
+                " ('uiconfig'::regclass, 'uitruthbullets'::regclass)"
+            )
+        }
+
+        if "uiconfig_guild_id_key" not in existing:
+            await conn.execute(
+                "ALTER TABLE uiconfig ADD CONSTRAINT uiconfig_guild_id_key UNIQUE"
+                " (guild_id)"
+            )
+        if "uid_uitruthbull_channel_d5bf1b" not in existing:
+            await conn.execute(
+                "ALTER TABLE uitruthbullets ADD CONSTRAINT"
+                ' "uid_uitruthbull_channel_d5bf1b" UNIQUE (channel_id, name)'
+            )
+
+        await conn.execute(
+            'CREATE INDEX IF NOT EXISTS "idx_uitruthbull_guild_i_0ce09c" ON'
+            " uitruthbullets (guild_id, found)"
+        )
+
+    await conn.close()
+
+
+async def install_triggers():
+    conn: asyncpg.Connection = await asyncpg.connect(os.environ.get("DB_URL"))
+    async with conn.transaction():
+        await conn.execute(TRIGGERS)
+    await conn.close()
+
+
+async def add_fuzzy_bullets():
+    conn: asyncpg.Connection = await asyncpg.connect(os.environ.get("DB_URL"))
+    await conn.execute(
+        "ALTER TABLE uiconfig ADD COLUMN IF NOT EXISTS fuzzy_bullets BOOL NOT NULL"
+        " DEFAULT false"
+    )
+    await conn.close()
+
+
+if "--migrate-indexes" in sys.argv:
+    run_async(migrate_indexes())
+elif "--install-triggers" in sys.argv:
+    run_async(install_triggers())
+elif "--add-fuzzy-bullets" in sys.argv:
+    run_async(add_fuzzy_bullets())
+else:
+    run_async(init())
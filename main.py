@@ -1,8 +1,9 @@
 import asyncio
+import functools
 import logging
 import os
 import typing
-from collections import defaultdict
+from multiprocessing.synchronize import Lock
 
 import naff
 from dotenv import load_dotenv
@@ -10,7 +11,22 @@ from tortoise import Tortoise
 from tortoise.exceptions import ConfigurationError
 from websockets.exceptions import ConnectionClosedOK
 
+import common.autocomplete as autocomplete
+import common.broker as broker
+import common.bullet_index as bullet_index
+import common.cache_sync as cache_sync
+import common.command_index as command_index
+import common.config_cache as config_cache
+import common.db as db
+import common.guild_search as guild_search
+import common.ingest as ingest
+import common.metrics as metrics
+import common.prefixes as prefixes
+import common.progress as progress
+import common.sharding as sharding
+import common.storage as storage
 import common.utils as utils
+import common.watchdog as watchdog
 
 load_dotenv()
 
@@ -26,36 +42,28 @@ handler.setFormatter(
 logger.addHandler(handler)
 
 
-async def _get_prefixes(bot: utils.UIBase, msg: naff.Message):
-    if not msg.guild:
-        return set()
+async def fetch_prefix_matcher(bot: utils.UIBase, msg: naff.Message):
+    guild_id = msg.guild.id if msg.guild else None
 
-    if prefixes := bot.cached_prefixes[msg.guild.id]:
-        return prefixes
+    if matcher := bot.prefix_cache.get(guild_id):
+        return matcher
 
-    guild_config = bot.cached_configs.get(msg.id) or await utils.create_or_get(
-        msg.guild.id
-    )
-    bot.cached_configs[msg.id] = guild_config
+    if guild_id:
+        try:
+            guild_config = await bot.cached_configs.fetch(guild_id)
+        except ConfigurationError:
+            # prefix handling also runs before on_ready sometimes
+            # don't cache this - the real prefixes should be used once we can get them
+            return prefixes.PrefixMatcher(prefixes.mention_prefixes(bot.user.id))
+        custom_prefixes = guild_config.prefixes
+    else:
+        custom_prefixes = set()
 
-    prefixes = bot.cached_prefixes[msg.guild.id] = guild_config.prefixes
-    return prefixes
+    return bot.prefix_cache.build(guild_id, custom_prefixes, bot.user.id)
 
 
 async def investigator_prefixes(bot: naff.Client, msg: naff.Message):
-    mention_prefixes = {f"<@{bot.user.id}> ", f"<@!{bot.user.id}> "}
-
-    try:
-        custom_prefixes = await _get_prefixes(bot, msg)
-    except AttributeError:
-        # prefix handling runs before command checks, so there's a chance there's no guild
-        custom_prefixes = {"v!"}
-    except ConfigurationError:  # prefix handling also runs before on_ready sometimes
-        custom_prefixes = set()
-    except KeyError:  # rare possibility, but you know
-        custom_prefixes = set()
-
-    return mention_prefixes.union(custom_prefixes)
+    return set((await fetch_prefix_matcher(bot, msg)).prefixes)
 
 
 class UltimateInvestigator(utils.UIBase):
@@ -64,8 +72,55 @@ class UltimateInvestigator(utils.UIBase):
         # you'll have to generate this yourself if you want to
         # run your own instance, but it's super easy to do so
         # just run gen_dbs.py
+        # the broker's origin doubles as the application name, so changes
+        # we make ourselves aren't sent back to us by the database
         await Tortoise.init(
-            db_url=os.environ.get("DB_URL"), modules={"models": ["common.models"]}
+            config=db.tortoise_config(os.environ.get("DB_URL"), self.broker.origin)
+        )
+
+        # lets other processes (and scripts) tell us when our caches are outdated
+        self.broker.subscribe(functools.partial(cache_sync.apply, self))
+        await self.broker.start()
+
+        self.register_gauges()
+
+        # the watchdog is opt-in - set LOOP_WATCHDOG to how many seconds the loop
+        # can be blocked for before what's blocking it is logged
+        on_beat = None
+        if threshold := os.environ.get("LOOP_WATCHDOG"):
+            self.watchdog = watchdog.LoopWatchdog(self, float(threshold))
+            self.watchdog.start()
+            on_beat = self.watchdog.beat
+        self._loop_lag_task = asyncio.create_task(
+            metrics.monitor_loop_lag(on_beat=on_beat)
+        )
+        # the prometheus endpoint is opt-in, and only listens locally by default
+        if metrics_port := os.environ.get("METRICS_PORT"):
+            self._metrics_runner = await metrics.serve(
+                os.environ.get("METRICS_HOST") or "127.0.0.1", int(metrics_port)
+            )
+
+    def register_gauges(self):
+        metrics.registry.gauge(
+            "cache_hit_ratio",
+            lambda: {
+                (("cache", "configs"),): self.cached_configs.hit_ratio,
+                (("cache", "bullets"),): self.bullet_index.hit_ratio,
+                (("cache", "autocomplete"),): self.bullet_autocomplete.hit_ratio,
+            },
+        )
+        metrics.registry.gauge(
+            "cache_entries",
+            lambda: {
+                (("cache", "configs"),): len(self.cached_configs),
+                (("cache", "prefixes"),): len(self.prefix_cache),
+                (("cache", "bullet_channels"),): len(self.bullet_index),
+                (("cache", "guild_names"),): len(self.guild_search),
+            },
+        )
+        metrics.registry.gauge(
+            "db_pool",
+            lambda: {(("stat", k),): v for k, v in db.pool_metrics.snapshot().items()},
         )
 
     @naff.listen("ready")
@@ -90,7 +145,7 @@ class UltimateInvestigator(utils.UIBase):
         try:
             await self.change_presence(activity=activity)
         except ConnectionClosedOK:
-            await utils.msg_to_owner(bot, "Reconnecting...")
+            await utils.msg_to_owner(self, "Reconnecting...")
 
     @naff.listen("resume")
     async def on_resume(self):
@@ -99,110 +154,210 @@ class UltimateInvestigator(utils.UIBase):
         )
         await self.change_presence(activity=activity)
 
+    # the command index has to be rebuilt whenever the commands change
+    # reloading an extension is just unloading and then loading it
+    def add_prefixed_command(self, command: naff.PrefixedCommand) -> None:
+        super().add_prefixed_command(command)
+        self.command_index.invalidate()
+
+    def unload_extension(self, name, package=None, **unload_kwargs) -> None:
+        super().unload_extension(name, package, **unload_kwargs)
+        self.command_index.invalidate()
+
+    def _queue_task(self, coro, event: naff.events.BaseEvent, *args, **kwargs):
+        # every listener runs in its own task - time it, and count its queries
+        context, queries = metrics.event_context()
+        start = asyncio.get_running_loop().time()
+        task = context.run(super()._queue_task, coro, event, *args, **kwargs)
+        # several listeners can handle the same event, so each is timed on its own
+        labels = {"event": event.resolved_name, "listener": coro.callback.__name__}
+
+        def record(_):
+            metrics.registry.observe(
+                "listener_seconds", asyncio.get_running_loop().time() - start, **labels
+            )
+            metrics.registry.observe(
+                "event_db_queries", queries[0], metrics.COUNT_BUCKETS, **labels
+            )
+
+        task.add_done_callback(record)
+        return task
+
+    async def _run_prefixed_command(self, command, ctx):
+        start = asyncio.get_running_loop().time()
+        try:
+            return await super()._run_prefixed_command(command, ctx)
+        finally:
+            metrics.registry.observe(
+                "command_seconds",
+                asyncio.get_running_loop().time() - start,
+                command=command.qualified_name,
+            )
+
+    async def _run_slash_command(self, command, ctx):
+        start = asyncio.get_running_loop().time()
+        try:
+            return await super()._run_slash_command(command, ctx)
+        finally:
+            metrics.registry.observe(
+                "command_seconds",
+                asyncio.get_running_loop().time() - start,
+                command=f"/{command.resolved_name}",
+            )
+
     @naff.listen("message_create")
     async def _dispatch_prefixed_commands(
         self, event: naff.events.MessageCreate
     ) -> None:
-        """Determine if a command is being triggered, and dispatch it.
-        Annoyingly, unlike d.py, we have to overwrite this whole method
-        in order to provide the 'replace _ with -' trick that was in the
-        d.py version."""
+        """Works out what a message could be used for, and hands it off to what needs it.
+        This overwrites naff's own listener, and is the only thing that listens
+        for new messages - it's used both for commands and for Truth Bullets."""
         message = event.message
 
-        if not message.content:
+        if not message.content or message.author.bot:
             return
 
-        if not message.author.bot:
-            prefixes: str | typing.Iterable[str] = await self.generate_prefixes(
-                self, message
-            )  # type: ingore
-
-            if isinstance(prefixes, str) or prefixes == naff.MENTION_PREFIX:
-                prefixes = (prefixes,)  # type: ignore
+        guild_id = message.guild.id if message.guild else None
 
-            prefix_used = None
-
-            for prefix in prefixes:
-                if prefix == naff.MENTION_PREFIX:
-                    if mention := self._mention_reg.search(message.content):  # type: ignore
-                        prefix = mention.group()
-                    else:
-                        continue
-
-                if message.content.startswith(prefix):
-                    prefix_used = prefix
-                    break
+        # most messages are neither commands nor possible Truth Bullets, so
+        # they should be turned away as cheaply as possible - when everything
+        # needed is cached, nothing here needs awaiting
+        matcher = self.prefix_cache.get(guild_id) or await fetch_prefix_matcher(
+            self, message
+        )
 
-            if prefix_used:
-                context = await self.get_context(message)
-                context.prefix = prefix_used
+        if ingest.may_find_bullets(message):
+            guild_config = self.cached_configs.get(guild_id)
+            if guild_config is None:
+                try:
+                    guild_config = await self.cached_configs.load(guild_id)
+                except ConfigurationError:  # the database isn't ready yet
+                    guild_config = None
+
+            if guild_config and ingest.player_can_find(message, guild_config):
+                self.dispatch(
+                    ingest.BulletCandidate(
+                        message, guild_config, ingest.bullet_channel_id(message)
+                    )
+                )
 
-                content_parameters = message.content.removeprefix(prefix_used)  # type: ignore
-                command = self  # yes, this is a hack
+        if prefix_used := matcher.match(message.content):
+            await self._process_prefixed_command(message, prefix_used)
 
-                while True:
-                    first_word: str = naff.utils.get_first_word(content_parameters)  # type: ignore
-                    command_first_word: str = (
-                        first_word.replace("-", "_") if first_word else first_word
-                    )
-                    if isinstance(command, naff.PrefixedCommand):
-                        new_command = command.subcommands.get(command_first_word)
+    async def _process_prefixed_command(
+        self, message: naff.Message, prefix_used: str
+    ) -> None:
+        """Determine if a command is being triggered, and dispatch it.
+        Annoyingly, unlike d.py, we have to overwrite this whole method
+        in order to provide the 'replace _ with -' trick that was in the
+        d.py version."""
+        context = await self.get_context(message)
+        context.prefix = prefix_used
+
+        content = message.content.removeprefix(prefix_used)  # type: ignore
+        chain, end = self.command_index.resolve(content, self.prefixed_commands)
+
+        for command in chain:
+            if command.subcommands and command.hierarchical_checking:
+                try:
+                    await command._can_run(
+                        context
+                    )  # will error out if we can't run this command
+                except Exception as e:
+                    if command.error_callback:
+                        await command.error_callback(e, context)
+                    elif command.extension and command.extension.extension_error:
+                        await command.extension.extension_error(context)
                     else:
-                        new_command = command.prefixed_commands.get(command_first_word)
-                    if not new_command or not new_command.enabled:
-                        break
-
-                    command = new_command
-                    content_parameters = content_parameters.removeprefix(
-                        first_word
-                    ).strip()
-
-                    if command.subcommands and command.hierarchical_checking:
-                        try:
-                            await new_command._can_run(
-                                context
-                            )  # will error out if we can't run this command
-                        except Exception as e:
-                            if new_command.error_callback:
-                                await new_command.error_callback(e, context)
-                            elif (
-                                new_command.extension
-                                and new_command.extension.extension_error
-                            ):
-                                await new_command.extension.extension_error(context)
-                            else:
-                                await self.on_command_error(context, e)
-                            return
-
-                if not isinstance(command, naff.PrefixedCommand):
-                    command = None
-
-                if command and command.enabled:
-                    # yeah, this looks ugly
-                    context.command = command
-                    context.invoke_target = (
-                        message.content.removeprefix(prefix_used).removesuffix(content_parameters).strip()  # type: ignore
-                    )
-                    context.args = naff.utils.get_args(context.content_parameters)
-                    try:
-                        if self.pre_run_callback:
-                            await self.pre_run_callback(context)
-                        await self._run_prefixed_command(command, context)
-                        if self.post_run_callback:
-                            await self.post_run_callback(context)
-                    except Exception as e:
                         await self.on_command_error(context, e)
-                    finally:
-                        await self.on_command(context)
+                    return
+
+        command = chain[-1] if chain else None
+
+        if command and command.enabled:
+            # yeah, this looks ugly
+            context.command = command
+            context.invoke_target = content[:end].strip()
+            context.args = naff.utils.get_args(context.content_parameters)
+            try:
+                if self.pre_run_callback:
+                    await self.pre_run_callback(context)
+                await self._run_prefixed_command(command, context)
+                if self.post_run_callback:
+                    await self.post_run_callback(context)
+            except Exception as e:
+                await self.on_command_error(context, e)
+            finally:
+                await self.on_command(context)
 
     async def on_error(self, source: str, error: Exception, *args, **kwargs) -> None:
         await utils.error_handle(self, error)
 
     async def stop(self):
+        if self._loop_lag_task:
+            self._loop_lag_task.cancel()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+        await self.broker.close()
         await Tortoise.close_connections()
         await super().stop()
 
 
+class ShardedInvestigator(UltimateInvestigator, naff.AutoShardedClient):
+    """Runs only some of the bot's shards, so the rest can be run by other processes.
+    If an identify gate is given, the shards identify through it so that they
+    don't identify at the same time as another process's shards."""
+
+    def __init__(
+        self,
+        *args,
+        shard_ids: typing.Iterable[int],
+        identify_gate: typing.Optional[sharding.IdentifyGate] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.shard_ids = frozenset(shard_ids)
+        self.identify_gate = identify_gate
+
+    async def login(self, token) -> None:
+        await super().login(token)
+        # naff makes a connection for every shard, but we only want ours
+        self._connection_states = [
+            state
+            for state in self._connection_states
+            if state.shard_id in self.shard_ids
+        ]
+
+    async def astart(self, token) -> None:
+        if not self.identify_gate:
+            return await super().astart(token)
+
+        await self.login(token)
+
+        tasks = []
+        for shard in self._connection_states:
+            async with self.identify_gate.turn(
+                shard.shard_id, self.max_start_concurrency
+            ):
+                task = asyncio.create_task(shard.start())
+                tasks.append(task)
+                # a shard that fails to start shouldn't hold the others up
+                ready = asyncio.create_task(shard._shard_ready.wait())
+                await asyncio.wait(
+                    (task, ready),
+                    timeout=sharding.READY_TIMEOUT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                ready.cancel()
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await self.stop()
+
+
 # honestly don't think i need the members stuff
 intents = naff.Intents.new(
     guilds=True,
@@ -213,24 +368,90 @@ intents = naff.Intents.new(
 )
 mentions = naff.AllowedMentions.all()
 
-bot = UltimateInvestigator(
-    generate_prefixes=investigator_prefixes,
-    allowed_mentions=mentions,
-    intents=intents,
-    interaction_context=utils.InvestigatorContext,
-    auto_defer=False,  # we already handle deferring
-    logger=logger,
-)
-bot.init_load = True
-bot.cached_prefixes = defaultdict(set)
-bot.cached_configs = naff.utils.TTLCache(ttl=30)
-bot.color = naff.Color(int(os.environ.get("BOT_COLOR")))
-
-ext_list = utils.get_all_extensions(os.environ.get("DIRECTORY_OF_FILE"))
-for ext in ext_list:
-    try:
-        bot.load_extension(ext)
-    except naff.errors.ExtensionLoadException:
-        raise
-
-asyncio.run(bot.astart(os.environ.get("MAIN_TOKEN")))
+
+def create_bot(
+    shard_ids: typing.Optional[typing.Iterable[int]] = None,
+    total_shards: int = 1,
+    cache_broker: typing.Optional[broker.Broker] = None,
+    bot_storage: typing.Optional[storage.Storage] = None,
+    identify_gate: typing.Optional[sharding.IdentifyGate] = None,
+) -> UltimateInvestigator:
+    """Creates the bot, with its own caches and all extensions loaded.
+    If shard_ids is given, the bot only runs those shards, identifying through
+    the identify gate if there is one.
+    By default, the bot uses Postgres for both its broker and its storage."""
+    bot_kwargs = {
+        "generate_prefixes": investigator_prefixes,
+        "allowed_mentions": mentions,
+        "intents": intents,
+        "interaction_context": utils.InvestigatorContext,
+        "auto_defer": False,  # we already handle deferring
+        "logger": logger,
+    }
+
+    if shard_ids is None:
+        bot = UltimateInvestigator(**bot_kwargs)
+    else:
+        bot = ShardedInvestigator(
+            shard_ids=shard_ids,
+            identify_gate=identify_gate,
+            total_shards=total_shards,
+            **bot_kwargs,
+        )
+
+    # so that rate limits on every REST call are counted, not just the role worker's
+    bot.http = metrics.MeteredHTTPClient()
+    bot.init_load = True
+    bot.watchdog = None
+    bot._loop_lag_task = None
+    bot._metrics_runner = None
+    bot.prefix_cache = prefixes.PrefixCache()
+    bot.command_index = command_index.CommandIndex()
+    bot.storage = bot_storage or storage.PostgresStorage()
+    bot.cached_configs = config_cache.ConfigCache(
+        functools.partial(utils.create_or_get, bot.storage)
+    )
+    bot.bullet_index = bullet_index.BulletIndex(bot.storage)
+    bot.bullet_progress = progress.ProgressTracker(bot.storage)
+    bot.bullet_autocomplete = autocomplete.BulletAutocomplete(bot.bullet_index)
+    bot.guild_search = guild_search.GuildSearch(bot.storage)
+    bot.broker = cache_broker or broker.PostgresBroker(os.environ.get("DB_URL"))
+    bot.color = naff.Color(int(os.environ.get("BOT_COLOR")))
+
+    ext_list = utils.get_all_extensions(os.environ.get("DIRECTORY_OF_FILE"))
+    for ext in ext_list:
+        try:
+            bot.load_extension(ext)
+        except naff.errors.ExtensionLoadException:
+            raise
+
+    return bot
+
+
+def use_uvloop():
+    # opt-in, since uvloop isn't a requirement
+    if os.environ.get("USE_UVLOOP") and not watchdog.install_uvloop():
+        logger.warning("USE_UVLOOP is set, but uvloop isn't installed.")
+
+
+def run_shards(
+    shard_ids: tuple[int, ...], total_shards: int, identify_locks: list[Lock]
+):
+    use_uvloop()
+    bot = create_bot(
+        shard_ids, total_shards, identify_gate=sharding.IdentifyGate(identify_locks)
+    )
+    asyncio.run(bot.astart(os.environ.get("MAIN_TOKEN")))
+
+
+if __name__ == "__main__":
+    # sharding is opt-in - set SHARD_COUNT to the total number of shards
+    # and SHARD_PROCESSES to how many processes to split them between
+    if total_shards := int(os.environ.get("SHARD_COUNT") or 0):
+        sharding.run_workers(
+            total_shards, int(os.environ.get("SHARD_PROCESSES") or 1), run_shards
+        )
+    else:
+        use_uvloop()
+        bot = create_bot()
+        asyncio.run(bot.astart(os.environ.get("MAIN_TOKEN")))
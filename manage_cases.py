@@ -0,0 +1,64 @@
+# use this to import or export truth bullet case files without running the bot
+# python manage_cases.py import <guild id> <case file> [--replace]
+# python manage_cases.py export <guild id> <case file>
+# the case file's extension (.json or .csv) decides its format
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+import common.case_io as case_io
+
+load_dotenv()
+
+
+async def import_file(guild_id: int, path: Path, replace: bool):
+    try:
+        bullets = case_io.parse_case(path.read_bytes(), path.suffix.removeprefix("."))
+    except case_io.CaseFileError as e:
+        raise SystemExit(str(e)) from None
+
+    conn: asyncpg.Connection = await asyncpg.connect(os.environ.get("DB_URL"))
+    try:
+        num_imported = await case_io.import_case(
+            conn, guild_id, bullets, replace=replace
+        )
+    finally:
+        await conn.close()
+
+    # the database's triggers let any running bots know to reload the guild
+    print(f"Imported {num_imported} Truth Bullets into {guild_id}.")
+
+
+async def export_file(guild_id: int, path: Path):
+    conn: asyncpg.Connection = await asyncpg.connect(os.environ.get("DB_URL"))
+    try:
+        with path.open("w", encoding="utf-8", newline="") as f:
+            async for chunk in case_io.export_case(
+                conn, guild_id, path.suffix.removeprefix(".")
+            ):
+                f.write(chunk)
+    finally:
+        await conn.close()
+
+    print(f"Exported the Truth Bullets of {guild_id} to {path}.")
+
+
+parser = argparse.ArgumentParser(description="Imports or exports case files.")
+parser.add_argument("action", choices=("import", "export"))
+parser.add_argument("guild_id", type=int)
+parser.add_argument("path", type=Path)
+parser.add_argument(
+    "--replace",
+    action="store_true",
+    help="remove all of the guild's Truth Bullets before importing",
+)
+args = parser.parse_args()
+
+if args.action == "import":
+    asyncio.run(import_file(args.guild_id, args.path, args.replace))
+else:
+    asyncio.run(export_file(args.guild_id, args.path))
@@ -0,0 +1,172 @@
+import unittest
+from unittest import mock
+
+from rapidfuzz import fuzz
+
+import common.autocomplete as autocomplete
+import common.bullet_index as bullet_index
+import common.fuzzy as fuzzy
+import common.models as models
+import common.storage as storage
+
+
+class ScoreTest(unittest.TestCase):
+    def test_best_score_from_any_scorer(self):
+        lowered = ["broken window in the hall", "knife", "kitchen knife"]
+
+        scored = dict(autocomplete.score("broken", lowered))
+        # only partial_ratio thinks this is a perfect match
+        self.assertEqual(scored[0], 100)
+        self.assertEqual(
+            scored[0],
+            max(
+                fuzz.WRatio("broken", lowered[0]),
+                fuzz.partial_ratio("broken", lowered[0]),
+            ),
+        )
+
+        only_wratio = dict(
+            autocomplete.score("broken", lowered, scorers=(fuzz.WRatio,))
+        )
+        self.assertLess(only_wratio[0], 100)
+
+    def test_exact_matches_come_first(self):
+        lowered = ["kitchen knife", "knife"]
+        # both score 100 with partial_ratio, but only one is exact
+        self.assertEqual([i for i, _ in autocomplete.score("knife", lowered)], [1, 0])
+
+    def test_ties_keep_their_order(self):
+        lowered = ["knife", "letter", "knife", "knife"]
+        self.assertEqual(
+            [index for index, _ in autocomplete.score("knife", lowered)], [0, 2, 3]
+        )
+
+    def test_limit_and_cutoff(self):
+        lowered = [f"knife {i}" for i in range(50)] + ["rope"]
+
+        scored = autocomplete.score("knife", lowered)
+        self.assertEqual(len(scored), autocomplete.MAX_CHOICES)
+        self.assertEqual([index for index, _ in scored], list(range(25)))
+        self.assertEqual(len(autocomplete.score("knife", lowered, limit=None)), 50)
+
+    def test_one_character_choices(self):
+        lowered = ["k", "knife"]
+        self.assertEqual([i for i, _ in autocomplete.score("knife", lowered)], [1])
+        self.assertIn(0, dict(autocomplete.score("k", lowered)))
+
+    def test_rank(self):
+        choices = ["Knife", "Letter", "Kitchen Knife"]
+        lowered = [c.lower() for c in choices]
+
+        self.assertEqual(autocomplete.rank("", choices, lowered), choices)
+        self.assertEqual(
+            autocomplete.rank("knife", choices, lowered), ["Knife", "Kitchen Knife"]
+        )
+
+
+class BulletAutocompleteTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = storage.MemoryStorage()
+        self.index = bullet_index.BulletIndex(self.storage)
+        self.autocomplete = autocomplete.BulletAutocomplete(self.index, maxsize=2)
+        self.knife = self.add_bullet("Knife", {"Blade", "Dagger", "Kitchen Knife"})
+        self.add_bullet("Letter")
+
+    def add_bullet(self, name: str, aliases=frozenset()):
+        return self.storage.add_bullet(
+            name=name,
+            aliases=set(aliases),
+            description=f"A {name}.",
+            channel_id=1,
+            guild_id=1,
+        )
+
+    async def test_results_are_cached(self):
+        self.assertEqual(await self.autocomplete.complete(1, "KNIFE"), ["Knife"])
+        self.assertEqual(await self.autocomplete.complete(1, "knife"), ["Knife"])
+
+        self.assertEqual((self.autocomplete.hits, self.autocomplete.misses), (1, 1))
+        self.assertEqual(self.storage.queries, 1)
+
+    async def test_changed_channel_is_not_cached(self):
+        await self.autocomplete.complete(1, "")
+
+        rope = models.copy_model(self.knife)
+        rope.id, rope.name = 3, "Rope"
+        self.index.update(rope)
+
+        self.assertEqual(
+            await self.autocomplete.complete(1, ""), ["Knife", "Letter", "Rope"]
+        )
+        self.assertEqual(self.autocomplete.misses, 2)
+
+    async def test_reloaded_channel_is_not_cached(self):
+        await self.autocomplete.complete(1, "")
+        version = self.index.get(1).version
+
+        # a reloaded channel starts over at the same version, and could have had
+        # anything change while it wasn't loaded
+        self.index.invalidate_channel(1)
+        await self.autocomplete.complete(1, "")
+        self.assertEqual(self.index.get(1).version, version)
+        self.assertEqual(self.autocomplete.misses, 2)
+
+    async def test_least_recently_used_is_evicted(self):
+        await self.autocomplete.complete(1, "a")
+        await self.autocomplete.complete(1, "b")
+        await self.autocomplete.complete(1, "a")
+        await self.autocomplete.complete(1, "c")
+
+        self.assertEqual(len(self.autocomplete), 2)
+        await self.autocomplete.complete(1, "a")
+        self.assertEqual(self.autocomplete.hits, 2)
+
+        self.autocomplete.clear()
+        self.assertEqual(len(self.autocomplete), 0)
+
+    async def test_aliases_are_ranked_against_the_typed_alias(self):
+        # the bullet's name has nothing to do with what's being typed
+        self.assertEqual(
+            await self.autocomplete.complete_aliases(1, "Knife", "dag"), ["Dagger"]
+        )
+        self.assertEqual(
+            await self.autocomplete.complete_aliases(1, "Knife", ""),
+            ["Blade", "Dagger", "Kitchen Knife"],
+        )
+        self.assertEqual(
+            await self.autocomplete.complete_aliases(1, "Knife", "knife"),
+            ["Kitchen Knife"],
+        )
+        self.assertEqual(await self.autocomplete.complete_aliases(1, "Rope", ""), [])
+
+    async def test_alias_results_are_cached_per_bullet(self):
+        await self.autocomplete.complete_aliases(1, "Knife", "")
+        self.assertEqual(await self.autocomplete.complete_aliases(1, "Letter", ""), [])
+        self.assertEqual(self.autocomplete.misses, 2)
+
+        knife = models.copy_model(self.knife)
+        knife.aliases.add("Shiv")
+        self.index.update(knife)
+        self.assertIn("Shiv", await self.autocomplete.complete_aliases(1, "Knife", ""))
+
+
+class AutocompleteAliasesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_uses_the_typed_alias(self):
+        ctx = mock.Mock(send=mock.AsyncMock())
+        ctx.bot.bullet_autocomplete.complete_aliases = mock.AsyncMock(
+            return_value=["Dagger"]
+        )
+        channel = mock.Mock(id=1)
+
+        await fuzzy.autocomplete_aliases(
+            ctx, alias="dag", channel=channel, name="Knife"
+        )
+        ctx.bot.bullet_autocomplete.complete_aliases.assert_awaited_once_with(
+            1, "Knife", "dag"
+        )
+        ctx.send.assert_awaited_once_with([{"name": "Dagger", "value": "Dagger"}])
+
+        # nothing can be suggested without knowing the bullet
+        ctx.send.reset_mock()
+        await fuzzy.autocomplete_aliases(ctx, alias="dag", channel=channel)
+        ctx.send.assert_awaited_once_with([])
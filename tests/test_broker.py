@@ -0,0 +1,83 @@
+import unittest
+
+import common.broker as broker
+
+
+class LocalBrokerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hub = broker.LocalHub()
+        self.received: dict[str, list[dict]] = {"a": [], "b": [], "c": []}
+        self.brokers = {}
+        for origin, received in self.received.items():
+            self.brokers[origin] = broker.LocalBroker(origin, self.hub)
+            self.brokers[origin].subscribe(received.append)
+
+    async def test_not_sent_back_to_origin(self):
+        await self.brokers["a"].publish("config", guild_id=1)
+
+        message = {"origin": "a", "kind": "config", "guild_id": 1}
+        self.assertEqual(self.received, {"a": [], "b": [message], "c": [message]})
+
+    async def test_each_gets_its_own_copy(self):
+        await self.brokers["a"].publish("bullets", guild_id=1, channel_ids=[1, 2])
+
+        b_message, c_message = self.received["b"][0], self.received["c"][0]
+        self.assertEqual(b_message, c_message)
+        self.assertIsNot(b_message["channel_ids"], c_message["channel_ids"])
+
+    async def test_close(self):
+        await self.brokers["b"].close()
+        await self.brokers["b"].close()  # closing twice is fine
+        await self.brokers["a"].publish("reset")
+
+        self.assertEqual(self.received["b"], [])
+        self.assertEqual(len(self.received["c"]), 1)
+
+    async def test_failing_callback_does_not_stop_others(self):
+        def fail(message):
+            raise ValueError("oops")
+
+        received = []
+        d = broker.LocalBroker("d", self.hub)
+        d.subscribe(fail)
+        d.subscribe(received.append)
+        with self.assertLogs("uibot", "ERROR"):
+            await self.brokers["a"].publish("reset")
+
+        self.assertEqual(len(received), 1)
+
+
+class PostgresBrokerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.broker = broker.PostgresBroker("postgres://localhost", origin="a")
+        self.received: list[dict] = []
+        self.broker.subscribe(self.received.append)
+
+    def notify(self, payload: str):
+        self.broker._on_notification(None, 1, broker.CHANNEL, payload)
+
+    async def test_notifications(self):
+        self.notify('{"origin": "b", "kind": "config", "guild_id": 1}')
+        self.notify('{"origin": "a", "kind": "config", "guild_id": 2}')
+
+        self.assertEqual(
+            self.received, [{"origin": "b", "kind": "config", "guild_id": 1}]
+        )
+
+    async def test_unreadable_notification(self):
+        with self.assertLogs("uibot", "WARNING"):
+            self.notify("{not json")
+        self.assertEqual(self.received, [])
+
+    async def test_publish_without_connection(self):
+        with self.assertRaises(ConnectionError):
+            await self.broker.publish("reset")
+
+
+class BrokerTest(unittest.TestCase):
+    def test_send_is_required(self):
+        class SilentBroker(broker.Broker):
+            pass
+
+        with self.assertRaises(TypeError):
+            SilentBroker()
@@ -0,0 +1,67 @@
+import asyncio
+import types
+import unittest
+from unittest import mock
+
+import common.config_cache as config_cache
+import common.models as models
+import common.progress as progress
+import common.storage as storage
+import exts.bullet_check as bullet_check
+
+
+class CheckForFinishTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.storage = storage.MemoryStorage()
+        self.storage.add_config(1, bullets_enabled=True)
+        for name in ("knife", "letter"):
+            bullet = self.storage.add_bullet(
+                name=name,
+                aliases=set(),
+                description=f"A {name}.",
+                channel_id=2,
+                guild_id=1,
+            )
+            await self.storage.claim_bullet(bullet.id, 10)
+
+        configs = config_cache.ConfigCache(self.storage.get_config)
+        self.cog = types.SimpleNamespace(
+            bot=types.SimpleNamespace(
+                cached_configs=configs,
+                bullet_progress=progress.ProgressTracker(self.storage),
+            ),
+            role_tasks=set(),
+        )
+        self.guild = mock.Mock(id=1)
+        self.bullet_chan = mock.Mock(send=mock.AsyncMock())
+
+    async def check_for_finish(self, guild_config: models.Config):
+        await bullet_check.BulletCheck.check_for_finish(
+            self.cog, self.guild, self.bullet_chan, guild_config
+        )
+
+    async def test_only_announced_once(self):
+        guild_config = await self.cog.bot.cached_configs.fetch(1)
+
+        with mock.patch.object(models.Config, "save", mock.AsyncMock()) as save:
+            # like two bullets being found at once, finishing the investigation
+            await asyncio.gather(
+                self.check_for_finish(guild_config), self.check_for_finish(guild_config)
+            )
+
+        self.bullet_chan.send.assert_awaited_once()
+        save.assert_awaited_once_with(update_fields=["bullets_enabled"])
+        self.assertFalse(self.cog.bot.cached_configs.peek(1).bullets_enabled)
+        # the config everyone else had is left alone
+        self.assertTrue(guild_config.bullets_enabled)
+
+    async def test_failed_save_drops_the_cached_config(self):
+        guild_config = await self.cog.bot.cached_configs.fetch(1)
+
+        with mock.patch.object(
+            models.Config, "save", mock.AsyncMock(side_effect=OSError)
+        ):
+            with self.assertRaises(OSError):
+                await self.check_for_finish(guild_config)
+
+        self.assertNotIn(1, self.cog.bot.cached_configs)
@@ -0,0 +1,177 @@
+import asyncio
+import unittest
+
+import common.bullet_index as bullet_index
+import common.models as models
+import common.storage as storage
+
+
+def make_bullet(bullet_id: int, name: str, aliases=(), found: bool = False):
+    return models.TruthBullet(
+        id=bullet_id,
+        name=name,
+        aliases=set(aliases),
+        description="A Truth Bullet.",
+        channel_id=1,
+        guild_id=1,
+        found=found,
+        finder=0,
+    )
+
+
+class SlowStorage(storage.MemoryStorage):
+    """Only finishes loading a channel once told to."""
+
+    def __init__(self):
+        super().__init__()
+        self.loading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def bullets_in_channel(self, channel_id: int) -> list[models.TruthBullet]:
+        bullets = await super().bullets_in_channel(channel_id)
+        self.loading.set()
+        await self.release.wait()
+        return bullets
+
+
+class ChannelBulletsTest(unittest.TestCase):
+    def test_match(self):
+        bullets = bullet_index.ChannelBullets(
+            1,
+            [
+                make_bullet(1, "Knife", ("Blade",)),
+                make_bullet(2, "Letter"),
+                make_bullet(3, "Window", found=True),
+            ],
+        )
+
+        self.assertEqual(bullets.match("a BLADE!").id, 1)
+        self.assertEqual(bullets.match("the letter and the knife").id, 1)
+        self.assertIsNone(bullets.match("the window"))
+        self.assertEqual([b.id for b in bullets.matches("letter, knife")], [1, 2])
+
+    def test_put_replaces_triggers(self):
+        bullets = bullet_index.ChannelBullets(1, [make_bullet(1, "Knife", ("Blade",))])
+        bullets.put(make_bullet(1, "Knife", ("Dagger",)))
+
+        self.assertIsNone(bullets.match("blade"))
+        self.assertEqual(bullets.match("dagger").id, 1)
+        self.assertEqual(bullets.aliases("Knife"), (["Dagger"], ["dagger"]))
+
+        bullets.put(make_bullet(1, "Knife", ("Dagger",), found=True))
+        self.assertIsNone(bullets.match("knife"))
+        self.assertEqual(len(bullets.unfound), 0)
+
+    def test_discard(self):
+        bullets = bullet_index.ChannelBullets(1, [make_bullet(1, "Knife")])
+        version = bullets.version
+
+        self.assertEqual(bullets.discard("Knife").id, 1)
+        self.assertIsNone(bullets.discard("Knife"))
+        self.assertIsNone(bullets.match("knife"))
+        self.assertEqual(len(bullets), 0)
+        self.assertGreater(bullets.version, version)
+
+    def test_names(self):
+        bullets = bullet_index.ChannelBullets(
+            1, [make_bullet(2, "Letter"), make_bullet(1, "Knife")]
+        )
+        self.assertEqual(bullets.names, (["Knife", "Letter"], ["knife", "letter"]))
+
+        bullets.put(make_bullet(3, "Window"))
+        self.assertEqual(bullets.names[0], ["Knife", "Letter", "Window"])
+
+
+class BulletIndexTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = storage.MemoryStorage()
+        self.index = bullet_index.BulletIndex(self.storage)
+        self.knife = self.storage.add_bullet(
+            name="Knife",
+            aliases=set(),
+            description="A knife.",
+            channel_id=1,
+            guild_id=1,
+        )
+
+    async def test_fetch_is_cached(self):
+        first = await self.index.fetch(1)
+        second = await self.index.fetch(1)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.storage.queries, 1)
+        self.assertEqual((self.index.hits, self.index.misses), (1, 1))
+        self.assertEqual(first.match("knife").id, self.knife.id)
+
+    async def test_concurrent_fetches_share_a_load(self):
+        results = await asyncio.gather(*(self.index.fetch(1) for _ in range(5)))
+
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(self.storage.queries, 1)
+
+    async def test_update_and_remove(self):
+        await self.index.fetch(1)
+
+        letter = make_bullet(2, "Letter")
+        self.index.update(letter)
+        self.assertIs(self.index.get_bullet(1, "Letter"), letter)
+
+        self.assertEqual(self.index.remove(1, "Letter"), letter)
+        self.assertIsNone(self.index.get_bullet(1, "Letter"))
+
+        # channels that weren't loaded are left to be loaded in full
+        self.index.update(models.TruthBullet(**(letter.__dict__ | {"channel_id": 2})))
+        self.assertIsNone(self.index.get(2))
+
+    async def test_change_during_load(self):
+        self.storage = SlowStorage()
+        self.storage.add_bullet(
+            name="Knife",
+            aliases=set(),
+            description="A knife.",
+            channel_id=1,
+            guild_id=1,
+        )
+        self.index = bullet_index.BulletIndex(self.storage)
+
+        load = asyncio.ensure_future(self.index.fetch(1))
+        await self.storage.loading.wait()
+        self.index.update(make_bullet(2, "Letter"))
+        self.storage.release.set()
+
+        # what was loaded is used this once, but isn't kept
+        self.assertEqual(len(await load), 1)
+        self.assertIsNone(self.index.get(1))
+
+    async def test_invalidate(self):
+        await self.index.fetch(1)
+        self.index.invalidate_guild(2)
+        self.assertIsNotNone(self.index.get(1))
+
+        self.index.invalidate_guild(1)
+        self.assertIsNone(self.index.get(1))
+
+        await self.index.fetch(1)
+        self.index.invalidate_channel(1)
+        self.assertIsNone(self.index.get(1))
+
+    async def test_claim(self):
+        bullet = await self.index.fetch_bullet(1, "Knife")
+        results = await asyncio.gather(
+            self.index.claim(bullet, 10), self.index.claim(bullet, 20)
+        )
+
+        self.assertEqual(results, [True, False])
+        self.assertEqual(bullet.finder, 10)
+        self.assertIsNone((await self.index.fetch(1)).match("knife"))
+
+    async def test_claim_found_elsewhere(self):
+        bullet = await self.index.fetch_bullet(1, "Knife")
+        # another process got to it first
+        await self.storage.claim_bullet(bullet.id, 20)
+
+        self.assertFalse(await self.index.claim(bullet, 10))
+        # we don't know who found it, so the channel is loaded again
+        self.assertIsNone(self.index.get(1))
+        reloaded = await self.index.fetch_bullet(1, "Knife")
+        self.assertEqual((reloaded.found, reloaded.finder), (True, 20))
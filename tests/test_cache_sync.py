@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+
+import common.cache_sync as cache_sync
+
+CACHES = (
+    "cached_configs",
+    "prefix_cache",
+    "bullet_index",
+    "bullet_progress",
+    "bullet_autocomplete",
+    "guild_search",
+)
+
+
+class ApplyTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = mock.Mock(spec=CACHES)
+
+    def called(self) -> set[str]:
+        return {
+            f"{name}.{call[0]}"
+            for name in CACHES
+            for call in getattr(self.bot, name).method_calls
+        }
+
+    def test_config(self):
+        cache_sync.apply(self.bot, {"kind": "config", "guild_id": 1})
+
+        self.bot.cached_configs.invalidate.assert_called_once_with(1)
+        self.bot.prefix_cache.invalidate.assert_called_once_with(1)
+        self.assertEqual(
+            self.called(), {"cached_configs.invalidate", "prefix_cache.invalidate"}
+        )
+
+    def test_bullets_in_channel(self):
+        cache_sync.apply(self.bot, {"kind": "bullets", "guild_id": 1, "channel_id": 2})
+
+        self.bot.bullet_index.invalidate_channel.assert_called_once_with(2)
+        self.bot.bullet_progress.invalidate.assert_called_once_with(1)
+        self.bot.guild_search.invalidate.assert_called_once_with(1)
+        self.assertNotIn("bullet_index.invalidate_guild", self.called())
+
+    def test_bullets_in_guild(self):
+        cache_sync.apply(self.bot, {"kind": "bullets", "guild_id": 1})
+
+        self.bot.bullet_index.invalidate_guild.assert_called_once_with(1)
+        self.assertNotIn("bullet_index.invalidate_channel", self.called())
+
+    def test_reset(self):
+        cache_sync.apply(self.bot, {"kind": "reset"})
+
+        self.assertEqual(self.called(), {f"{name}.clear" for name in CACHES})
+
+    def test_unknown_or_incomplete(self):
+        cache_sync.apply(self.bot, {"kind": "config"})
+        cache_sync.apply(self.bot, {"kind": "bullets", "guild_id": 0})
+        cache_sync.apply(self.bot, {"kind": "something", "guild_id": 1})
+
+        self.assertEqual(self.called(), set())
@@ -0,0 +1,123 @@
+import unittest
+
+import orjson
+
+import common.case_io as case_io
+
+
+class ParseJSONTest(unittest.TestCase):
+    def parse(self, *bullets: dict):
+        return case_io.parse_case(orjson.dumps({"bullets": bullets}), "json")
+
+    def test_parse(self):
+        bullets = self.parse(
+            {
+                "channel_id": 123,
+                "name": "Knife",
+                "description": "A bloody knife.",
+                "aliases": ["Blade", "Dagger", "Blade"],
+            },
+            {"channel_id": "456", "name": "Letter", "description": "A letter."},
+        )
+
+        self.assertEqual(
+            bullets,
+            [
+                case_io.CaseBullet(
+                    123, "Knife", "A bloody knife.", ["Blade", "Dagger"]
+                ),
+                case_io.CaseBullet(456, "Letter", "A letter.", []),
+            ],
+        )
+
+    def test_aliases_must_be_a_list(self):
+        with self.assertRaisesRegex(case_io.CaseFileError, "aliases"):
+            self.parse(
+                {
+                    "channel_id": 123,
+                    "name": "Knife",
+                    "description": "A bloody knife.",
+                    "aliases": "Blade",
+                }
+            )
+
+    def test_missing_or_null_fields(self):
+        with self.assertRaises(case_io.CaseFileError):
+            self.parse({"channel_id": 123, "name": "Knife"})
+        with self.assertRaises(case_io.CaseFileError):
+            self.parse({"channel_id": 123, "name": None, "description": "A knife."})
+        with self.assertRaises(case_io.CaseFileError):
+            self.parse({"name": "Knife", "description": "A knife."})
+
+    def test_not_a_case_file(self):
+        for data in (b"not json", b"[]", b'{"bullets": 1}', b'{"bullets": [1]}'):
+            with self.subTest(data=data), self.assertRaises(case_io.CaseFileError):
+                case_io.parse_case(data, "json")
+
+    def test_duplicates(self):
+        bullet = {"channel_id": 123, "name": "Knife", "description": "A knife."}
+        with self.assertRaisesRegex(case_io.CaseFileError, "more than once"):
+            self.parse(bullet, bullet)
+
+        # the same name in another channel is fine
+        self.assertEqual(len(self.parse(bullet, bullet | {"channel_id": 456})), 2)
+
+
+class ParseCSVTest(unittest.TestCase):
+    def test_parse(self):
+        bullets = case_io.parse_case(
+            "channel_id,name,description,aliases\n"
+            '123,Knife,"A knife, bloody.",Blade|Dagger\n'
+            "456,Letter,A letter.,\n",
+            "csv",
+        )
+
+        self.assertEqual(
+            bullets,
+            [
+                case_io.CaseBullet(
+                    123, "Knife", "A knife, bloody.", ["Blade", "Dagger"]
+                ),
+                case_io.CaseBullet(456, "Letter", "A letter.", []),
+            ],
+        )
+
+    def test_missing_cells(self):
+        with self.assertRaisesRegex(case_io.CaseFileError, "Line 3"):
+            case_io.parse_case(
+                b"channel_id,name,description,aliases\n"
+                b"123,Knife,A knife.,\n"
+                b"456,Letter\n",
+                "csv",
+            )
+
+    def test_extra_cells(self):
+        with self.assertRaisesRegex(case_io.CaseFileError, "Line 2"):
+            case_io.parse_case(
+                b"channel_id,name,description,aliases\n123,Knife,A knife.,,oops\n",
+                "csv",
+            )
+
+    def test_bad_channel_id(self):
+        with self.assertRaises(case_io.CaseFileError):
+            case_io.parse_case(
+                b"channel_id,name,description,aliases\nabc,Knife,A knife.,\n", "csv"
+            )
+
+    def test_validation(self):
+        with self.assertRaisesRegex(case_io.CaseFileError, "more than 5 aliases"):
+            case_io.parse_case(
+                b"channel_id,name,description,aliases\n"
+                b"123,Knife,A knife.,a|b|c|d|e|f\n",
+                "csv",
+            )
+        with self.assertRaisesRegex(case_io.CaseFileError, "has no name"):
+            case_io.parse_case(
+                b"channel_id,name,description,aliases\n123,,A knife.,\n", "csv"
+            )
+
+
+class UnknownFormatTest(unittest.TestCase):
+    def test_unknown_format(self):
+        with self.assertRaisesRegex(case_io.CaseFileError, "Unknown"):
+            case_io.parse_case(b"", "xml")
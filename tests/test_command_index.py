@@ -0,0 +1,155 @@
+import itertools
+import unittest
+
+import naff
+
+import benchmarks.replay as replay
+import common.command_index as command_index
+import common.storage as storage
+
+
+async def callback(ctx):
+    pass
+
+
+def make_command(name: str, *subcommands, aliases=(), enabled=True):
+    command = naff.PrefixedCommand(
+        name=name, callback=callback, aliases=list(aliases), enabled=enabled
+    )
+    for subcommand in subcommands:
+        command.add_command(subcommand)
+    return command
+
+
+def make_commands() -> dict[str, naff.PrefixedCommand]:
+    top_level = [
+        make_command(
+            "debug",
+            make_command("cache_info", aliases=("cache",)),
+            make_command(
+                "off", make_command("deeper"), aliases=("disabled",), enabled=False
+            ),
+            make_command("nested", make_command("leaf_cmd", aliases=("leaf",))),
+            aliases=("jsk",),
+        ),
+        make_command(
+            "prefix",
+            make_command("add"),
+            make_command("remove", aliases=("delete",)),
+            aliases=("prefixes",),
+        ),
+        make_command("edit_bullet"),
+        make_command("gone", make_command("child"), enabled=False),
+    ]
+
+    commands = {}
+    for command in top_level:
+        for name in (command.name, *command.aliases):
+            commands[name] = command
+    return commands
+
+
+def legacy_resolve(
+    content: str, commands: dict[str, naff.PrefixedCommand]
+) -> tuple[tuple[naff.PrefixedCommand, ...], str]:
+    """How commands were resolved before the index, word by word down the tree.
+    Returns the chain of commands and the invoke target."""
+    content_parameters = content
+    chain = []
+
+    while True:
+        first_word = naff.utils.get_first_word(content_parameters)
+        command_first_word = first_word.replace("-", "_") if first_word else first_word
+        level = chain[-1].subcommands if chain else commands
+        new_command = level.get(command_first_word)
+        if not new_command or not new_command.enabled:
+            break
+
+        chain.append(new_command)
+        content_parameters = content_parameters.removeprefix(first_word).strip()
+
+    return tuple(chain), content.removesuffix(content_parameters).strip()
+
+
+class CommandIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.commands = make_commands()
+        self.index = command_index.CommandIndex()
+
+    def resolve(self, content: str) -> tuple[tuple[str, ...], str]:
+        chain, end = self.index.resolve(content, self.commands)
+        return tuple(c.name for c in chain), content[:end].strip()
+
+    def test_matches_old_resolution(self):
+        words = (
+            "debug jsk cache cache_info cache-info off disabled deeper nested leaf"
+            " leaf_cmd leaf-cmd prefix prefixes add remove delete edit_bullet"
+            " edit-bullet gone child nope"
+        ).split()
+        separators = (" ", "  ", "\n", "\t ")
+
+        contents = [" ".join(combo) for combo in itertools.product(words, repeat=2)]
+        contents += [
+            sep.join(combo)
+            for combo in itertools.product(
+                ("debug", "jsk"), ("nested",), ("leaf", "leaf-cmd", "x"), ("args",)
+            )
+            for sep in separators
+        ]
+        contents += [f"{c} with some args" for c in contents[:50]] + ["", "debug"]
+
+        for content in contents:
+            with self.subTest(content=content):
+                legacy_chain, legacy_target = legacy_resolve(content, self.commands)
+                chain, target = self.resolve(content)
+                self.assertEqual(chain, tuple(c.name for c in legacy_chain))
+                if chain:
+                    self.assertEqual(target, legacy_target)
+
+    def test_aliases_and_dashes(self):
+        self.assertEqual(
+            self.resolve("jsk nested leaf-cmd a b"),
+            (("debug", "nested", "leaf_cmd"), "jsk nested leaf-cmd"),
+        )
+        self.assertEqual(
+            self.resolve("prefixes delete v!"),
+            (("prefix", "remove"), "prefixes delete"),
+        )
+        self.assertEqual(self.resolve("edit-bullet"), (("edit_bullet",), "edit-bullet"))
+
+    def test_disabled_commands(self):
+        # a disabled subcommand leaves its parent to handle it
+        self.assertEqual(self.resolve("debug off deeper"), (("debug",), "debug"))
+        self.assertEqual(self.resolve("gone child"), ((), ""))
+
+    def test_leading_whitespace(self):
+        # the old way couldn't find the first word here, and so found nothing
+        self.assertEqual(
+            self.resolve("  debug cache"), (("debug", "cache_info"), "debug cache")
+        )
+
+    def test_invalidate(self):
+        self.assertEqual(self.resolve("new")[0], ())
+
+        self.commands["new"] = make_command("new")
+        self.assertEqual(self.resolve("new")[0], ())  # still using the old index
+
+        self.index.invalidate()
+        self.assertEqual(self.resolve("new")[0], ("new",))
+
+
+class BotCommandIndexTest(unittest.TestCase):
+    def test_unloading_and_loading_extensions(self):
+        bot = replay.build_bot(storage.MemoryStorage(), replay.HTTPStub())
+
+        def resolve(content: str) -> tuple[str, ...]:
+            chain, _ = bot.command_index.resolve(content, bot.prefixed_commands)
+            return tuple(c.name for c in chain)
+
+        self.assertEqual(resolve("prefix add v?"), ("prefixes", "add"))
+
+        bot.unload_extension("exts.other_cmds")
+        self.assertEqual(resolve("prefix add v?"), ())
+
+        bot.load_extension("exts.other_cmds")
+        self.assertEqual(resolve("prefix add v?"), ("prefixes", "add"))
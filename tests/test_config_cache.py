@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import unittest
+from unittest import mock
+
+import common.config_cache as config_cache
+import common.models as models
+import common.storage as storage
+import common.utils as utils
+
+
+def make_config(guild_id: int, **kwargs):
+    return models.Config(
+        id=guild_id, guild_id=guild_id, **(storage.config_defaults() | kwargs)
+    )
+
+
+class ConfigCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.loads: list[int] = []
+
+        async def loader(guild_id: int):
+            self.loads.append(guild_id)
+            return make_config(guild_id)
+
+        self.cache = config_cache.ConfigCache(loader, maxsize=2, ttl=60)
+
+    async def test_fetch_is_cached(self):
+        config = await self.cache.fetch(1)
+
+        self.assertIs(await self.cache.fetch(1), config)
+        self.assertEqual(self.loads, [1])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.hit_ratio, 0.5)
+
+    async def test_least_recently_used_is_evicted(self):
+        await self.cache.fetch(1)
+        await self.cache.fetch(2)
+        await self.cache.fetch(1)  # so 2 is now the least recently used
+        await self.cache.fetch(3)
+
+        self.assertIn(1, self.cache)
+        self.assertNotIn(2, self.cache)
+        self.assertIn(3, self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    async def test_entries_expire(self):
+        with mock.patch.object(config_cache, "time") as clock:
+            clock.monotonic.return_value = 100.0
+            await self.cache.fetch(1)
+
+            clock.monotonic.return_value = 159.0
+            self.assertIsNotNone(self.cache.get(1))
+
+            clock.monotonic.return_value = 161.0
+            self.assertIsNone(self.cache.get(1))
+            await self.cache.fetch(1)
+
+        self.assertEqual(self.loads, [1, 1])
+
+    async def test_set_writes_through(self):
+        await self.cache.fetch(1)
+        changed = make_config(1, bullets_enabled=True)
+        self.cache.set(changed)
+
+        self.assertIs(await self.cache.fetch(1), changed)
+        self.assertEqual(self.loads, [1])
+
+    async def test_load_keeps_what_was_cached_first(self):
+        release = asyncio.Event()
+
+        async def slow_loader(guild_id: int):
+            await release.wait()
+            return make_config(guild_id)
+
+        self.cache.loader = slow_loader
+        load = asyncio.ensure_future(self.cache.load(1))
+        await asyncio.sleep(0)
+
+        cached = make_config(1, bullets_enabled=True)
+        self.cache.set(cached)
+        release.set()
+
+        # everyone should be working off of the same object
+        self.assertIs(await load, cached)
+
+    async def test_concurrent_loads_share_one(self):
+        configs = await asyncio.gather(*(self.cache.fetch(1) for _ in range(5)))
+
+        self.assertTrue(all(c is configs[0] for c in configs))
+        self.assertEqual(self.loads, [1])
+
+    async def test_caches_do_not_share_loads(self):
+        # like two bots in one process, each with their own storage
+        storages = [storage.MemoryStorage(), storage.MemoryStorage()]
+        storages[0].add_config(1, player_role=111)
+        storages[1].add_config(1, player_role=222)
+        caches = [
+            config_cache.ConfigCache(functools.partial(utils.create_or_get, s))
+            for s in storages
+        ]
+
+        first, second = await asyncio.gather(*(c.fetch(1) for c in caches))
+        self.assertIsNot(first, second)
+        self.assertEqual((first.player_role, second.player_role), (111, 222))
+        self.assertEqual([s.queries for s in storages], [1, 1])
+
+    async def test_invalidate_and_clear(self):
+        await self.cache.fetch(1)
+        await self.cache.fetch(2)
+
+        self.cache.invalidate(1)
+        self.assertNotIn(1, self.cache)
+        self.assertIn(2, self.cache)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
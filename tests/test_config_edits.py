@@ -0,0 +1,72 @@
+import contextlib
+import types
+import unittest
+from unittest import mock
+
+import common.config_cache as config_cache
+import common.models as models
+import common.prefixes as prefixes
+import common.storage as storage
+import exts.bullet_config as bullet_config
+import exts.other_cmds as other_cmds
+
+
+def unbound(command):
+    # naff binds commands to their extension once it's loaded, like in other tests
+    callback = command.callback
+    return getattr(callback, "func", callback)
+
+
+class ConfigEditTest(unittest.IsolatedAsyncioTestCase):
+    """Config commands should only change the cached config once it's saved."""
+
+    async def asyncSetUp(self):
+        self.storage = storage.MemoryStorage()
+        self.storage.add_config(1, prefixes={"v!"})
+        self.bot = types.SimpleNamespace(
+            cached_configs=config_cache.ConfigCache(self.storage.get_config),
+            prefix_cache=prefixes.PrefixCache(),
+        )
+        self.cog = types.SimpleNamespace(bot=self.bot)
+        self.cached = await self.bot.cached_configs.fetch(1)
+
+    def make_ctx(self):
+        ctx = mock.Mock(guild=mock.Mock(id=1), guild_id=1, reply=mock.AsyncMock())
+        ctx.channel.typing = contextlib.nullcontext()
+        ctx.defer = ctx.send = mock.AsyncMock()
+        ctx.fetch_config = mock.AsyncMock(return_value=self.cached)
+        return ctx
+
+    async def test_prefix_add(self):
+        with mock.patch.object(models.Config, "save", mock.AsyncMock()):
+            await unbound(other_cmds.OtherCMDs.add)(self.cog, self.make_ctx(), "v?")
+
+        self.assertEqual(self.bot.cached_configs.peek(1).prefixes, {"v!", "v?"})
+        # the old config wasn't changed, and was replaced instead
+        self.assertEqual(self.cached.prefixes, {"v!"})
+
+    async def test_failed_saves_leave_the_cache_alone(self):
+        commands = (
+            (unbound(other_cmds.OtherCMDs.add), {"prefix": "v?"}),
+            (unbound(other_cmds.OtherCMDs.remove), {"prefix": "v!"}),
+            (
+                unbound(bullet_config.BulletConfigCMDs.set_player_role),
+                {"role": mock.Mock(id=5)},
+            ),
+            (
+                unbound(bullet_config.BulletConfigCMDs.toggle_fuzzy_bullets),
+                {"toggle": True},
+            ),
+        )
+
+        for callback, kwargs in commands:
+            with self.subTest(callback.__name__), mock.patch.object(
+                models.Config, "save", mock.AsyncMock(side_effect=OSError)
+            ):
+                with self.assertRaises(OSError):
+                    await callback(self.cog, self.make_ctx(), **kwargs)
+
+                cached = self.bot.cached_configs.peek(1)
+                self.assertIs(cached, self.cached)
+                self.assertEqual(cached.prefixes, {"v!"})
+                self.assertEqual((cached.player_role, cached.fuzzy_bullets), (0, False))
@@ -0,0 +1,146 @@
+import asyncio
+import unittest
+
+import common.guild_search as guild_search
+import common.storage as storage
+
+
+class SlowStorage(storage.MemoryStorage):
+    """Only finishes loading a guild's names once told to."""
+
+    def __init__(self):
+        super().__init__()
+        self.loading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def bullet_names_in_guild(self, guild_id: int) -> list[tuple[int, str]]:
+        names = await super().bullet_names_in_guild(guild_id)
+        self.loading.set()
+        await self.release.wait()
+        return names
+
+
+class TrigramsTest(unittest.TestCase):
+    def test_trigrams(self):
+        self.assertEqual(
+            guild_search.trigrams("Knife"), {" kn", "kni", "nif", "ife", "fe "}
+        )
+        self.assertEqual(guild_search.trigrams("a"), {" a "})
+        self.assertEqual(guild_search.trigrams(""), set())
+
+
+class GuildNamesTest(unittest.TestCase):
+    def setUp(self):
+        self.names = guild_search.GuildNames(
+            [(1, "Knife"), (2, "Knife"), (1, "Letter"), (3, "Kitchen Knife")]
+        )
+
+    def test_search(self):
+        self.assertEqual(
+            self.names.search("knife"),
+            [(1, "Knife"), (2, "Knife"), (3, "Kitchen Knife")],
+        )
+        self.assertEqual(self.names.search("letter"), [(1, "Letter")])
+        self.assertEqual(self.names.search("zzz"), [])
+
+    def test_empty_query(self):
+        self.assertEqual(self.names.search("", limit=2), [(1, "Knife"), (2, "Knife")])
+
+    def test_ties_are_ordered_by_name_and_channel(self):
+        names = guild_search.GuildNames([(5, "rope"), (2, "Rope"), (3, "rope")])
+        self.assertEqual(names.search("rope"), [(2, "Rope"), (3, "rope"), (5, "rope")])
+
+    def test_add_and_remove(self):
+        self.names.add(4, "Rope")
+        self.names.add(4, "Rope")  # adding twice does nothing
+        self.assertEqual(len(self.names), 5)
+        self.assertEqual(self.names.search("rope"), [(4, "Rope")])
+
+        self.names.remove(4, "Rope")
+        self.names.remove(4, "Rope")
+        self.assertEqual(self.names.search("rope"), [])
+        # and nothing is left behind in the index
+        self.assertNotIn("rop", self.names._postings)
+
+        self.names.remove(1, "Knife")
+        self.assertEqual(self.names.search("knife")[0], (2, "Knife"))
+        self.assertIn("kni", self.names._postings)
+
+    def test_max_candidates(self):
+        names = guild_search.GuildNames(
+            [(1, f"Knife {i}") for i in range(10)] + [(1, "Knife")]
+        )
+        # the names sharing the most trigrams with the query are the ones scored
+        self.assertEqual(names.search("knife 7", max_candidates=1), [(1, "Knife 7")])
+        self.assertEqual(len(names.search("knife", limit=None, max_candidates=3)), 3)
+
+
+class GuildSearchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = storage.MemoryStorage()
+        self.search = guild_search.GuildSearch(self.storage)
+        for channel_id, name in ((1, "Knife"), (2, "Letter")):
+            self.storage.add_bullet(
+                name=name,
+                aliases=set(),
+                description=f"A {name}.",
+                channel_id=channel_id,
+                guild_id=1,
+            )
+
+    async def test_fetch_is_cached(self):
+        results = await asyncio.gather(*(self.search.fetch(1) for _ in range(3)))
+
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertIs(await self.search.fetch(1), results[0])
+        self.assertEqual(self.storage.queries, 1)
+        self.assertEqual(await self.search.search(1, "letter"), [(2, "Letter")])
+
+    async def test_add_and_remove(self):
+        await self.search.fetch(1)
+        self.search.add(1, 3, "Rope")
+        self.search.remove(1, 1, "Knife")
+
+        self.assertEqual(await self.search.search(1, "rope"), [(3, "Rope")])
+        self.assertEqual(await self.search.search(1, "knife"), [])
+
+        # guilds that weren't loaded are left to be loaded in full
+        self.search.add(2, 3, "Rope")
+        self.assertIsNone(self.search.get(2))
+
+    async def test_change_during_load(self):
+        self.storage = SlowStorage()
+        self.storage.add_bullet(
+            name="Knife",
+            aliases=set(),
+            description="A knife.",
+            channel_id=1,
+            guild_id=1,
+        )
+        self.search = guild_search.GuildSearch(self.storage)
+
+        load = asyncio.ensure_future(self.search.fetch(1))
+        await self.storage.loading.wait()
+        self.search.add(1, 2, "Letter")
+        self.storage.release.set()
+
+        # what was loaded is used this once, but isn't kept
+        self.assertEqual(len(await load), 1)
+        self.assertIsNone(self.search.get(1))
+
+    async def test_clear_during_load(self):
+        self.storage = SlowStorage()
+        self.search = guild_search.GuildSearch(self.storage)
+
+        load = asyncio.ensure_future(self.search.fetch(1))
+        await self.storage.loading.wait()
+        self.search.clear()
+        self.storage.release.set()
+
+        await load
+        self.assertIsNone(self.search.get(1))
+
+    async def test_invalidate(self):
+        await self.search.fetch(1)
+        self.search.invalidate(1)
+        self.assertIsNone(self.search.get(1))
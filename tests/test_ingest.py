@@ -0,0 +1,81 @@
+import types
+import typing
+import unittest
+from unittest import mock
+
+import naff
+
+import common.ingest as ingest
+import common.models as models
+
+
+def make_message(
+    content: str = "a knife",
+    guild_id: typing.Optional[int] = 1,
+    roles: frozenset[int] = frozenset({5}),
+    **kwargs,
+):
+    author = types.SimpleNamespace(
+        bot=kwargs.pop("bot", False),
+        system=kwargs.pop("system", False),
+        has_role=lambda role: role in roles,
+    )
+    return types.SimpleNamespace(
+        content=content,
+        guild=types.SimpleNamespace(id=guild_id) if guild_id else None,
+        author=author,
+        type=kwargs.pop("type", naff.enums.MessageTypes.DEFAULT),
+        **kwargs,
+    )
+
+
+class MayFindBulletsTest(unittest.TestCase):
+    def test_normal_message(self):
+        self.assertTrue(ingest.may_find_bullets(make_message()))
+
+    def test_skipped_messages(self):
+        for name, message in (
+            ("empty", make_message(content="")),
+            ("dm", make_message(guild_id=None)),
+            ("bot", make_message(bot=True)),
+            ("system", make_message(system=True)),
+            ("pin", make_message(type=naff.enums.MessageTypes.CHANNEL_PINNED_MESSAGE)),
+        ):
+            with self.subTest(name):
+                self.assertFalse(ingest.may_find_bullets(message))
+
+
+class PlayerCanFindTest(unittest.TestCase):
+    def make_config(self, **kwargs):
+        return models.Config(
+            guild_id=1, **{"bullets_enabled": True, "player_role": 5} | kwargs
+        )
+
+    def test_player(self):
+        self.assertTrue(ingest.player_can_find(make_message(), self.make_config()))
+
+    def test_not_a_player(self):
+        message = make_message(roles=frozenset({6}))
+        self.assertFalse(ingest.player_can_find(message, self.make_config()))
+
+    def test_bullets_disabled(self):
+        config = self.make_config(bullets_enabled=False)
+        self.assertFalse(ingest.player_can_find(make_message(), config))
+
+    def test_no_player_role(self):
+        # nobody has role 0, but don't even ask
+        message = make_message(roles=frozenset({0}))
+        config = self.make_config(player_role=0)
+        self.assertFalse(ingest.player_can_find(message, config))
+
+
+class BulletChannelIdTest(unittest.TestCase):
+    def test_channel(self):
+        message = make_message(channel=types.SimpleNamespace(id=10))
+        self.assertEqual(ingest.bullet_channel_id(message), 10)
+
+    def test_thread_uses_its_parent(self):
+        thread = mock.Mock(spec=naff.ThreadChannel, id=11)
+        thread.parent_channel.id = 10
+        message = make_message(channel=thread)
+        self.assertEqual(ingest.bullet_channel_id(message), 10)
@@ -0,0 +1,103 @@
+import random
+import unittest
+
+import common.keyword_matcher as keyword_matcher
+
+
+def naive_search(keywords: dict[int, tuple[str, ...]], text: str) -> set[int]:
+    return {key for key, words in keywords.items() if any(w in text for w in words)}
+
+
+class KeywordAutomatonTest(unittest.TestCase):
+    def test_search(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("he", "hers"))
+        automaton.add(2, ("she",))
+        automaton.add(3, ("his",))
+        automaton.add(4, ("knife",))
+
+        self.assertEqual(automaton.search("ushers"), {1, 2})
+        self.assertEqual(automaton.search("this"), {3})
+        self.assertEqual(automaton.search("a kni fe"), set())
+        self.assertEqual(automaton.search(""), set())
+
+    def test_empty_keyword_is_always_found(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("",))
+
+        self.assertEqual(automaton.search("anything"), {1})
+
+    def test_add_replaces(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("knife",))
+        automaton.add(1, ("letter",))
+
+        self.assertEqual(automaton.search("knife"), set())
+        self.assertEqual(automaton.search("letter"), {1})
+        self.assertEqual(len(automaton), 1)
+
+    def test_remove_does_not_rebuild(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("knife", "blade"))
+        automaton.add(2, ("knife handle",))
+        self.assertEqual(automaton.search("knife handle"), {1, 2})
+
+        fail = automaton._fail
+        automaton.remove(1)
+        automaton.remove(3)  # not in it, so nothing happens
+
+        self.assertEqual(automaton.search("knife handle"), {2})
+        self.assertEqual(automaton.search("blade"), set())
+        self.assertNotIn(1, automaton)
+        self.assertIs(automaton._fail, fail)
+
+    def test_remove_then_add_again(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("knife",))
+        automaton.search("")
+        automaton.remove(1)
+        automaton.add(1, ("knife",))
+
+        self.assertEqual(automaton.search("a knife"), {1})
+
+    def test_keywords_inside_keywords(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        automaton.add(1, ("abcd",))
+        automaton.add(2, ("bc",))
+        automaton.add(3, ("c",))
+        automaton.add(4, ("bcx",))
+
+        # failing out of abcd at x has to land on bc, and then find bcx
+        self.assertEqual(automaton.search("abcx"), {2, 3, 4})
+        self.assertEqual(automaton.search("abcd"), {1, 2, 3})
+
+    def test_build_is_linear(self):
+        automaton = keyword_matcher.KeywordAutomaton()
+        for key in range(200):
+            automaton.add(key, (f"bullet {key}", f"alias {key}", f"other {key}"))
+        automaton.search("")
+
+        # one failure link and output link per node, and no copied transitions
+        nodes = len(automaton._goto)
+        self.assertEqual(len(automaton._fail), nodes)
+        self.assertEqual(sum(len(edges) for edges in automaton._goto), nodes - 1)
+
+    def test_matches_naive_search(self):
+        rng = random.Random(0)
+        automaton = keyword_matcher.KeywordAutomaton()
+        keywords: dict[int, tuple[str, ...]] = {}
+
+        def word():
+            return "".join(rng.choices("abc", k=rng.randint(1, 4)))
+
+        for _ in range(500):
+            key = rng.randrange(30)
+            if rng.random() < 0.4:
+                automaton.remove(key)
+                keywords.pop(key, None)
+            else:
+                keywords[key] = tuple(word() for _ in range(rng.randint(1, 3)))
+                automaton.add(key, keywords[key])
+
+            text = "".join(rng.choices("abc ", k=rng.randint(0, 20)))
+            self.assertEqual(automaton.search(text), naive_search(keywords, text))
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+
+import naff
+from naff.api.http.http_client import BucketLock
+from naff.api.http.route import Route
+
+import benchmarks.replay as replay
+import common.metrics as metrics
+import common.storage as storage
+from tests.test_role_worker import FakeSession
+from tests.test_role_worker import LIMIT
+
+
+class RegistryTest(unittest.TestCase):
+    def test_histogram(self):
+        histogram = metrics.Histogram((1, 2, 5))
+        for value in (0.5, 1.5, 1.5, 4, 10):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.average, 3.5)
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertEqual(histogram.quantile(1), 10)
+
+    def test_render_prometheus(self):
+        registry = metrics.Registry()
+        registry.inc("db_queries_total", 2)
+        registry.observe("listener_seconds", 0.01, (0.1,), event="x", listener="y")
+
+        rendered = registry.render_prometheus()
+        self.assertIn("uibot_db_queries_total 2", rendered)
+        self.assertIn(
+            'uibot_listener_seconds_bucket{event="x",listener="y",le="0.1"} 1',
+            rendered,
+        )
+
+
+class MeteredHTTPClientTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.http = metrics.MeteredHTTPClient()
+        self.http._HTTPClient__session = FakeSession()
+
+    async def test_rate_limit_waits_are_counted(self):
+        # the fake answers like a member role bucket, which is fine for any route
+        for member_id in range(LIMIT):
+            await self.http.request(
+                Route("PUT", f"/guilds/1/members/{member_id}/roles/2")
+            )
+
+        waited = metrics.registry.counter("rate_limit_wait_seconds_total")
+        self.assertGreater(waited, 0)
+
+    async def test_registered_locks_are_kept(self):
+        route = Route("GET", "/users/@me")
+        lock = BucketLock()
+        self.http.ingest_ratelimit(route, {"x-ratelimit-bucket": "hash"}, lock)
+
+        self.assertIs(self.http.get_ratelimit(route), lock)
+        self.assertIsInstance(
+            self.http.get_ratelimit(Route("GET", "/gateway/bot")),
+            metrics.MeteredBucketLock,
+        )
+
+
+class ListenerMetricsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_listeners_are_timed_on_their_own(self):
+        metrics.registry.clear()
+        bot = replay.build_bot(storage.MemoryStorage(), replay.HTTPStub())
+        self.assertIsInstance(bot.http, metrics.MeteredHTTPClient)
+
+        async def on_startup_one():
+            pass
+
+        async def on_startup_two():
+            await asyncio.sleep(0)
+
+        for callback in (on_startup_one, on_startup_two):
+            listener = naff.Listener.create("startup")(callback)
+            await bot._queue_task(listener, naff.events.Startup())
+
+        labels = [
+            labels
+            for labels, _ in metrics.registry.histograms_named("listener_seconds")
+        ]
+        self.assertEqual(
+            labels,
+            [
+                (("event", "startup"), ("listener", "on_startup_one")),
+                (("event", "startup"), ("listener", "on_startup_two")),
+            ],
+        )
+        await bot.http.close()
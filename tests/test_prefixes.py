@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import common.prefixes as prefixes
+
+
+class PrefixMatcherTest(unittest.TestCase):
+    def test_prefers_the_longest_prefix(self):
+        matcher = prefixes.PrefixMatcher({"v", "v!", "v!!"})
+
+        self.assertEqual(matcher.match("v!!help"), "v!!")
+        self.assertEqual(matcher.match("v!help"), "v!")
+        self.assertEqual(matcher.match("vhelp"), "v")
+
+    def test_no_match(self):
+        matcher = prefixes.PrefixMatcher({"v!", "?"})
+
+        self.assertIsNone(matcher.match(""))
+        self.assertIsNone(matcher.match("hello"))
+        self.assertIsNone(matcher.match("vhelp"))
+        # prefixes only count at the start
+        self.assertIsNone(matcher.match("hello v!help"))
+
+    def test_prefixes_are_escaped(self):
+        matcher = prefixes.PrefixMatcher({"."})
+
+        self.assertEqual(matcher.match(".help"), ".")
+        self.assertIsNone(matcher.match("xhelp"))
+
+    def test_empty_prefixes_are_ignored(self):
+        matcher = prefixes.PrefixMatcher({"", "v!"})
+
+        self.assertEqual(matcher.prefixes, {"v!"})
+        self.assertIsNone(matcher.match("help"))
+
+    def test_first_character_rejects_without_the_regex(self):
+        matcher = prefixes.PrefixMatcher({"v!", "?"})
+        matcher._regex = mock.Mock(wraps=matcher._regex)
+
+        self.assertIsNone(matcher.match("hello"))
+        matcher._regex.match.assert_not_called()
+
+        self.assertIsNone(matcher.match("vhelp"))
+        matcher._regex.match.assert_called_once_with("vhelp")
+
+
+class PrefixCacheTest(unittest.TestCase):
+    def test_mention_prefixes(self):
+        self.assertEqual(prefixes.mention_prefixes(10), {"<@10> ", "<@!10> "})
+
+    def test_mentions_always_work(self):
+        cache = prefixes.PrefixCache()
+        matcher = cache.build(1, {"v!"}, 10)
+
+        self.assertEqual(matcher.match("<@10> help"), "<@10> ")
+        self.assertEqual(matcher.match("<@!10> help"), "<@!10> ")
+        self.assertEqual(matcher.match("v!help"), "v!")
+        # without the space, or for someone else, it's not a prefix
+        self.assertIsNone(matcher.match("<@10>help"))
+        self.assertIsNone(matcher.match("<@11> help"))
+
+    def test_guilds_and_dms(self):
+        cache = prefixes.PrefixCache()
+        guild = cache.build(1, {"v!"}, 10)
+        dms = cache.build(None, set(), 10)
+
+        self.assertIs(cache.get(1), guild)
+        self.assertIs(cache.get(None), dms)
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(len(cache), 2)
+
+        self.assertIsNone(dms.match("v!help"))
+        self.assertEqual(dms.match("<@10> help"), "<@10> ")
+
+    def test_invalidate(self):
+        cache = prefixes.PrefixCache()
+        cache.build(1, {"v!"}, 10)
+        cache.build(None, set(), 10)
+
+        cache.invalidate(1)
+        cache.invalidate(2)
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(None))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,156 @@
+import asyncio
+import unittest
+
+import common.models as models
+import common.progress as progress
+import common.storage as storage
+
+
+class SlowStorage(storage.MemoryStorage):
+    """Only finishes loading a guild's finders once told to."""
+
+    def __init__(self):
+        super().__init__()
+        self.loading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def finders_in_guild(self, guild_id: int) -> list[tuple[bool, int]]:
+        finders = await super().finders_in_guild(guild_id)
+        self.loading.set()
+        await self.release.wait()
+        return finders
+
+
+def make_bullet(bullet_id: int, found: bool = False, finder: int = 0):
+    return models.TruthBullet(
+        id=bullet_id,
+        name=f"bullet {bullet_id}",
+        aliases=set(),
+        description="A Truth Bullet.",
+        channel_id=1,
+        guild_id=1,
+        found=found,
+        finder=finder,
+    )
+
+
+class GuildProgressTest(unittest.TestCase):
+    def test_counts(self):
+        guild = progress.GuildProgress()
+        self.assertFalse(guild.complete)  # no bullets at all isn't complete
+
+        guild.apply(False, 0)
+        guild.apply(True, 10)
+        self.assertEqual((guild.total, guild.unfound), (2, 1))
+        self.assertFalse(guild.complete)
+
+        guild.apply(False, 0, -1)
+        self.assertTrue(guild.complete)
+
+        guild.apply(True, 10, -1)
+        self.assertNotIn(10, guild.finders)
+        self.assertFalse(guild.complete)
+
+    def test_best_detectives(self):
+        guild = progress.GuildProgress()
+        self.assertEqual(guild.best_detectives(), (0, ()))
+
+        for finder in (10, 20, 20, 30, 30):
+            guild.apply(True, finder)
+        self.assertEqual(guild.best_detectives(), (2, (20, 30)))
+
+        guild.apply(True, 30)
+        self.assertEqual(guild.best_detectives(), (3, (30,)))
+
+
+class ProgressTrackerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = storage.MemoryStorage()
+        self.tracker = progress.ProgressTracker(self.storage)
+
+    def add_bullet(self, name: str, guild_id: int = 1) -> models.TruthBullet:
+        return self.storage.add_bullet(
+            name=name,
+            aliases=set(),
+            description=f"A {name}.",
+            channel_id=guild_id,
+            guild_id=guild_id,
+        )
+
+    async def test_fetch_is_cached(self):
+        self.add_bullet("knife")
+        results = await asyncio.gather(*(self.tracker.fetch(1) for _ in range(3)))
+
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertIs(await self.tracker.fetch(1), results[0])
+        self.assertEqual(self.storage.queries, 1)
+        self.assertEqual(results[0].unfound, 1)
+
+    async def test_add_change_remove(self):
+        knife = self.add_bullet("knife")
+        guild = await self.tracker.fetch(1)
+
+        letter = make_bullet(2)
+        self.tracker.add(letter)
+        self.assertEqual((guild.total, guild.unfound), (2, 2))
+
+        knife.found, knife.finder = True, 10
+        self.tracker.change(knife, was_found=False, old_finder=0)
+        self.assertEqual(guild.unfound, 1)
+        self.assertEqual(guild.finders, {10: 1})
+
+        # like unfinding it
+        knife.found, knife.finder = False, 0
+        self.tracker.change(knife, was_found=True, old_finder=10)
+        self.assertEqual(guild.unfound, 2)
+        self.assertEqual(guild.finders, {})
+
+        self.tracker.remove(letter)
+        self.tracker.remove(knife)
+        self.assertEqual((guild.total, guild.unfound), (0, 0))
+
+    async def test_changes_to_unloaded_guilds_are_ignored(self):
+        self.tracker.add(make_bullet(1))
+        self.assertIsNone(self.tracker.get(1))
+
+    async def test_change_during_load(self):
+        self.storage = SlowStorage()
+        self.tracker = progress.ProgressTracker(self.storage)
+        knife = self.add_bullet("knife")
+
+        load = asyncio.ensure_future(self.tracker.fetch(1))
+        await self.storage.loading.wait()
+        self.tracker.change(
+            make_bullet(knife.id, found=True, finder=10), was_found=False, old_finder=0
+        )
+        self.storage.release.set()
+
+        # what was loaded is used this once, but isn't kept
+        self.assertEqual((await load).unfound, 1)
+        self.assertIsNone(self.tracker.get(1))
+
+    async def test_reconcile(self):
+        knife = self.add_bullet("knife")
+        guild = await self.tracker.fetch(1)
+
+        # another process found it, so the counts here are out of date
+        await self.storage.claim_bullet(knife.id, 10)
+        self.assertFalse(guild.complete)
+
+        reconciled = await self.tracker.reconcile(1)
+        self.assertIsNot(reconciled, guild)
+        self.assertTrue(reconciled.complete)
+        self.assertIs(self.tracker.get(1), reconciled)
+
+    async def test_invalidate_and_clear(self):
+        self.add_bullet("knife")
+        self.add_bullet("rope", guild_id=2)
+        await self.tracker.fetch(1)
+        await self.tracker.fetch(2)
+
+        self.tracker.invalidate(1)
+        self.assertIsNone(self.tracker.get(1))
+        self.assertIsNotNone(self.tracker.get(2))
+
+        self.tracker.clear()
+        self.assertIsNone(self.tracker.get(2))
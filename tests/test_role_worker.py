@@ -0,0 +1,157 @@
+import asyncio
+import types
+import unittest
+
+import naff
+import orjson
+from multidict import CIMultiDict
+from naff.api.http.http_client import HTTPClient
+
+import common.metrics as metrics
+import common.role_worker as role_worker
+
+LIMIT = 3
+RESET_AFTER = 0.2
+
+
+class FakeResponse:
+    def __init__(self, status: int, headers: dict[str, str], body: dict):
+        self.status = status
+        self.reason = "Too Many Requests" if status == 429 else "OK"
+        self.headers = CIMultiDict(headers | {"content-type": "application/json"})
+        self.body = orjson.dumps(body).decode()
+
+    async def text(self, encoding=None):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    """Stands in for naff's aiohttp session, answering like Discord does for
+    member roles - letting LIMIT requests through every RESET_AFTER seconds,
+    with every member in the same bucket."""
+
+    closed = False
+
+    def __init__(self, forbidden: frozenset[int] = frozenset()):
+        self.forbidden = forbidden
+        self.sent: list[tuple[float, int]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.over_limit = 0
+        self._window_start = -RESET_AFTER
+        self._window_count = 0
+
+    def request(self, method: str, url: str, **kwargs):
+        return self._respond(int(url.split("/")[-3]))
+
+    def _respond(self, member_id: int):
+        session = self
+
+        class Respond:
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                try:
+                    await asyncio.sleep(0.01)  # like the trip to Discord and back
+                    return session._answer(member_id)
+                finally:
+                    session.in_flight -= 1
+
+            async def __aexit__(self, *args):
+                pass
+
+        return Respond()
+
+    def _answer(self, member_id: int) -> FakeResponse:
+        now = asyncio.get_running_loop().time()
+        if now - self._window_start >= RESET_AFTER:
+            self._window_start, self._window_count = now, 0
+        reset_after = self._window_start + RESET_AFTER - now
+
+        if self._window_count >= LIMIT:
+            self.over_limit += 1
+            return FakeResponse(
+                429,
+                {
+                    "x-ratelimit-bucket": "member-roles-hash",
+                    "x-ratelimit-limit": str(LIMIT),
+                    "x-ratelimit-remaining": "0",
+                    "x-ratelimit-reset-after": str(reset_after),
+                },
+                {
+                    "message": "You are being rate limited.",
+                    "retry_after": reset_after,
+                    "global": False,
+                },
+            )
+
+        self._window_count += 1
+        self.sent.append((now, member_id))
+        headers = {
+            "x-ratelimit-bucket": "member-roles-hash",
+            "x-ratelimit-limit": str(LIMIT),
+            "x-ratelimit-remaining": str(LIMIT - self._window_count),
+            "x-ratelimit-reset-after": str(reset_after),
+        }
+        if member_id in self.forbidden:
+            return FakeResponse(403, headers, {"message": "Missing Permissions"})
+        return FakeResponse(204, headers, {})
+
+
+class AddRoleToMembersTest(unittest.IsolatedAsyncioTestCase):
+    def make_bot(self, **kwargs):
+        # naff's real http client, with only the connection to Discord faked
+        http = HTTPClient()
+        self.session = http._HTTPClient__session = FakeSession(**kwargs)
+        return types.SimpleNamespace(http=http)
+
+    def setUp(self):
+        metrics.registry.clear()
+
+    async def test_stays_within_the_rate_limit(self):
+        bot = self.make_bot()
+        result = await role_worker.add_role_to_members(bot, 1, 2, range(7))
+
+        self.assertCountEqual(result.given, range(7))
+        self.assertEqual(result.failures, {})
+        self.assertEqual(self.session.over_limit, 0)
+
+        # 1 and then 2 use up the first window, and then 3 and 1 go out after
+        # each reset - the bucket ran out twice with members left to go
+        self.assertGreater(result.rate_limited_for, 0)
+        self.assertLessEqual(result.rate_limited_for, 2 * RESET_AFTER)
+        self.assertEqual(
+            metrics.registry.counter("rate_limit_wait_seconds_total"),
+            result.rate_limited_for,
+        )
+
+    async def test_sends_what_is_left_in_the_bucket_at_once(self):
+        bot = self.make_bot()
+        await role_worker.add_role_to_members(bot, 1, 2, range(7))
+
+        self.assertEqual(self.session.max_in_flight, LIMIT)
+        times = [t for t, _ in self.session.sent]
+        # and once the bucket resets, a whole batch goes out together
+        self.assertLess(times[5] - times[3], 0.01)
+
+    async def test_failures(self):
+        bot = self.make_bot(forbidden=frozenset({3, 5}))
+        result = await role_worker.add_role_to_members(bot, 1, 2, range(6))
+
+        self.assertCountEqual(result.given, (0, 1, 2, 4))
+        self.assertCountEqual(result.failures, (3, 5))
+        self.assertIsInstance(result.failures[3], naff.errors.Forbidden)
+        self.assertEqual(self.session.over_limit, 0)
+
+    async def test_no_members(self):
+        bot = self.make_bot()
+        result = await role_worker.add_role_to_members(bot, 1, 2, ())
+
+        self.assertEqual(result, role_worker.RoleAssignment())
+        self.assertEqual(self.session.sent, [])
@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import multiprocessing
+import time
+import unittest
+
+import naff
+
+import benchmarks.replay as replay
+import common.broker as broker
+import common.cache_sync as cache_sync
+import common.sharding as sharding
+import common.storage as storage
+
+TOTAL_SHARDS = 2
+INTERVAL = 0.2
+
+
+def make_locks() -> list:
+    # the same kind of locks run_workers gives each process
+    ctx = multiprocessing.get_context("spawn")
+    return [ctx.Lock() for _ in range(TOTAL_SHARDS)]
+
+
+class FakeDiscord(replay.HTTPStub):
+    """Answers what logging in asks for, on top of what HTTPStub answers."""
+
+    async def request(self, route, payload=naff.MISSING, *args, **kwargs):
+        if route.method == "GET" and route.path == "/users/@me":
+            return replay.BOT_USER | {"verified": True, "mfa_enabled": False}
+        if route.method == "GET" and route.path == "/oauth2/applications/@me":
+            return {
+                "id": replay.BOT_USER["id"],
+                "name": "Ultimate Investigator",
+                "summary": "",
+                "owner": replay.BOT_USER,
+            }
+        if route.method == "GET" and route.path == "/gateway/bot":
+            return {
+                "url": "wss://gateway.discord.gg",
+                "shards": TOTAL_SHARDS,
+                "session_start_limit": {"max_concurrency": 1},
+            }
+        return await super().request(route, payload, *args, **kwargs)
+
+
+class FakeShard:
+    """Stands in for a shard's gateway connection, noting when it identified."""
+
+    def __init__(self, shard_id: int, identified: list[tuple[float, int]]):
+        self.shard_id = shard_id
+        self.identified = identified
+        self._shard_ready = asyncio.Event()
+
+    async def start(self):
+        self.identified.append((time.monotonic(), self.shard_id))
+        self._shard_ready.set()
+
+    async def stop(self):
+        pass
+
+
+class ShardsTest(unittest.TestCase):
+    def test_split_shards(self):
+        self.assertEqual(sharding.split_shards(5, 2), [(0, 2, 4), (1, 3)])
+        self.assertEqual(sharding.split_shards(2, 5), [(0,), (1,)])
+        self.assertEqual(sharding.split_shards(3, 0), [(0, 1, 2)])
+
+    def test_shard_for_guild(self):
+        self.assertEqual(sharding.shard_for_guild(3 << 22, 2), 1)
+        self.assertEqual(sharding.shard_for_guild((4 << 22) + 12345, 2), 0)
+
+
+class IdentifyGateTest(unittest.IsolatedAsyncioTestCase):
+    async def identify(self, gate, shard_ids, max_concurrency, identified):
+        for shard_id in shard_ids:
+            async with gate.turn(shard_id, max_concurrency):
+                identified.append((time.monotonic(), shard_id))
+
+    async def test_one_at_a_time_across_gates(self):
+        locks = make_locks()
+        identified = []
+        # a gate for each process, sharing the same locks
+        await asyncio.gather(
+            self.identify(
+                sharding.IdentifyGate(locks, INTERVAL), (0, 2), 1, identified
+            ),
+            self.identify(
+                sharding.IdentifyGate(locks, INTERVAL), (1, 3), 1, identified
+            ),
+        )
+
+        times = sorted(t for t, _ in identified)
+        self.assertEqual(len(times), 4)
+        for before, after in zip(times, times[1:]):
+            self.assertGreaterEqual(after - before, INTERVAL - 0.01)
+
+    async def test_buckets_identify_together(self):
+        locks = make_locks()
+        identified = []
+        start = time.monotonic()
+        await asyncio.gather(
+            self.identify(sharding.IdentifyGate(locks, INTERVAL), (0,), 2, identified),
+            self.identify(sharding.IdentifyGate(locks, INTERVAL), (1,), 2, identified),
+        )
+
+        # shards 0 and 1 are in different buckets, so neither waited on the other
+        self.assertLess(max(t for t, _ in identified) - start, INTERVAL / 2)
+
+
+class ShardedBotTest(unittest.IsolatedAsyncioTestCase):
+    """Runs a bot for each shard in this process, with a fake gateway that sends
+    each guild's events to the bot with its shard, like Discord would."""
+
+    async def asyncSetUp(self):
+        self.storage = storage.MemoryStorage()
+        self.hub = broker.LocalHub()
+        self.snowflake = replay.Snowflakes()
+        self.identified: list[tuple[float, int]] = []
+        locks = make_locks()
+
+        self.bots = [
+            self.make_bot(shard_id, sharding.IdentifyGate(locks, INTERVAL))
+            for shard_id in range(TOTAL_SHARDS)
+        ]
+
+    async def asyncTearDown(self):
+        for bot in self.bots:
+            await bot.http.close()
+
+    def make_bot(self, shard_id: int, gate: sharding.IdentifyGate):
+        bot = replay.build_bot(
+            self.storage,
+            FakeDiscord(),
+            cache_broker=broker.LocalBroker(f"shard-{shard_id}", self.hub),
+            shard_ids=(shard_id,),
+            total_shards=TOTAL_SHARDS,
+            identify_gate=gate,
+        )
+        # what on_startup and stop do, without the database
+        bot.broker.subscribe(functools.partial(cache_sync.apply, bot))
+        bot.stop = functools.partial(naff.AutoShardedClient.stop, bot)
+
+        login = bot.login
+
+        async def fake_login(token):
+            await login(token)
+            bot._connection_states = [
+                FakeShard(state.shard_id, self.identified)
+                for state in bot._connection_states
+            ]
+
+        bot.login = fake_login
+        return bot
+
+    def add_guild(self, shard_id: int) -> dict:
+        """Adds a guild on the shard, with bullets enabled and two bullets -
+        so finding one doesn't end the game, which needs the database."""
+        guild_id = (
+            (self.snowflake() >> 22) // TOTAL_SHARDS * TOTAL_SHARDS + shard_id
+        ) << 22
+        self.assertEqual(sharding.shard_for_guild(guild_id, TOTAL_SHARDS), shard_id)
+
+        guild = {
+            "guild_id": guild_id,
+            "channel_id": guild_id + 1,
+            "bullet_chan": guild_id + 2,
+            "player_role": guild_id + 3,
+        }
+        self.storage.add_config(
+            guild_id,
+            bullet_chan_id=guild["bullet_chan"],
+            player_role=guild["player_role"],
+            bullets_enabled=True,
+        )
+        for name in ("knife", "letter"):
+            self.storage.add_bullet(
+                name=name,
+                aliases=set(),
+                description=f"A {name}.",
+                channel_id=guild["channel_id"],
+                guild_id=guild_id,
+            )
+        self.gateway(
+            guild_id,
+            "GUILD_CREATE",
+            {
+                "id": str(guild_id),
+                "name": f"Guild {guild_id}",
+                "owner_id": "1",
+                "roles": [
+                    {
+                        "id": str(role_id),
+                        "name": name,
+                        "permissions": "0",
+                        "color": 0,
+                        "position": position,
+                    }
+                    for position, (role_id, name) in enumerate(
+                        ((guild_id, "@everyone"), (guild["player_role"], "Player"))
+                    )
+                ],
+                "channels": [
+                    {"id": str(c), "type": 0, "name": f"channel-{c}"}
+                    for c in (guild["channel_id"], guild["bullet_chan"])
+                ],
+                "member_count": 1,
+                "joined_at": replay.iso_now(),
+                "preferred_locale": "en-US",
+            },
+        )
+        return guild
+
+    def gateway(self, guild_id: int, event: str, data: dict):
+        bot = self.bots[sharding.shard_for_guild(guild_id, TOTAL_SHARDS)]
+        if event == "GUILD_CREATE":
+            bot.cache.place_guild_data(data)
+            return None
+        return replay.replay_message(bot, data)
+
+    def message(self, guild: dict, user_id: int, content: str) -> dict:
+        return {
+            "id": str(self.snowflake()),
+            "channel_id": str(guild["channel_id"]),
+            "guild_id": str(guild["guild_id"]),
+            "author": {
+                "id": str(user_id),
+                "username": f"User {user_id}",
+                "discriminator": "0001",
+                "avatar": None,
+            },
+            "member": {
+                "roles": [str(guild["player_role"])],
+                "joined_at": replay.iso_now(),
+            },
+            "content": content,
+            "timestamp": replay.iso_now(),
+            "type": 0,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+        }
+
+    async def test_login_only_keeps_own_shards(self):
+        for shard_id, bot in enumerate(self.bots):
+            await bot.login("token")
+            self.assertEqual(
+                [state.shard_id for state in bot._connection_states], [shard_id]
+            )
+
+    async def test_shards_take_turns_identifying(self):
+        await asyncio.gather(*(bot.astart("token") for bot in self.bots))
+
+        self.assertCountEqual([shard_id for _, shard_id in self.identified], (0, 1))
+        first, second = sorted(t for t, _ in self.identified)
+        self.assertGreaterEqual(second - first, INTERVAL - 0.01)
+
+    async def test_guilds_are_handled_by_their_shard(self):
+        guilds = [self.add_guild(shard_id) for shard_id in range(TOTAL_SHARDS)]
+
+        for user_id, guild in enumerate(guilds, start=1):
+            await self.gateway(
+                guild["guild_id"],
+                "MESSAGE_CREATE",
+                self.message(guild, user_id, "a knife!"),
+            )
+
+        for shard_id, (bot, guild) in enumerate(zip(self.bots, guilds)):
+            self.assertEqual(bot.errors, [])
+            # each bot only ever loaded its own guild
+            self.assertIsNotNone(bot.cached_configs.get(guild["guild_id"]))
+            other = guilds[1 - shard_id]
+            self.assertIsNone(bot.cached_configs.get(other["guild_id"]))
+
+            found = await self.storage.bullets_in_channel(guild["channel_id"])
+            self.assertTrue(found[0].found)
+            self.assertEqual(found[0].finder, shard_id + 1)
+
+    async def test_cache_messages_reach_every_bot(self):
+        guild = self.add_guild(0)
+        bot = self.bots[0]
+        await self.gateway(
+            guild["guild_id"], "MESSAGE_CREATE", self.message(guild, 1, "nothing")
+        )
+        self.assertIsNotNone(bot.cached_configs.get(guild["guild_id"]))
+
+        # like the database's triggers would, when another process changes it
+        other = broker.LocalBroker("manage_cases", self.hub)
+        await other.publish("config", guild_id=guild["guild_id"])
+        self.assertIsNone(bot.cached_configs.get(guild["guild_id"]))
+
+        # a bot's own messages aren't sent back to it
+        await self.gateway(
+            guild["guild_id"], "MESSAGE_CREATE", self.message(guild, 1, "nothing")
+        )
+        await bot.broker.publish("config", guild_id=guild["guild_id"])
+        self.assertIsNotNone(bot.cached_configs.get(guild["guild_id"]))
@@ -0,0 +1,111 @@
+import unittest
+
+from tortoise.exceptions import IntegrityError
+
+import common.storage as storage
+
+
+class MemoryStorageTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.storage = storage.MemoryStorage()
+
+    def add_bullet(self, name: str, channel_id: int = 1, guild_id: int = 1):
+        return self.storage.add_bullet(
+            name=name,
+            aliases={name[0]},
+            description=f"A {name}.",
+            channel_id=channel_id,
+            guild_id=guild_id,
+        )
+
+    async def test_names_are_unique_per_channel(self):
+        self.add_bullet("knife")
+        with self.assertRaises(IntegrityError):
+            self.add_bullet("knife")
+
+        # but not across channels
+        self.add_bullet("knife", channel_id=2)
+
+    async def test_bullets_are_copies(self):
+        added = self.add_bullet("knife")
+        added.aliases.add("blade")
+        added.found = True
+
+        (bullet,) = await self.storage.bullets_in_channel(1)
+        self.assertEqual(bullet.aliases, {"k"})
+        self.assertFalse(bullet.found)
+
+        bullet.aliases.add("dagger")
+        (again,) = await self.storage.bullets_in_channel(1)
+        self.assertEqual(again.aliases, {"k"})
+        self.assertIsNot(again, bullet)
+
+    async def test_bullets_in_channel(self):
+        for name in ("knife", "letter", "window"):
+            self.add_bullet(name)
+        self.add_bullet("rope", channel_id=2)
+
+        bullets = await self.storage.bullets_in_channel(1)
+        self.assertEqual([b.name for b in bullets], ["knife", "letter", "window"])
+        self.assertEqual(await self.storage.bullets_in_channel(3), [])
+
+    async def test_guild_queries(self):
+        knife = self.add_bullet("knife")
+        self.add_bullet("rope", channel_id=2)
+        self.add_bullet("letter", guild_id=2)
+        await self.storage.claim_bullet(knife.id, 10)
+
+        self.assertEqual(
+            await self.storage.finders_in_guild(1), [(True, 10), (False, 0)]
+        )
+        self.assertEqual(
+            await self.storage.bullet_names_in_guild(1), [(1, "knife"), (2, "rope")]
+        )
+
+    async def test_claim_bullet(self):
+        knife = self.add_bullet("knife")
+
+        self.assertTrue(await self.storage.claim_bullet(knife.id, 10))
+        self.assertFalse(await self.storage.claim_bullet(knife.id, 20))
+        self.assertFalse(await self.storage.claim_bullet(1000, 20))
+
+        (bullet,) = await self.storage.bullets_in_channel(1)
+        self.assertEqual((bullet.found, bullet.finder), (True, 10))
+
+    async def test_configs(self):
+        self.assertIsNone(await self.storage.get_config(1))
+
+        created = await self.storage.create_config(1)
+        self.assertEqual(created.guild_id, 1)
+        self.assertFalse(created.bullets_enabled)
+        # creating it again gives back the one that's there
+        self.assertEqual((await self.storage.create_config(1)).id, created.id)
+
+        created.bullets_enabled = True
+        self.assertFalse((await self.storage.get_config(1)).bullets_enabled)
+
+        with self.assertRaises(IntegrityError):
+            self.storage.add_config(1)
+
+    async def test_queries_are_counted(self):
+        self.add_bullet("knife")
+        self.storage.add_config(1)
+        self.assertEqual(self.storage.queries, 0)
+
+        await self.storage.bullets_in_channel(1)
+        await self.storage.finders_in_guild(1)
+        await self.storage.bullet_names_in_guild(1)
+        await self.storage.get_config(1)
+        await self.storage.create_config(1)
+        await self.storage.claim_bullet(1, 10)
+        self.assertEqual(self.storage.queries, 6)
+
+
+class StorageTest(unittest.TestCase):
+    def test_missing_methods_fail_on_creation(self):
+        class HalfStorage(storage.Storage):
+            async def bullets_in_channel(self, channel_id: int):
+                return []
+
+        with self.assertRaises(TypeError):
+            HalfStorage()
@@ -0,0 +1,111 @@
+import unittest
+
+import common.bullet_index as bullet_index
+import common.models as models
+import common.typo_matcher as typo_matcher
+
+
+def make_bullet(bullet_id: int, name: str, aliases: set[str] = frozenset()):
+    return models.TruthBullet(
+        id=bullet_id,
+        name=name,
+        aliases=set(aliases),
+        description="A Truth Bullet.",
+        channel_id=1,
+        guild_id=1,
+        found=False,
+        finder=0,
+    )
+
+
+class TyposTest(unittest.TestCase):
+    def test_one_typo(self):
+        self.assertEqual(typo_matcher.typos("knife", "knife"), 0)
+        self.assertEqual(typo_matcher.typos("knife", "knive"), 1)  # substitution
+        self.assertEqual(typo_matcher.typos("knife", "knfie"), 1)  # swap
+        self.assertEqual(typo_matcher.typos("knife", "knie"), 1)  # deletion
+        self.assertEqual(typo_matcher.typos("knife", "kniffe"), 1)  # insertion
+
+    def test_too_far_off(self):
+        self.assertIsNone(typo_matcher.typos("knife", "knives"))
+        self.assertIsNone(typo_matcher.typos("knife", "kite"))
+        self.assertIsNone(typo_matcher.typos("window", "widow_"))
+
+    def test_short_words_must_be_exact(self):
+        self.assertEqual(typo_matcher.typos("key", "key"), 0)
+        self.assertIsNone(typo_matcher.typos("key", "kye"))
+
+
+class TypoMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.matcher: typo_matcher.TypoMatcher[int] = typo_matcher.TypoMatcher()
+        self.matcher.add(1, ("kitchen knife", "blade"))
+        self.matcher.add(2, ("broken window in the hall",))
+        self.matcher.add(3, ("knife",))
+
+    def test_part_of_a_keyword_does_not_match(self):
+        self.assertNotIn(1, self.matcher.search("kitchen"))
+        self.assertNotIn(1, self.matcher.search("knife!"))
+        self.assertNotIn(2, self.matcher.search("window"))
+        self.assertNotIn(2, self.matcher.search("the broken window"))
+
+    def test_text_shorter_than_keyword(self):
+        self.assertEqual(self.matcher.search("kit"), {})
+        self.assertEqual(self.matcher.search(""), {})
+
+    def test_typos_match(self):
+        self.assertEqual(self.matcher.search("i found a knive"), {3: 1})
+        self.assertEqual(self.matcher.search("i found a knfie"), {3: 1})
+        self.assertEqual(self.matcher.search("look, a kitchen knfie!")[1], 1)
+        self.assertEqual(self.matcher.search("a brokn window in the hal")[2], 2)
+        # short words still have to be exact
+        self.assertNotIn(2, self.matcher.search("a broken window in teh hall"))
+
+    def test_exact_words_score_zero(self):
+        self.assertEqual(self.matcher.search("the kitchen knife is here")[1], 0)
+        self.assertEqual(self.matcher.search("a bloody blade")[1], 0)
+
+    def test_remove(self):
+        self.matcher.remove(3)
+        self.assertEqual(self.matcher.search("a knive"), {})
+        self.assertEqual(len(self.matcher), 2)
+
+    def test_add_replaces_keywords(self):
+        self.matcher.add(3, ("letter",))
+        self.assertEqual(self.matcher.search("a knive"), {})
+        self.assertEqual(self.matcher.search("a leter"), {3: 1})
+
+
+class FuzzyMatchTest(unittest.TestCase):
+    def setUp(self):
+        self.channel = bullet_index.ChannelBullets(
+            1,
+            (
+                make_bullet(1, "Kitchen Knife", {"Blade"}),
+                make_bullet(2, "Broken Window", {"Shattered Glass"}),
+                make_bullet(3, "Key"),
+            ),
+        )
+
+    def test_exact_match_preferred(self):
+        self.assertEqual(self.channel.fuzzy_match("the KEY and a brokn window").id, 3)
+
+    def test_typo(self):
+        self.assertEqual(self.channel.fuzzy_match("a kitchen knfie").id, 1)
+        self.assertEqual(self.channel.fuzzy_match("some shatterd glass").id, 2)
+
+    def test_no_false_claims(self):
+        self.assertIsNone(self.channel.fuzzy_match("kitchen"))
+        self.assertIsNone(self.channel.fuzzy_match("window"))
+        self.assertIsNone(self.channel.fuzzy_match("the kye"))
+
+    def test_follows_changes(self):
+        self.assertEqual(self.channel.fuzzy_match("a kitchen knfie").id, 1)
+
+        found = make_bullet(1, "Kitchen Knife", {"Blade"})
+        found.found = True
+        self.channel.put(found)
+        self.assertIsNone(self.channel.fuzzy_match("a kitchen knfie"))
+
+        self.channel.put(make_bullet(4, "Bloody Letter"))
+        self.assertEqual(self.channel.fuzzy_match("a bloody leter").id, 4)
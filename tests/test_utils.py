@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+import common.storage as storage
+import common.utils as utils
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one(self):
+        flights = utils.SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return object()
+
+        results = await asyncio.gather(*(flights.do(1, call) for _ in range(5)))
+
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertNotIn(1, flights)
+
+        # once it's done, the next call runs again
+        await flights.do(1, call)
+        self.assertEqual(calls, 2)
+
+    async def test_keys_are_separate(self):
+        flights = utils.SingleFlight()
+        results = await asyncio.gather(
+            flights.do(1, self.value(1)), flights.do(2, self.value(2))
+        )
+        self.assertEqual(results, [1, 2])
+
+    async def test_errors_reach_every_waiter(self):
+        flights = utils.SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("oops")
+
+        results = await asyncio.gather(
+            flights.do(1, fail), flights.do(1, fail), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertNotIn(1, flights)
+
+    async def test_cancelling_one_waiter(self):
+        flights = utils.SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flights.do(1, call))
+        second = asyncio.ensure_future(flights.do(1, call))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        # the call itself carries on for everyone else
+        self.assertEqual(await second, "done")
+
+    def value(self, value):
+        async def call():
+            await asyncio.sleep(0)
+            return value
+
+        return call
+
+
+class CreateOrGetTest(unittest.IsolatedAsyncioTestCase):
+    async def test_new_config(self):
+        bot_storage = storage.MemoryStorage()
+        config = await utils.create_or_get(bot_storage, 1)
+
+        self.assertEqual(config.guild_id, 1)
+        # one query to find there's no config, and one to make it
+        self.assertEqual(bot_storage.queries, 2)
+
+    async def test_existing_config(self):
+        bot_storage = storage.MemoryStorage()
+        bot_storage.add_config(1, bullets_enabled=True)
+
+        config = await utils.create_or_get(bot_storage, 1)
+        self.assertTrue(config.bullets_enabled)
+        self.assertEqual(bot_storage.queries, 1)